@@ -0,0 +1,263 @@
+"""Concurrent execution engine for the remote operations.
+
+Allows to start lots of remote operations from a single test process without
+spawning a thread per operation. Operations are queued per host and are
+executed by a fixed-size pool of workers, making sure that no more than
+'max_per_host' of them run in parallel against the same host. Queued
+operations do not occupy workers, so one busy host does not block
+operations addressed to other hosts.
+
+Usage example:
+
+    from cnslibs.common import async_runner
+
+    futures = [
+        async_runner.async_heketi_volume_create(
+            heketi_client_node, heketi_server_url, 1, json=True)
+        for i in range(100)]
+    volumes = async_runner.wait_for_results(futures)
+
+Runner options may be defined in the 'common' section of the config file:
+
+    common:
+        async_runner:
+            workers: 32
+            max_per_host: 8
+"""
+
+import collections
+from multiprocessing.pool import ThreadPool
+import sys
+import threading
+
+from glusto.core import Glusto as g
+import six
+
+from cnslibs.common import command
+from cnslibs.common import exceptions
+from cnslibs.common import heketi_ops
+from cnslibs.common import openshift_ops
+
+
+RUNNER = None
+_RUNNER_LOCK = threading.Lock()
+
+
+class Future(object):
+    """Result of an operation which may be not finished yet."""
+
+    def __init__(self, host, func):
+        self.host = host
+        self.func = func
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def _set_result(self, result):
+        self._result = result
+        self._done.set()
+
+    def _set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def exception(self, timeout=None):
+        """Wait for the operation and return its exception, if any."""
+        self._wait(timeout)
+        return self._exc_info[1] if self._exc_info else None
+
+    def result(self, timeout=None):
+        """Wait for the operation and return its result.
+
+        Exception of the operation, if any, gets reraised.
+        """
+        self._wait(timeout)
+        if self._exc_info:
+            six.reraise(*self._exc_info)
+        return self._result
+
+    def _wait(self, timeout):
+        if not self._done.wait(timeout):
+            raise exceptions.ExecutionError(
+                "Timeout of %s sec exceeded waiting for '%s' operation on "
+                "'%s' host." % (
+                    timeout, getattr(self.func, '__name__', self.func),
+                    self.host))
+
+
+class AsyncRunner(object):
+    """Runs operations using limited amount of workers and per-host limits.
+
+    Args:
+        workers (int): amount of worker threads.
+        max_per_host (int): amount of operations allowed to run in parallel
+            against the same host.
+    """
+
+    def __init__(self, workers=32, max_per_host=8):
+        self.workers = workers
+        self.max_per_host = max_per_host
+        self._pool = None
+        self._lock = threading.Lock()
+        self._running = collections.defaultdict(int)
+        self._pending = collections.defaultdict(collections.deque)
+
+    def submit(self, host, func, *args, **kwargs):
+        """Schedule 'func(*args, **kwargs)' call addressed to the host.
+
+        Args:
+            host (str): host the operation is addressed to. Used only for
+                limiting amount of parallel operations.
+            func (callable): function to call.
+        Returns:
+            Future object instance.
+        """
+        future = Future(host, func)
+        item = (future, func, args, kwargs)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+            if self._running[host] < self.max_per_host:
+                self._running[host] += 1
+            else:
+                self._pending[host].append(item)
+                return future
+        self._dispatch(host, item)
+        return future
+
+    def _dispatch(self, host, item):
+        self._pool.apply_async(self._execute, (host, ) + item)
+
+    def _execute(self, host, future, func, args, kwargs):
+        try:
+            future._set_result(func(*args, **kwargs))
+        except Exception:
+            future._set_exc_info(sys.exc_info())
+        finally:
+            with self._lock:
+                if self._pending[host]:
+                    next_item = self._pending[host].popleft()
+                else:
+                    next_item = None
+                    self._running[host] -= 1
+            if next_item:
+                self._dispatch(host, next_item)
+
+    def close(self):
+        """Wait for all the scheduled operations and stop workers."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def get_runner():
+    """Get runner instance shared by all the async functions.
+
+    Runner gets created on the first call using options from the
+    'common.async_runner' config section.
+
+    Returns:
+        AsyncRunner object instance.
+    """
+    global RUNNER
+    with _RUNNER_LOCK:
+        if RUNNER is None:
+            runner_config = g.config.get("common", {}).get(
+                "async_runner", {}) or {}
+            RUNNER = AsyncRunner(**runner_config)
+    return RUNNER
+
+
+def async_call(host, func, *args, **kwargs):
+    """Schedule call of any function which operates against the host."""
+    return get_runner().submit(host, func, *args, **kwargs)
+
+
+def wait_for_results(futures, timeout=None, raise_on_error=True):
+    """Wait for all the operations to finish and collect their results.
+
+    Args:
+        futures (list): list of Future objects.
+        timeout (int|None): seconds to wait for each of the operations.
+        raise_on_error (bool): if True, then first found failure is reraised
+            after all the operations are finished. Otherwise, exception
+            objects are returned instead of results of failed operations.
+    Returns:
+        list: results of the operations in the same order as futures.
+    """
+    results, first_exc_future = [], None
+    for future in futures:
+        exc = future.exception(timeout)
+        if exc is not None and first_exc_future is None:
+            first_exc_future = future
+        results.append(exc if exc is not None else future.result())
+    if raise_on_error and first_exc_future is not None:
+        first_exc_future.result()
+    return results
+
+
+def async_cmd_run(cmd, hostname, raise_on_error=True):
+    """Asynchronous version of the 'command.cmd_run' function.
+
+    Returns:
+        Future object which provides stripped stdout of a command.
+    """
+    return async_call(
+        hostname, command.cmd_run, cmd, hostname,
+        raise_on_error=raise_on_error)
+
+
+def async_oc_get(ocp_node, rtype, name=None, raise_on_error=True):
+    """Asynchronous version of the 'openshift_ops.oc_get_yaml' function.
+
+    Returns:
+        Future object which provides dict with data about the resource.
+    """
+    return async_call(
+        ocp_node, openshift_ops.oc_get_yaml, ocp_node, rtype, name=name,
+        raise_on_error=raise_on_error)
+
+
+def async_heketi_volume_create(heketi_client_node, heketi_server_url, size,
+                               **kwargs):
+    """Asynchronous version of the 'heketi_ops.heketi_volume_create'."""
+    return async_call(
+        heketi_client_node, heketi_ops.heketi_volume_create,
+        heketi_client_node, heketi_server_url, size, **kwargs)
+
+
+def async_heketi_volume_info(heketi_client_node, heketi_server_url,
+                             volume_id, **kwargs):
+    """Asynchronous version of the 'heketi_ops.heketi_volume_info'."""
+    return async_call(
+        heketi_client_node, heketi_ops.heketi_volume_info,
+        heketi_client_node, heketi_server_url, volume_id, **kwargs)
+
+
+def async_heketi_volume_delete(heketi_client_node, heketi_server_url,
+                               volume_id, **kwargs):
+    """Asynchronous version of the 'heketi_ops.heketi_volume_delete'."""
+    return async_call(
+        heketi_client_node, heketi_ops.heketi_volume_delete,
+        heketi_client_node, heketi_server_url, volume_id, **kwargs)
+
+
+def async_heketi_blockvolume_create(heketi_client_node, heketi_server_url,
+                                    size, **kwargs):
+    """Asynchronous version of the 'heketi_ops.heketi_blockvolume_create'."""
+    return async_call(
+        heketi_client_node, heketi_ops.heketi_blockvolume_create,
+        heketi_client_node, heketi_server_url, size, **kwargs)
+
+
+def async_heketi_blockvolume_delete(heketi_client_node, heketi_server_url,
+                                    block_volume_id, **kwargs):
+    """Asynchronous version of the 'heketi_ops.heketi_blockvolume_delete'."""
+    return async_call(
+        heketi_client_node, heketi_ops.heketi_blockvolume_delete,
+        heketi_client_node, heketi_server_url, block_volume_id, **kwargs)
@@ -4,6 +4,8 @@ import unittest
 from glusto.core import Glusto as g
 
 from cnslibs.common import command
+from cnslibs.common import command_cache
+from cnslibs.common import oc_watch
 from cnslibs.common.exceptions import (
     ExecutionError,
     ConfigError
@@ -24,8 +26,8 @@ from cnslibs.common.openshift_ops import (
     oc_get_custom_resource,
     scale_dc_pod_amount_and_wait,
     switch_oc_project,
-    verify_pvc_status_is_bound,
     wait_for_pod_be_ready,
+    wait_for_pvcs_bound,
     wait_for_resource_absence,
 )
 
@@ -85,11 +87,19 @@ class BaseClass(unittest.TestCase):
             raise ConfigError("Heketi server %s is not alive"
                               % cls.heketi_server_url)
 
+        # Invalidate cached command results on the mutating 'g.run' calls
+        # till the end of the class, starting with the project switch
+        cls.command_cache_hook = command_cache.install_run_hook()
+
         # Switch to the storage project
-        if not switch_oc_project(
-                cls.ocp_master_node[0], cls.storage_project_name):
-            raise ExecutionError("Failed to switch oc project on node %s"
-                                 % cls.ocp_master_node[0])
+        try:
+            if not switch_oc_project(
+                    cls.ocp_master_node[0], cls.storage_project_name):
+                raise ExecutionError("Failed to switch oc project on node %s"
+                                     % cls.ocp_master_node[0])
+        except Exception:
+            command_cache.uninstall_run_hook(cls.command_cache_hook)
+            raise
 
         if 'glustotest_run_id' not in g.config:
             g.config['glustotest_run_id'] = (
@@ -117,6 +127,8 @@ class BaseClass(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         super(BaseClass, cls).tearDownClass()
+        oc_watch.stop_watches()
+        command_cache.uninstall_run_hook(cls.command_cache_hook)
         msg = "Teardownclass: %s : %s" % (cls.__name__, cls.glustotest_run_id)
         g.log.info(msg)
 
@@ -189,8 +201,18 @@ class BaseClass(unittest.TestCase):
     def create_and_wait_for_pvcs(self, pvc_size=1,
                                  pvc_name_prefix="autotests-pvc",
                                  pvc_amount=1, sc_name=None,
-                                 timeout=120, wait_step=3):
+                                 timeout=None, wait_step=3):
+        """Create PVCs and wait for all of them to get 'Bound' status.
+
+        Args:
+            timeout (int|None): total time in seconds to wait for all the
+                PVCs. Defaults to 120 seconds per PVC.
+        Returns:
+            list: names of the created PVCs.
+        """
         node = self.ocp_client[0]
+        if timeout is None:
+            timeout = 120 * pvc_amount
 
         # Create storage class if not specified
         if not sc_name:
@@ -211,8 +233,7 @@ class BaseClass(unittest.TestCase):
 
         # Wait for PVCs to be in bound state
         try:
-            for pvc_name in pvc_names:
-                verify_pvc_status_is_bound(node, pvc_name, timeout, wait_step)
+            wait_for_pvcs_bound(node, pvc_names, timeout, wait_step)
         finally:
             reclaim_policy = oc_get_custom_resource(
                 node, 'sc', ':.reclaimPolicy', sc_name)[0]
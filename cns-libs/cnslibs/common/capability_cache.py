@@ -0,0 +1,228 @@
+"""Cache of the cluster versions and feature flags.
+
+Versions of OpenShift and Heketi are cached in module globals, so each
+test process probes them again, running 'oc version', 'rpm -q' on the
+Heketi client node and 'oc exec' into the Heketi POD. This module keeps
+the probed versions and feature flags based on them per cluster identity,
+optionally persisting them in a JSON file, so that new processes and
+parallel workers reuse them without any probes.
+
+Usage example:
+
+    from cnslibs.common import capability_cache
+
+    if capability_cache.has_feature("oc_delete_wait_false"):
+        cmd.append("--wait=false")
+
+    # After cluster upgrade
+    capability_cache.get_cache().invalidate()
+
+Cluster identity is built from the OpenShift API URL and the Heketi
+server URL. If 'api_url' option is not defined, then the first OpenShift
+master node is used instead of the API URL. Persistence is enabled by
+defining the file path in the 'common' section of the config file:
+
+    common:
+        capability_cache:
+            path: /tmp/cns-capabilities.json
+            ttl: 86400
+            api_url: https://master.example.com:8443
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+from glusto.core import Glusto as g
+
+
+CACHE = None
+_CACHE_LOCK = threading.Lock()
+CACHE_FILE_VERSION = 1
+
+# Feature flags with minimal versions supporting them
+HEKETI_FEATURES = {
+    "heketi_metrics": "6.0.0-14",
+    "heketi_examine_gluster": "8.0.0-7",
+}
+OPENSHIFT_FEATURES = {
+    "oc_delete_wait_false": "3.11",
+}
+
+
+def _get_cluster_key(api_url=None):
+    if not api_url:
+        api_url = list(g.config["ocp_servers"]["master"].keys())[0]
+    openshift_config = g.config.get("cns", g.config.get("openshift")) or {}
+    heketi_url = openshift_config.get("heketi_config", {}).get(
+        "heketi_server_url")
+    return "%s|%s" % (api_url, heketi_url)
+
+
+class CapabilityCache(object):
+    """Versions and feature flags of a cluster, optionally kept on disk.
+
+    Args:
+        path (str): path to the JSON file shared by the test processes.
+            Empty value means that values are kept only in memory.
+        ttl (int|float): seconds after which cached values get probed
+            again.
+        api_url (str|None): OpenShift API URL used in the cluster key.
+    """
+
+    def __init__(self, path='', ttl=86400, api_url=None):
+        self.path = path
+        self.ttl = ttl
+        self.key = _get_cluster_key(api_url)
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def _read_file(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if data.get("version") != CACHE_FILE_VERSION:
+            return {}
+        return data.get("clusters") or {}
+
+    def _write_file(self, clusters):
+        dir_name = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": CACHE_FILE_VERSION, "clusters": clusters},
+                      f, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+    def _update_file(self, update_func):
+        """Read, change and write the file holding lock against processes."""
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                clusters = self._read_file()
+                update_func(clusters)
+                self._write_file(clusters)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _is_fresh(self, entry):
+        return bool(entry) and (
+            entry.get("created_at", 0) + self.ttl > time.time())
+
+    def _get_entry(self):
+        if self._entry is None or not self._is_fresh(self._entry):
+            entry = self._read_file().get(self.key) if self.path else None
+            self._entry = entry if self._is_fresh(entry) else {
+                "created_at": time.time(), "features": {}}
+        return self._entry
+
+    def get(self, name):
+        """Get cached value, like 'openshift_version', or None."""
+        with self._lock:
+            return self._get_entry().get(name)
+
+    def get_feature(self, name):
+        """Get cached feature flag or None if it was not computed yet."""
+        with self._lock:
+            return self._get_entry()["features"].get(name)
+
+    def update(self, features=None, **values):
+        """Store values and feature flags of the cluster.
+
+        Args:
+            features (dict|None): feature flags to add to the cached ones.
+        Kwargs:
+            Values to store, like 'heketi_server_version'.
+        """
+        with self._lock:
+            entry = self._get_entry()
+            entry.update(values)
+            entry["features"].update(features or {})
+
+            def _update_cluster(clusters):
+                stored_entry = clusters.get(self.key)
+                if self._is_fresh(stored_entry):
+                    stored_entry.update(values)
+                    stored_entry.setdefault("features", {}).update(
+                        features or {})
+                else:
+                    clusters[self.key] = entry
+
+            if self.path:
+                self._update_file(_update_cluster)
+
+    def invalidate(self):
+        """Drop cached values of the cluster, so they get probed again."""
+        # NOTE: version modules import this one, so import them here to
+        # avoid circular imports.
+        from cnslibs.common import heketi_version
+        from cnslibs.common import openshift_version
+
+        with self._lock:
+            self._entry = None
+            if self.path:
+                self._update_file(
+                    lambda clusters: clusters.pop(self.key, None))
+        heketi_version.HEKETI_CLIENT_VERSION = None
+        heketi_version.HEKETI_SERVER_VERSION = None
+        openshift_version.OPENSHIFT_VERSION = None
+
+
+def get_cache():
+    """Get capability cache instance shared by all the modules.
+
+    Cache gets created on the first call using options from the
+    'common.capability_cache' config section.
+
+    Returns:
+        CapabilityCache object instance.
+    """
+    global CACHE
+    with _CACHE_LOCK:
+        if CACHE is None:
+            cache_config = g.config.get("common", {}).get(
+                "capability_cache", {}) or {}
+            CACHE = CapabilityCache(**cache_config)
+    return CACHE
+
+
+def has_feature(name, hostname=None):
+    """Check whether the cluster supports a feature.
+
+    Feature flag is taken from the cache. If it is absent there, then
+    the version it depends on is probed and the flag gets cached.
+
+    Args:
+        name (str): feature name, one of the 'HEKETI_FEATURES' and
+            'OPENSHIFT_FEATURES' keys.
+        hostname (str|None): node to run version probe commands on,
+            Heketi client node for the Heketi features and node with
+            'oc' client for the OpenShift ones.
+    Returns:
+        bool: True if feature is supported.
+    """
+    cache = get_cache()
+    supported = cache.get_feature(name)
+    if supported is not None:
+        return supported
+
+    # NOTE: version modules import this one, so import them here to
+    # avoid circular imports.
+    if name in HEKETI_FEATURES:
+        from cnslibs.common import heketi_version
+        version = heketi_version.get_heketi_version(hostname)
+        features = HEKETI_FEATURES
+    elif name in OPENSHIFT_FEATURES:
+        from cnslibs.common import openshift_version
+        version = openshift_version.get_openshift_version(hostname)
+        features = OPENSHIFT_FEATURES
+    else:
+        raise KeyError("Unknown feature '%s'." % name)
+    flags = dict((feature, bool(version >= min_version))
+                 for feature, min_version in features.items())
+    cache.update(features=flags)
+    return flags[name]
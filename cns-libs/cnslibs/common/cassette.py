@@ -0,0 +1,283 @@
+"""Record/replay layer for the glusto's run method.
+
+In the 'record' mode all the (host, command) -> (ret, out, err) exchanges
+done via 'g.run', 'command.cmd_run_stream' and pod shell sessions are
+captured and then saved to a cassette file.
+In the 'replay' mode commands are not sent anywhere, results are served
+from a cassette file instead. It allows to exercise the library code
+without live cluster, for example for profiling of the parsing logic.
+
+Usage example:
+
+    from cnslibs.common import cassette
+
+    with cassette.Cassette("/tmp/heketi_ops.json.gz", mode="record"):
+        heketi_ops.heketi_volume_list(h_node, h_url)
+
+    with cassette.Cassette("/tmp/heketi_ops.json.gz", mode="replay"):
+        heketi_ops.heketi_volume_list(h_node, h_url)
+
+Cassette should be used as the outermost patch of glusto, i.e. before
+'podcmd.GlustoPod' gets applied. Streamed commands and commands run
+using long-lived pod shell sessions do not go through 'g.run', so they
+are stored with the '<stream>' and '<pod NAME>' prefixes in the command.
+Output of a streamed command is replayed as a single chunk. Random
+markers of the scripts made by 'command.cmd_run_batch' are stored as
+'__cns_batch_<marker>' both in commands and outputs, and are replaced
+back with the markers of the replayed commands.
+
+Cassette file is a JSON document, gzipped if the file name ends with
+'.gz'. Each unique (host, command) pair is stored once and is referenced
+by index from the list of the recorded responses:
+
+    {"version": 1,
+     "commands": [["10.70.46.1", "heketi-cli volume list"], ...],
+     "responses": [[0, 0, "Id:...", ""], ...]}
+"""
+
+from functools import wraps
+import gzip
+import json
+import re
+import threading
+
+from glusto.core import Glusto as g
+import mock
+import six
+
+from cnslibs.common import exceptions
+
+
+CASSETTE_VERSION = 1
+RECORD = "record"
+REPLAY = "replay"
+STREAM_PREFIX = "<stream> "
+POD_SESSION_PREFIX = "<pod %s> "
+# Random markers of the 'command.cmd_run_batch' scripts
+_BATCH_MARKER_RE = re.compile(r"__cns_batch_[a-z0-9]+")
+_BATCH_MARKER_PLACEHOLDER = "__cns_batch_<marker>"
+
+
+def _make_key(host, command):
+    if not isinstance(command, six.string_types):
+        command = ' '.join(command)
+    return (host, _BATCH_MARKER_RE.sub(_BATCH_MARKER_PLACEHOLDER, command))
+
+
+def _get_batch_marker(command):
+    if not isinstance(command, six.string_types):
+        command = ' '.join(command)
+    match = _BATCH_MARKER_RE.search(command)
+    return match.group(0) if match else None
+
+
+def _replace_marker(marker, placeholder, *values):
+    return [value.replace(marker, placeholder) if value else value
+            for value in values]
+
+
+def _to_native_str(value):
+    # NOTE: 'json' module of py2 provides unicode objects, whereas
+    # glusto's run method returns str objects.
+    if six.PY2 and isinstance(value, six.text_type):
+        return value.encode('utf-8')
+    return value
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class Cassette(object):
+    """A context manager / decorator that records or replays 'g.run' calls.
+
+    Args:
+        path (str): path to the cassette file.
+        mode (str): either 'record' or 'replay'.
+    """
+
+    def __init__(self, path, mode=REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise exceptions.ConfigError(
+                "Unexpected cassette mode '%s'. Expected one of: %s" % (
+                    mode, (RECORD, REPLAY)))
+        self.path = path
+        self.mode = mode
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+        self._commands = []
+        self._command_indexes = {}
+        self._responses = []
+        self._replay_index = {}
+        self._replay_positions = {}
+        self._lock = threading.Lock()
+        self._patchers = []
+        self._orig_run = None
+        self._orig_cmd_run_stream = None
+        self._orig_run_in_pod = None
+
+    def load(self):
+        """Read cassette file and index its responses by (host, command)."""
+        with _open(self.path, 'rb') as f:
+            data = json.loads(f.read().decode('utf-8'))
+        if data.get("version") != CASSETTE_VERSION:
+            raise exceptions.ConfigError(
+                "Unsupported version '%s' of the '%s' cassette file." % (
+                    data.get("version"), self.path))
+        self._commands = [
+            tuple(_to_native_str(part) for part in cmd)
+            for cmd in data["commands"]]
+        self._responses = data["responses"]
+        self._replay_index, self._replay_positions = {}, {}
+        for cmd_index, ret, out, err in self._responses:
+            self._replay_index.setdefault(
+                self._commands[cmd_index], []).append(
+                    (ret, _to_native_str(out), _to_native_str(err)))
+
+    def save(self):
+        """Write recorded exchanges to the cassette file."""
+        with self._lock:
+            data = {
+                "version": CASSETTE_VERSION,
+                "commands": self._commands,
+                "responses": self._responses,
+            }
+            with _open(self.path, 'wb') as f:
+                f.write(json.dumps(
+                    data, separators=(',', ':')).encode('utf-8'))
+
+    def record(self, host, command, ret, out, err):
+        """Add exchange to the recorded ones."""
+        key = _make_key(host, command)
+        marker = _get_batch_marker(command)
+        if marker:
+            out, err = _replace_marker(
+                marker, _BATCH_MARKER_PLACEHOLDER, out, err)
+        with self._lock:
+            if key not in self._command_indexes:
+                self._command_indexes[key] = len(self._commands)
+                self._commands.append(key)
+            self._responses.append(
+                [self._command_indexes[key], ret, out, err])
+            self.stats['recorded'] += 1
+
+    def replay(self, host, command):
+        """Get recorded result of a command.
+
+        Results of repeated commands are returned in the recorded order.
+        When recorded results are exhausted, the last one is repeated,
+        which suits commands used for polling.
+
+        Returns:
+            A tuple of the command's return code, stdout, and stderr.
+        Raises:
+            exceptions.ExecutionError: when command was not recorded.
+        """
+        key = _make_key(host, command)
+        with self._lock:
+            responses = self._replay_index.get(key)
+            if not responses:
+                self.stats['misses'] += 1
+                raise exceptions.ExecutionError(
+                    "Command '%s' on '%s' host is absent in the '%s' "
+                    "cassette." % (key[1], host, self.path))
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = min(
+                position + 1, len(responses) - 1)
+            self.stats['replayed'] += 1
+        ret, out, err = responses[position]
+        marker = _get_batch_marker(command)
+        if marker:
+            out, err = _replace_marker(
+                _BATCH_MARKER_PLACEHOLDER, marker, out, err)
+        return ret, out, err
+
+    def _run(self, host, command, user=None, log_level=None):
+        if self.mode == REPLAY:
+            return self.replay(host, command)
+        if user is None:
+            ret, out, err = self._orig_run(host, command, log_level=log_level)
+        else:
+            ret, out, err = self._orig_run(
+                host, command, user, log_level=log_level)
+        self.record(host, command, ret, out, err)
+        return ret, out, err
+
+    def _cmd_run_stream(self, cmd, hostname, raise_on_error=True,
+                        chunk_size=65536, on_start=None):
+        if not isinstance(cmd, six.string_types):
+            cmd = ' '.join(cmd)
+        key_command = STREAM_PREFIX + cmd
+        if self.mode == REPLAY:
+            ret, out, err = self.replay(hostname, key_command)
+            if out:
+                yield out
+            if raise_on_error and ret != 0:
+                raise AssertionError(err)
+            return
+
+        chunks, ret, err = [], 0, ''
+        try:
+            for chunk in self._orig_cmd_run_stream(
+                    cmd, hostname, raise_on_error=raise_on_error,
+                    chunk_size=chunk_size, on_start=on_start):
+                chunks.append(chunk)
+                yield chunk
+        except AssertionError as e:
+            ret, err = 1, str(e)
+            raise
+        finally:
+            # Partially read streams, like closed watches, get recorded too
+            self.record(hostname, key_command, ret, ''.join(chunks), err)
+
+    def _run_in_pod(self, ocp_node, pod_name, command):
+        if not isinstance(command, six.string_types):
+            command = ' '.join(command)
+        key_command = (POD_SESSION_PREFIX % pod_name) + command
+        if self.mode == REPLAY:
+            return self.replay(ocp_node, key_command)
+        ret, out, err = self._orig_run_in_pod(ocp_node, pod_name, command)
+        self.record(ocp_node, key_command, ret, out, err)
+        return ret, out, err
+
+    def __enter__(self):
+        """Patch glusto's run method and other command runners."""
+        # NOTE: these modules import glusto, so import them here to make
+        # cassette usable as the outermost patch of it.
+        from cnslibs.common import command
+        from cnslibs.common import pod_session
+
+        if self.mode == REPLAY:
+            self.load()
+        self._orig_run = g.run
+        self._orig_cmd_run_stream = command.cmd_run_stream
+        self._orig_run_in_pod = pod_session.run_in_pod
+        self._patchers = [
+            mock.patch('glusto.core.Glusto.run', new=self._run),
+            mock.patch.object(
+                command, 'cmd_run_stream', new=self._cmd_run_stream),
+            mock.patch.object(
+                pod_session, 'run_in_pod', new=self._run_in_pod),
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+        return self
+
+    def __exit__(self, etype, value, tb):
+        """Restore patched functions and save recorded exchanges."""
+        for patcher in reversed(self._patchers):
+            patcher.stop()
+        self._patchers = []
+        self._orig_run = None
+        self._orig_cmd_run_stream, self._orig_run_in_pod = None, None
+        if self.mode == RECORD:
+            self.save()
+
+    def __call__(self, func):
+        """Allow Cassette to be used as a decorator."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
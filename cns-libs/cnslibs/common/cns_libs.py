@@ -1,11 +1,15 @@
 from glusto.core import Glusto as g
-import yaml
 
-from cnslibs.common.command import cmd_run
+from cnslibs.common.command import (
+    cmd_run,
+    cmd_run_batch)
 from cnslibs.common.exceptions import (
     ExecutionError,
     NotSupportedException)
 from cnslibs.common.openshift_version import get_openshift_version
+from cnslibs.common.utils import (
+    dump_yaml,
+    load_yaml)
 
 
 MASTER_CONFIG_FILEPATH = "/etc/origin/master/master-config.yaml"
@@ -32,24 +36,20 @@ def validate_multipath_pod(hostname, podname, hacount, mpath=""):
     pod_nodename = out.strip()
     active_node_count = 1
     enable_node_count = hacount - 1
-    cmd = "multipath -ll %s | grep 'status=active' | wc -l" % mpath
-    ret, out, err = g.run(pod_nodename, cmd, "root")
-    if ret != 0 or out == "":
-        g.log.error("failed to exectute cmd %s on %s, err %s"
-                    % (cmd, pod_nodename, out))
-        return False
-    active_count = int(out.strip())
+    cmd = "multipath -ll %s | grep 'status=%s' | wc -l"
+    results = cmd_run_batch(
+        pod_nodename, [cmd % (mpath, 'active'), cmd % (mpath, 'enabled')])
+    for status, (ret, out, err) in zip(('active', 'enabled'), results):
+        if ret != 0 or out == "":
+            g.log.error("failed to exectute cmd %s on %s, err %s"
+                        % (cmd % (mpath, status), pod_nodename, out))
+            return False
+    active_count = int(results[0][1].strip())
     if active_node_count != active_count:
         g.log.error("active node count on %s for %s is %s and not 1"
                     % (pod_nodename, podname, active_count))
         return False
-    cmd = "multipath -ll %s | grep 'status=enabled' | wc -l" % mpath
-    ret, out, err = g.run(pod_nodename, cmd, "root")
-    if ret != 0 or out == "":
-        g.log.error("failed to exectute cmd %s on %s, err %s"
-                    % (cmd, pod_nodename, out))
-        return False
-    enable_count = int(out.strip())
+    enable_count = int(results[1][1].strip())
     if enable_node_count != enable_count:
         g.log.error("passive node count on %s for %s is %s "
                     "and not %s" % (
@@ -91,7 +91,7 @@ def enable_pvc_resize(master_node):
             raise ExecutionError(err_msg)
 
         with conn.builtin.open(MASTER_CONFIG_FILEPATH, 'r') as f:
-            data = yaml.load(f)
+            data = load_yaml(f)
             dict_add = data['admissionConfig']['pluginConfig']
             if "PersistentVolumeClaimResize" in dict_add:
                 g.log.info("master-config.yaml file is already edited")
@@ -110,7 +110,7 @@ def enable_pvc_resize(master_node):
                 value = ['ExpandPersistentVolumes=true']
                 kube_config[key]['feature-gates'] = value
         with conn.builtin.open(MASTER_CONFIG_FILEPATH, 'w+') as f:
-            yaml.dump(data, f, default_flow_style=False)
+            dump_yaml(data, f, default_flow_style=False)
     except Exception as err:
         raise ExecutionError("failed to edit master-config.yaml file "
                              "%s on %s" % (err, master_node))
@@ -218,8 +218,11 @@ def get_active_and_enabled_devices_from_mpath(node, mpath):
     cmd = ("set -o pipefail && ((multipath -ll %s | grep -A 1 status=%s)"
            " | cut -d ':' -f 4 | awk '{print $2}')")
 
-    active = cmd_run(cmd % (mpath, 'active'), node).split('\n')[1::2]
-    enabled = cmd_run(cmd % (mpath, 'enabled'), node).split('\n')[1::2]
+    (_, active, _), (_, enabled, _) = cmd_run_batch(
+        node, [cmd % (mpath, 'active'), cmd % (mpath, 'enabled')],
+        raise_on_error=True)
+    active = active.strip().split('\n')[1::2]
+    enabled = enabled.strip().split('\n')[1::2]
 
     out_dic = {
         'active': active,
@@ -1,4 +1,42 @@
+import re
+import threading
+
 from glusto.core import Glusto as g
+import six
+
+from cnslibs.common import connection_pool
+from cnslibs.common import exceptions
+from cnslibs.common import utils
+
+
+# rpyc connection serves one request at a time, so stream waiting for the
+# output of a command would block all the other users of the default
+# connection of a node. Each running stream uses own connection instance,
+# free ones are reused by the next streams. Instance 1 is the default one.
+_FREE_STREAM_INSTANCES = {}
+_STREAM_INSTANCES_COUNT = {}
+_STREAM_INSTANCES_LOCK = threading.Lock()
+
+
+def _acquire_stream_instance(hostname):
+    with _STREAM_INSTANCES_LOCK:
+        free_instances = _FREE_STREAM_INSTANCES.setdefault(hostname, [])
+        if free_instances:
+            return free_instances.pop()
+        _STREAM_INSTANCES_COUNT[hostname] = (
+            _STREAM_INSTANCES_COUNT.get(hostname, 1) + 1)
+        return _STREAM_INSTANCES_COUNT[hostname]
+
+
+def _release_stream_instance(hostname, instance, broken=False):
+    if broken:
+        try:
+            g.rpyc_close_connection(hostname, user="root", instance=instance)
+        except Exception as e:
+            g.log.debug("Failed to close rpyc connection %s of '%s' node: "
+                        "%s" % (instance, hostname, e))
+    with _STREAM_INSTANCES_LOCK:
+        _FREE_STREAM_INSTANCES[hostname].append(instance)
 
 
 def cmd_run(cmd, hostname, raise_on_error=True):
@@ -12,7 +50,7 @@ def cmd_run(cmd, hostname, raise_on_error=True):
     Returns:
         str: Stripped shell command's stdout value if not None.
     """
-    ret, out, err = g.run(hostname, cmd, "root")
+    ret, out, err = connection_pool.run(hostname, cmd, "root")
     if raise_on_error:
         msg = ("Failed to execute command '%s' on '%s' node. Got non-zero "
                "return code '%s'. Err: %s" % (cmd, hostname, ret, err))
@@ -21,3 +59,163 @@ def cmd_run(cmd, hostname, raise_on_error=True):
     out = out.strip() if out else out
 
     return out
+
+
+def cmd_run_stream(cmd, hostname, raise_on_error=True, chunk_size=65536,
+                   on_start=None):
+    """Run shell command yielding its stdout by chunks as it gets produced.
+
+    Command is started using rpyc connection of the node, so that its
+    output is never kept in memory as a whole, neither locally nor on
+    the remote side. Separate connection is used for each running
+    command, so that waiting for its output does not block the other
+    users of the node's rpyc connection. Command is run in its own
+    process group, so that
+    if generator gets closed before the command finishes, then all the
+    processes of the command, including ones of shell pipelines, get
+    killed.
+
+    Args:
+        cmd (str|list): Shell command to run on the specified hostname.
+        hostname (str): hostname where the command should be run.
+        raise_on_error (bool): defines whether we should raise exception
+                               in case command execution failed.
+        chunk_size (int): max size of a single yielded chunk.
+        on_start (callable|None): called with PID of the started command,
+            which is also ID of its process group. Allows to kill the
+            command from another thread, while generator waits for output.
+    Returns:
+        generator: chunks of the command's stdout.
+    Raises:
+        AssertionError: when command fails and 'raise_on_error' is True.
+    """
+    if not isinstance(cmd, six.string_types):
+        cmd = ' '.join(cmd)
+    instance = _acquire_stream_instance(hostname)
+    chunks = _run_stream(
+        cmd, hostname, instance, raise_on_error, chunk_size, on_start)
+    broken = False
+    try:
+        for chunk in chunks:
+            yield chunk
+    except AssertionError:
+        raise
+    except Exception:
+        # Connection may be unusable, so it does not get reused
+        broken = True
+        raise
+    finally:
+        chunks.close()
+        _release_stream_instance(hostname, instance, broken)
+
+
+def _run_stream(cmd, hostname, instance, raise_on_error, chunk_size,
+                on_start):
+    conn = g.rpyc_get_connection(hostname, user="root", instance=instance)
+    if conn is None:
+        raise exceptions.ExecutionError(
+            "Failed to get rpyc connection of node %s" % hostname)
+    subprocess, os = conn.modules.subprocess, conn.modules.os
+    err_file = conn.modules.tempfile.TemporaryFile()
+    # NOTE: 'os.setsid' of the remote side is passed, so that it gets
+    # called in the forked remote process.
+    proc = subprocess.Popen(
+        cmd, shell=True, stdout=subprocess.PIPE, stderr=err_file,
+        preexec_fn=os.setsid)
+    try:
+        if on_start is not None:
+            on_start(proc.pid)
+        fd = proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        ret = proc.wait()
+        if raise_on_error and ret != 0:
+            err_file.seek(0)
+            msg = ("Failed to execute command '%s' on '%s' node. Got non-zero "
+                   "return code '%s'. Err: %s" % (
+                       cmd, hostname, ret, err_file.read()))
+            assert ret == 0, msg
+    finally:
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, conn.modules.signal.SIGKILL)
+            except OSError:
+                # Process group is gone already
+                pass
+            proc.wait()
+        proc.stdout.close()
+        err_file.close()
+
+
+def _build_batch_script(cmds, marker):
+    """Build shell script which runs each command framed by markers.
+
+    Each command runs in a subshell, so that 'exit' or 'set' calls in one
+    command do not affect the others.
+    """
+    script = []
+    for i, cmd in enumerate(cmds):
+        if not isinstance(cmd, six.string_types):
+            cmd = ' '.join(cmd)
+        script.append(
+            "echo %(m)s:begin:%(i)d; echo %(m)s:begin:%(i)d >&2\n"
+            "(\n%(cmd)s\n)\n"
+            "__cns_rc=$?\n"
+            "echo; echo %(m)s:end:%(i)d:$__cns_rc; "
+            "echo >&2; echo %(m)s:end:%(i)d >&2" % {
+                'm': marker, 'i': i, 'cmd': cmd})
+    return "\n".join(script)
+
+
+def cmd_run_batch(hostname, cmds, raise_on_error=False):
+    """Run several shell commands on a node in a single remote call.
+
+    Commands are run one by one, in the same order as provided,
+    independently of return codes of the previous ones.
+
+    Args:
+        hostname (str): hostname where Glusto should run specified commands.
+        cmds (list): list of shell commands to run.
+        raise_on_error (bool): defines whether we should raise exception
+                               in case any of commands failed.
+    Returns:
+        list: list of (ret, out, err) tuples, one per command.
+    Raises:
+        exceptions.ExecutionError: when output of some command is missing,
+            for example in case of connection failure.
+    """
+    if not cmds:
+        return []
+    marker = "__cns_batch_%s" % utils.get_random_str()
+    script = _build_batch_script(cmds, marker)
+    ret, out, err = connection_pool.run(hostname, script, "root")
+
+    out_re = re.compile(
+        r"^%(m)s:begin:(\d+)\n(.*?)\n%(m)s:end:\1:(\d+)$" % {'m': marker},
+        re.S | re.M)
+    err_re = re.compile(
+        r"^%(m)s:begin:(\d+)\n(.*?)\n%(m)s:end:\1$" % {'m': marker},
+        re.S | re.M)
+    outs = {int(i): (int(rc), data) for i, data, rc in out_re.findall(
+        out or '')}
+    errs = {int(i): data for i, data in err_re.findall(err or '')}
+
+    results = []
+    for i, cmd in enumerate(cmds):
+        if i not in outs:
+            msg = ("Failed to get result of '%s' command run in batch on "
+                   "'%s' node. Got return code '%s'. Out: %s Err: %s" % (
+                       cmd, hostname, ret, out, err))
+            raise exceptions.ExecutionError(msg)
+        cmd_ret, cmd_out = outs[i]
+        cmd_err = errs.get(i, '')
+        if raise_on_error:
+            msg = ("Failed to execute command '%s' on '%s' node. Got non-zero "
+                   "return code '%s'. Err: %s" % (
+                       cmd, hostname, cmd_ret, cmd_err))
+            assert cmd_ret == 0, msg
+        results.append((cmd_ret, cmd_out, cmd_err))
+    return results
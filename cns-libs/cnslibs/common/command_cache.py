@@ -0,0 +1,352 @@
+"""Short-lived cache of the read-only remote commands.
+
+Tests repeat the same read-only queries, like 'oc get pvc ...',
+'heketi-cli topology info' or 'gluster volume list', lots of times.
+This module classifies commands run via the connection pool as read-only
+or mutating ones. Successful results of the read-only commands are reused
+within the configured time window. Each mutating command invalidates
+cached results related to the resource types it touches, so that, for
+example, 'oc delete pvc' drops cached 'oc get pvc', 'oc get pv',
+'heketi-cli' and 'gluster' results. Commands which can not be classified
+and switches of the 'oc' project invalidate the whole cache. Cached
+results are also keyed by the current 'oc' project of a host.
+
+Mutating commands run directly via 'g.run', bypassing the pool, are
+noticed too while 'g.run' is wrapped by the hook invalidating the cache.
+'BaseClass' installs the hook for the time of each test class when
+caching is enabled:
+
+    hook = command_cache.install_run_hook()
+    ...
+    command_cache.uninstall_run_hook(hook)
+
+Read-only 'curl' requests neither invalidate the cache nor get cached,
+so that the sampled metrics are always fresh.
+
+Caching is disabled by default. It gets enabled by defining the window
+size in seconds in the 'common' section of the config file:
+
+    common:
+        command_cache:
+            ttl: 5
+"""
+
+import threading
+import time
+
+from glusto.core import Glusto as g
+import six
+
+from cnslibs.common import command_stats
+
+
+CACHE = None
+_CACHE_LOCK = threading.Lock()
+_RUN_HOOK_LOCK = threading.Lock()
+
+READ_ONLY = "read-only"
+MUTATING = "mutating"
+# Read-only commands, results of which should never be reused
+UNCACHEABLE = "uncacheable"
+# Special resource name meaning that all the cached results are affected
+ALL_RESOURCES = "*"
+# Heketi and Gluster represent the same storage, so they change together
+_STORAGE_RESOURCES = ("heketi", "gluster")
+_READ_ONLY_OC_VERBS = ("get", "describe")
+_READ_ONLY_SUBCOMMANDS = ("info", "list", "status")
+_OC_RESOURCE_ALIASES = {
+    "persistentvolumeclaim": "pvc",
+    "persistentvolume": "pv",
+    "storageclass": "sc",
+    "po": "pod",
+    "ev": "event",
+    "no": "node",
+    "deploymentconfig": "dc",
+    "service": "svc",
+    "ep": "endpoints",
+    "endpoint": "endpoints",
+    "project": "namespace",
+    "ns": "namespace",
+}
+# Resource types, changes of which lead to changes of the other ones
+_OC_RESOURCE_DEPENDENCIES = {
+    "pvc": ("pvc", "pv", "event") + _STORAGE_RESOURCES,
+    "pv": ("pv", "pvc", "event") + _STORAGE_RESOURCES,
+    "sc": ("sc", "pvc", "pv", "event") + _STORAGE_RESOURCES,
+    "pod": ("pod", "dc", "endpoints", "event"),
+    "dc": ("dc", "pod", "endpoints", "event"),
+    "node": ("node", "pod", "event"),
+}
+# 'curl' options which make it send data
+_CURL_DATA_OPTIONS = (
+    "-d", "--data", "--data-ascii", "--data-binary", "--data-raw",
+    "--data-urlencode", "-F", "--form", "--form-string", "-T",
+    "--upload-file")
+# Shell syntax which allows to run several commands
+_COMPOUND_COMMAND_CHARS = (";", "&", "||", ">", "`", "$(", "\n")
+
+
+def _get_oc_resource(name):
+    if name is None:
+        return None
+    if name not in _OC_RESOURCE_ALIASES and name.endswith('s'):
+        name = name[:-1]
+    return "oc:" + _OC_RESOURCE_ALIASES.get(name, name)
+
+
+def _get_switched_project(command):
+    """Get name of a project the 'oc' command switches to, if any."""
+    if not isinstance(command, six.string_types):
+        command = ' '.join(str(token) for token in command)
+    tokens = [token for token in command.split()
+              if not token.startswith('-')]
+    if tokens[:2] in (['oc', 'project'], ['oc', 'new-project']):
+        return tokens[2] if len(tokens) > 2 else None
+    return None
+
+
+def _is_read_only_curl(tokens):
+    """Check whether 'curl' command makes GET or HEAD requests only."""
+    method = "GET"
+    for i, token in enumerate(tokens):
+        option = token.split('=')[0]
+        if option in _CURL_DATA_OPTIONS or (
+                option.startswith("-d") and not option.startswith("--")):
+            return False
+        if token in ("-X", "--request"):
+            method = tokens[i + 1] if i + 1 < len(tokens) else ""
+        elif token.startswith("-X"):
+            method = token[2:]
+        elif token.startswith("--request="):
+            method = token.split('=', 1)[1]
+    return method.strip("'\"").upper() in ("GET", "HEAD")
+
+
+def classify_command(command):
+    """Get kind of a command and resource types it touches.
+
+    Args:
+        command (str|list): command to classify.
+    Returns:
+        tuple: 'read-only', 'mutating' or 'uncacheable' kind and tuple of
+            resource names. Resource names of OCP objects have 'oc:'
+            prefix, like 'oc:pvc'.
+    """
+    if not isinstance(command, six.string_types):
+        command = ' '.join(str(token) for token in command)
+    if any(char in command for char in _COMPOUND_COMMAND_CHARS):
+        return MUTATING, (ALL_RESOURCES, )
+    words = command_stats.get_command_class(command).split()
+    program = words[0] if words else None
+
+    if program == 'oc' and words[1:2] in (['project'], ['new-project']):
+        if _get_switched_project(command) or words[1] == 'new-project':
+            return MUTATING, (ALL_RESOURCES, )
+        # 'oc project' and 'oc project -q' just show the current project
+        return READ_ONLY, (_get_oc_resource('project'), )
+    if program == 'oc' and words[1:2] == ['get'] and (
+            '--raw' in command.split()):
+        return UNCACHEABLE, ()
+    if program == 'oc' and len(words) > 1:
+        resource = _get_oc_resource(words[2] if len(words) > 2 else None)
+        if words[1] in _READ_ONLY_OC_VERBS and resource:
+            return READ_ONLY, (resource, )
+        if resource is None:
+            return MUTATING, (ALL_RESOURCES, )
+        return MUTATING, tuple(
+            r if r in _STORAGE_RESOURCES else _get_oc_resource(r)
+            for r in _OC_RESOURCE_DEPENDENCIES.get(
+                resource[3:], (resource[3:], )))
+    if program == 'curl' and _is_read_only_curl(command.split()[1:]):
+        return UNCACHEABLE, ()
+    if program in ('heketi-cli', 'gluster', 'gluster-block'):
+        if len(words) > 1 and words[-1] in _READ_ONLY_SUBCOMMANDS:
+            resource = 'heketi' if program == 'heketi-cli' else 'gluster'
+            return READ_ONLY, (resource, )
+        return MUTATING, _STORAGE_RESOURCES
+    return MUTATING, (ALL_RESOURCES, )
+
+
+class _CacheEntry(object):
+
+    def __init__(self, result, resources, expires_at):
+        self.result = result
+        self.resources = resources
+        self.expires_at = expires_at
+
+
+class CommandCache(object):
+    """Cache of the read-only commands results.
+
+    Args:
+        ttl (int|float): seconds for which results are reused.
+            Zero value disables caching.
+    """
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self._entries = {}
+        # Incremented on each invalidation, so that results of the commands
+        # started before a mutation are not cached after it.
+        self._generation = 0
+        # Current 'oc' projects keyed by hosts, if they were switched
+        self._projects = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def invalidate(self, resources=(ALL_RESOURCES, )):
+        """Drop cached results related to any of the resources."""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            if ALL_RESOURCES in resources:
+                self._entries.clear()
+                return
+            for key, entry in list(self._entries.items()):
+                if set(entry.resources).intersection(resources):
+                    del self._entries[key]
+
+    def run(self, host, command, func, *args, **kwargs):
+        """Call function running a command, reusing its cached result.
+
+        Args:
+            host (str): host the command is run on.
+            command (str|list): the command.
+            func (callable): function which runs the command and returns
+                a tuple of its return code, stdout, and stderr.
+        Returns:
+            Result of the function.
+        """
+        if not self.ttl:
+            return func(*args, **kwargs)
+        kind, resources = classify_command(command)
+        if kind == MUTATING:
+            return self.run_mutating(
+                host, command, resources, func, *args, **kwargs)
+        if kind == UNCACHEABLE:
+            return func(*args, **kwargs)
+
+        key = (host, self._projects.get(host),
+               command if isinstance(command, six.string_types)
+               else tuple(command))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > time.time():
+                self._stats['hits'] += 1
+                return entry.result
+            self._stats['misses'] += 1
+            generation = self._generation
+        result = func(*args, **kwargs)
+        if result[0] == 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = _CacheEntry(
+                        result, resources, time.time() + self.ttl)
+        return result
+
+    def run_mutating(self, host, command, resources, func, *args, **kwargs):
+        """Call function running a mutating command, invalidating cache.
+
+        Args:
+            host (str): host the command is run on.
+            command (str|list): the command.
+            resources (tuple): resource names the command touches.
+            func (callable): function which runs the command.
+        Returns:
+            Result of the function.
+        """
+        self.invalidate(resources)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            project = _get_switched_project(command)
+            if project:
+                with self._lock:
+                    self._projects[host] = project
+            self.invalidate(resources)
+
+    def get_stats(self):
+        """Get hit/miss counters of the cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+def get_cache():
+    """Get cache instance shared by all the command runners.
+
+    Cache gets created on the first call using options from the
+    'common.command_cache' config section.
+
+    Returns:
+        CommandCache object instance.
+    """
+    global CACHE
+    with _CACHE_LOCK:
+        if CACHE is None:
+            cache_config = g.config.get("common", {}).get(
+                "command_cache", {}) or {}
+            CACHE = CommandCache(**cache_config)
+    return CACHE
+
+
+class _InvalidatingRun(object):
+    """Wrapper of 'g.run' which invalidates cache on mutating commands.
+
+    NOTE: it is a callable object and not a function, so that it does not
+    become a method when being assigned to the 'Glusto' class attribute.
+    """
+
+    def __init__(self, cache, orig_run):
+        self.cache = cache
+        self.orig_run = orig_run
+        self.enabled = True
+
+    def __call__(self, host, command, *args, **kwargs):
+        kind, resources = classify_command(command)
+        if not self.enabled or kind != MUTATING:
+            return self.orig_run(host, command, *args, **kwargs)
+        return self.cache.run_mutating(
+            host, command, resources, self.orig_run,
+            host, command, *args, **kwargs)
+
+
+def install_run_hook():
+    """Make mutating commands run directly via 'g.run' invalidate the cache.
+
+    Hooks left installed on top of 'g.run', e.g. because of failed test
+    class setup, are removed first.
+
+    Returns:
+        Installed hook, which should be passed to 'uninstall_run_hook',
+        or None if caching is disabled.
+    """
+    cache = get_cache()
+    if not cache.ttl:
+        return None
+    with _RUN_HOOK_LOCK:
+        while isinstance(g.run, _InvalidatingRun):
+            g.run.enabled = False
+            g.run = g.run.orig_run
+        hook = _InvalidatingRun(cache, g.run)
+        g.run = hook
+    return hook
+
+
+def uninstall_run_hook(hook):
+    """Remove hook installed by 'install_run_hook'.
+
+    If 'g.run' was replaced after the hook installation and not restored,
+    then the hook is disabled only, staying in the chain of the wrappers,
+    so that the code which replaced 'g.run' can still restore it.
+
+    Args:
+        hook: value returned by 'install_run_hook'.
+    """
+    if hook is None:
+        return
+    with _RUN_HOOK_LOCK:
+        hook.enabled = False
+        if g.run is hook:
+            g.run = hook.orig_run
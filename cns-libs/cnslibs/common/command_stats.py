@@ -0,0 +1,331 @@
+"""Latency statistics of the remote commands.
+
+Each remote command run by the library gets timed and is accounted in
+the histogram of its command class, where the class is the tool name
+with its subcommands, for example 'oc get pvc', 'heketi-cli volume create'
+or 'gluster v info'. Wrappers like 'oc rsh <pod>' and 'oc exec <pod> --'
+are skipped, so commands run in pods are classified by what they run.
+Values of the credential options, like 'heketi-cli --secret <key>',
+are replaced with '<redacted>' in the stored slowest commands.
+
+Histograms use buckets with 2 significant digits of precision, the same
+way HDR histograms do, so memory usage does not depend on amount of
+recorded values and percentiles have relative error less than 10%.
+
+Usage example:
+
+    from cnslibs.common import command_stats
+
+    stats = command_stats.get_stats()
+    report = stats.get_report()
+    # {'heketi-cli volume create': {'count': 10, 'p50': 2.1, ...}, ...}
+    print(stats.format_slowest_commands(10))
+    stats.dump_json("/tmp/command_stats.json")
+
+Options may be defined in the 'common' section of the config file.
+If 'dump_path' is defined, then JSON report gets written to it at exit:
+
+    common:
+        command_stats:
+            top_n: 20
+            dump_path: /tmp/command_stats.json
+"""
+
+import atexit
+import heapq
+import json
+import math
+import re
+import threading
+import time
+
+from glusto.core import Glusto as g
+import six
+
+
+STATS = None
+_STATS_LOCK = threading.Lock()
+_LOCAL = threading.local()
+# Options of the CLI tools which are followed by a separate value.
+# They are skipped, so that values do not get treated as subcommands.
+_VALUE_OPTIONS = frozenset((
+    '-s', '--server', '--user', '--secret', '-o', '--output',
+    '-n', '--namespace', '-l', '--selector', '-c', '--container',
+))
+_SUBCOMMAND_DEPTH = {
+    'oc': 2,
+    'heketi-cli': 2,
+    'gluster': 2,
+    'gluster-block': 1,
+    'systemctl': 1,
+}
+_SHELL_OPERATORS = frozenset(('|', '||', '&&', ';', '>', '>>', '<'))
+# Credential options and env vars, whose values are not stored
+_SECRET_RE = re.compile(
+    r"""((?:--secret|--user|--password|--token|HEKETI_CLI_KEY|"""
+    r"""HEKETI_CLI_USER)(?:=|\s+))('[^']*'|"[^"]*"|[^\s'"]+)""")
+_REDACTED = '<redacted>'
+
+
+def redact_command(command):
+    """Replace values of the credential options in a command.
+
+    Args:
+        command (str): command to redact.
+    Returns:
+        str: command with '<redacted>' instead of the credential values,
+            like 'heketi-cli --secret <redacted> volume list'.
+    """
+    return _SECRET_RE.sub(
+        lambda match: match.group(1) + _REDACTED, command)
+
+
+def get_command_class(command):
+    """Get class of a command to aggregate its statistics by.
+
+    Args:
+        command (str|list): command to classify.
+    Returns:
+        str: tool name with its subcommands, like 'heketi-cli volume list'.
+    """
+    if isinstance(command, six.string_types):
+        if '\n' in command.strip():
+            return 'script'
+        tokens = command.split()
+    else:
+        tokens = [str(token) for token in command]
+
+    # Skip wrappers used for running commands in pods
+    if tokens[:2] == ['oc', 'rsh'] and len(tokens) > 3:
+        tokens = tokens[3:]
+    elif tokens[:2] == ['oc', 'exec'] and '--' in tokens:
+        tokens = tokens[tokens.index('--') + 1:]
+    if not tokens:
+        return ''
+
+    program = tokens[0].split('/')[-1]
+    depth = _SUBCOMMAND_DEPTH.get(program, 0)
+    words, skip_next = [program], False
+    for token in tokens[1:]:
+        if len(words) > depth or token in _SHELL_OPERATORS:
+            break
+        if skip_next:
+            skip_next = False
+        elif token.startswith('-'):
+            skip_next = token in _VALUE_OPTIONS
+        elif token.replace('-', '').isalpha() and token.islower():
+            words.append(token)
+        else:
+            break
+    return ' '.join(words)
+
+
+class LatencyHistogram(object):
+    """Histogram of durations with constant relative precision."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._buckets = {}
+
+    @staticmethod
+    def _get_bucket(value):
+        """Round value up keeping 2 significant digits."""
+        if value <= 0:
+            return 0.0
+        step = 10 ** (math.floor(math.log10(value)) - 1)
+        return round(math.ceil(round(value / step, 6)) * step, 9)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = self._get_bucket(value)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def get_percentile(self, percentile):
+        """Get upper bound of the bucket with the given percentile."""
+        if not self.count:
+            return None
+        threshold = self.count * percentile / 100.0
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= threshold:
+                return min(bucket, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.get_percentile(50),
+            'p90': self.get_percentile(90),
+            'p99': self.get_percentile(99),
+            'buckets': sorted(self._buckets.items()),
+        }
+
+
+class _CommandClassStats(object):
+    """Statistics of a single command class."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.output_bytes = 0
+        self.return_codes = {}
+
+    def to_dict(self):
+        data = self.latency.to_dict()
+        data['output_bytes'] = self.output_bytes
+        data['return_codes'] = dict(
+            (str(ret), count) for ret, count in self.return_codes.items())
+        return data
+
+
+class CommandStats(object):
+    """Collects statistics of the remote commands.
+
+    Args:
+        top_n (int): amount of the slowest commands to remember.
+    """
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        self._classes = {}
+        self._slowest = []
+        self._lock = threading.Lock()
+
+    def record(self, host, command, duration, ret, out, err):
+        """Account a finished command.
+
+        Args:
+            host (str): host the command was run on.
+            command (str|list): the command.
+            duration (float): wall time of the command in seconds.
+            ret (int): return code of the command.
+            out (str): stdout of the command.
+            err (str): stderr of the command.
+        """
+        cmd_class = get_command_class(command)
+        if not isinstance(command, six.string_types):
+            command = ' '.join(str(token) for token in command)
+        command = redact_command(command)
+        with self._lock:
+            stats = self._classes.get(cmd_class)
+            if stats is None:
+                stats = self._classes[cmd_class] = _CommandClassStats()
+            stats.latency.add(duration)
+            stats.output_bytes += len(out or '') + len(err or '')
+            stats.return_codes[ret] = stats.return_codes.get(ret, 0) + 1
+            item = (duration, host, command, ret)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, item)
+            elif item > self._slowest[0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def reset(self):
+        with self._lock:
+            self._classes, self._slowest = {}, []
+
+    def get_report(self):
+        """Get statistics of all the command classes.
+
+        Returns:
+            dict: statistics keyed by command class.
+        """
+        with self._lock:
+            return dict(
+                (cmd_class, stats.to_dict())
+                for cmd_class, stats in self._classes.items())
+
+    def get_slowest_commands(self, limit=None):
+        """Get the slowest commands, starting from the slowest one.
+
+        Returns:
+            list: list of (duration, host, command, ret) tuples.
+        """
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        return slowest[:limit] if limit else slowest
+
+    def format_slowest_commands(self, limit=None):
+        """Get human readable report of the slowest commands."""
+        lines = ["%9s %5s  %-16s %s" % ("seconds", "rc", "host", "command")]
+        for duration, host, command, ret in self.get_slowest_commands(limit):
+            lines.append("%9.3f %5s  %-16s %s" % (
+                duration, ret, host, command))
+        return "\n".join(lines)
+
+    def dump_json(self, path):
+        """Write statistics of the command classes to the JSON file."""
+        data = {
+            'command_classes': self.get_report(),
+            'slowest_commands': [
+                {'duration': duration, 'host': host, 'command': command,
+                 'ret': ret}
+                for duration, host, command, ret in (
+                    self.get_slowest_commands())],
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+
+def _dump_at_exit(stats, path):
+    try:
+        stats.dump_json(path)
+    except Exception as e:
+        g.log.error("Failed to dump command stats to '%s': %s" % (path, e))
+
+
+def get_stats():
+    """Get statistics instance shared by all the command runners.
+
+    Statistics instance gets created on the first call using options from
+    the 'common.command_stats' config section.
+
+    Returns:
+        CommandStats object instance.
+    """
+    global STATS
+    with _STATS_LOCK:
+        if STATS is None:
+            stats_config = dict(g.config.get("common", {}).get(
+                "command_stats", {}) or {})
+            dump_path = stats_config.pop("dump_path", None)
+            STATS = CommandStats(**stats_config)
+            if dump_path:
+                atexit.register(_dump_at_exit, STATS, dump_path)
+    return STATS
+
+
+def timed_run(host, command, func, *args, **kwargs):
+    """Call function running a command and record its duration.
+
+    Nested calls in the same thread, like glusto's run method patched by
+    'podcmd.GlustoPod' and called by the connection pool, are recorded
+    only once by the outermost call.
+
+    Args:
+        host (str): host the command is run on.
+        command (str|list): the command.
+        func (callable): function which runs the command and returns
+            a tuple of its return code, stdout, and stderr.
+    Returns:
+        Result of the function.
+    """
+    if getattr(_LOCAL, 'active', False):
+        return func(*args, **kwargs)
+    _LOCAL.active = True
+    start = time.time()
+    try:
+        ret, out, err = func(*args, **kwargs)
+    finally:
+        _LOCAL.active = False
+    get_stats().record(host, command, time.time() - start, ret, out, err)
+    return ret, out, err
@@ -0,0 +1,319 @@
+"""Pool of remote connections used by the command runners.
+
+Glusto keeps one SSH connection per (host, user) pair, but it never checks
+whether such connection is still usable, never closes idle ones and does not
+limit amount of channels opened in parallel on the same host. This module
+adds that bookkeeping on top of glusto, so that 'command.cmd_run' and
+'podcmd.run' reuse healthy connections as long as possible.
+
+Usage example:
+
+    from cnslibs.common import connection_pool
+
+    ret, out, err = connection_pool.run("10.70.46.1", "hostname", "root")
+    stats = connection_pool.get_pool().get_stats()
+    # {'hits': 41, 'misses': 1, 'hit_rate': 0.976, ...}
+
+Pool options may be defined in the 'common' section of the config file:
+
+    common:
+        connection_pool:
+            max_channels_per_host: 8
+            keepalive_interval: 60
+            idle_timeout: 600
+"""
+
+import contextlib
+import threading
+import time
+
+from glusto.core import Glusto as g
+
+from cnslibs.common import command_cache
+from cnslibs.common import command_stats
+
+
+DEFAULT_USER = "root"
+HEALTH_CHECK_CMD = "true"
+# 'ssh' returns 255 as exit code when connection itself fails
+SSH_CONNECTION_ERROR_CODE = 255
+POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+class _PoolEntry(object):
+    """State of a single (host, user) connection."""
+
+    def __init__(self):
+        self.created = time.time()
+        self.last_used = self.created
+        self.uses = 0
+
+
+class ConnectionPool(object):
+    """Keeps track of remote connections keyed by (host, user) pair.
+
+    Args:
+        max_channels_per_host (int): amount of commands which are allowed
+            to run in parallel on a single host.
+        keepalive_interval (int): seconds after which an idle connection
+            gets health-checked before being reused.
+        idle_timeout (int): seconds after which an idle connection
+            gets closed.
+    """
+
+    def __init__(self, max_channels_per_host=8, keepalive_interval=60,
+                 idle_timeout=600):
+        self.max_channels_per_host = max_channels_per_host
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        # Amounts of commands running on hosts
+        self._channels = {}
+        # Amounts of commands running using (host, user) connections
+        self._in_use = {}
+        # Limits requested by active 'channels_limit' callers
+        self._channel_limits = []
+        self._base_channels_limit = max_channels_per_host
+        self._lock = threading.Lock()
+        self._channels_cond = threading.Condition(self._lock)
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'health_check_failures': 0,
+            'reconnects': 0,
+        }
+
+    @contextlib.contextmanager
+    def _channel(self, host):
+        """Wait for a free channel of the host and hold it.
+
+        Current 'max_channels_per_host' is checked on each wait, so that
+        changes of the limit apply to the running commands too.
+        """
+        with self._channels_cond:
+            while self._channels.get(host, 0) >= self.max_channels_per_host:
+                self._channels_cond.wait()
+            self._channels[host] = self._channels.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._channels_cond:
+                self._channels[host] -= 1
+                if not self._channels[host]:
+                    del self._channels[host]
+                self._channels_cond.notify_all()
+
+    @contextlib.contextmanager
+    def channels_limit(self, max_channels_per_host):
+        """Temporarily allow more commands to run in parallel on a host.
+
+        Limit is never lowered, so that parallel callers asking for
+        different limits do not throttle each other. The highest of the
+        limits requested by active callers stays in effect until all of
+        them exit.
+
+        Args:
+            max_channels_per_host (int): required amount of commands
+                allowed to run in parallel on a single host.
+        """
+        with self._lock:
+            if not self._channel_limits:
+                self._base_channels_limit = self.max_channels_per_host
+            self._channel_limits.append(max_channels_per_host)
+            self._set_channels_limit()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._channel_limits.remove(max_channels_per_host)
+                self._set_channels_limit()
+
+    def _set_channels_limit(self):
+        """Apply the highest of the base and requested limits.
+
+        Should be called holding the lock.
+        """
+        limit = max([self._base_channels_limit] + self._channel_limits)
+        if limit != self.max_channels_per_host:
+            self.max_channels_per_host = limit
+            self._channels_cond.notify_all()
+
+    def _close(self, key):
+        """Forget about a connection and close it on the glusto side."""
+        with self._lock:
+            self._entries.pop(key, None)
+        host, user = key
+        try:
+            g.ssh_close_connection(host, user)
+        except Exception as e:
+            g.log.debug(
+                "Failed to close connection to '%s@%s': %s", user, host, e)
+
+    def evict_idle(self):
+        """Close connections which were not used for 'idle_timeout' seconds.
+
+        Connections used by running commands are never closed.
+
+        Returns:
+            int: amount of evicted connections.
+        """
+        now = time.time()
+        with self._lock:
+            idle_keys = [
+                key for key, entry in self._entries.items()
+                if not self._in_use.get(key) and
+                now - entry.last_used > self.idle_timeout]
+        for key in idle_keys:
+            self._close(key)
+            with self._lock:
+                self._stats['evictions'] += 1
+        return len(idle_keys)
+
+    def _is_healthy(self, host, user):
+        ret, _, _ = self._raw_run(host, HEALTH_CHECK_CMD, user)
+        return ret == 0
+
+    def _acquire(self, host, user):
+        """Return connection entry for the given host, reusing it if possible.
+
+        Connection is marked as used until '_release' is called.
+        """
+        self.evict_idle()
+        key = (host, user)
+        with self._lock:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            entry = self._entries.get(key)
+        if entry and time.time() - entry.last_used > self.keepalive_interval:
+            if not self._is_healthy(host, user):
+                g.log.warn("Connection to '%s@%s' failed health check, "
+                           "reconnecting." % (user, host))
+                self._close(key)
+                with self._lock:
+                    self._stats['health_check_failures'] += 1
+                entry = None
+        with self._lock:
+            if entry:
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+                entry = self._entries.setdefault(key, _PoolEntry())
+            entry.uses += 1
+        return entry
+
+    def _release(self, key):
+        with self._lock:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            entry = self._entries.get(key)
+            if entry:
+                entry.last_used = time.time()
+
+    @staticmethod
+    def _raw_run(host, command, user, log_level=None):
+        # NOTE: 'podcmd.GlustoPod' replaces 'g.run' with a function which
+        # has 'log_level' as the third positional argument, so pass
+        # arguments by keywords and 'user' only when required.
+        if user is None:
+            return g.run(host, command, log_level=log_level)
+        return g.run(host, command, user=user, log_level=log_level)
+
+    def run(self, host, command, user=None, log_level=None):
+        """Run command on a host reusing pooled connection.
+
+        Results of the read-only commands may be reused from the
+        'command_cache' module. Duration of the actually run commands
+        gets recorded by the 'command_stats' module.
+
+        Args:
+            host (str): host where command should be executed.
+            command (str|list): command to run.
+            user (str|None): user to run command as.
+            log_level (str|None): log level to be passed to glusto's run.
+        Returns:
+            A tuple of the command's return code, stdout, and stderr.
+        """
+        return command_cache.get_cache().run(
+            host, command, command_stats.timed_run,
+            host, command, self._run, host, command, user, log_level)
+
+    def _run(self, host, command, user, log_level):
+        key = (host, user or DEFAULT_USER)
+        with self._channel(host):
+            self._acquire(*key)
+            try:
+                ret, out, err = self._raw_run(
+                    host, command, user, log_level=log_level)
+                if (ret == SSH_CONNECTION_ERROR_CODE and
+                        not self._is_healthy(host, user)):
+                    # Connection was dropped on the remote side. It is
+                    # unknown whether the command was run, so only
+                    # read-only commands are retried using new connection.
+                    g.log.warn("Got connection error running '%s' on '%s', "
+                               "reconnecting." % (command, host))
+                    self._close(key)
+                    with self._lock:
+                        self._stats['reconnects'] += 1
+                        self._entries.setdefault(key, _PoolEntry())
+                    kind, _ = command_cache.classify_command(command)
+                    if kind != command_cache.MUTATING:
+                        ret, out, err = self._raw_run(
+                            host, command, user, log_level=log_level)
+            finally:
+                self._release(key)
+        return ret, out, err
+
+    def get_stats(self):
+        """Get reuse counters of the pool.
+
+        Returns:
+            dict: counters and 'hit_rate' as float value from 0 to 1.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['connections'] = len(self._entries)
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (
+            float(stats['hits']) / requests if requests else 0.0)
+        return stats
+
+    def close_all(self):
+        """Close all the pooled connections."""
+        with self._lock:
+            keys = list(self._entries.keys())
+        for key in keys:
+            self._close(key)
+
+
+def get_pool():
+    """Get pool instance shared by all the command runners.
+
+    Pool gets created on the first call using options from the
+    'common.connection_pool' config section.
+
+    Returns:
+        ConnectionPool object instance.
+    """
+    global POOL
+    with _POOL_LOCK:
+        if POOL is None:
+            pool_config = g.config.get("common", {}).get(
+                "connection_pool", {}) or {}
+            POOL = ConnectionPool(**pool_config)
+    return POOL
+
+
+def run(host, command, user=None, log_level=None):
+    """Run command on a host using the shared connection pool.
+
+    Args:
+        host (str): host where command should be executed.
+        command (str|list): command to run.
+        user (str|None): user to run command as.
+        log_level (str|None): log level to be passed to glusto's run.
+    Returns:
+        A tuple of the command's return code, stdout, and stderr.
+    """
+    return get_pool().run(host, command, user, log_level=log_level)
@@ -0,0 +1,286 @@
+"""Offline planner of the Heketi volume allocations.
+
+Tests often need to know whether a volume of some size can be created or
+expanded, or how much space is available for it. Answering that by trying
+remote operations is slow, and summing up free space by hand ignores
+the fact that bricks of a replica set are placed on different nodes.
+
+'CapacityPlanner' simulates Heketi brick placement on top of a single
+topology snapshot, without any remote calls:
+
+    from cnslibs.common.heketi_capacity import CapacityPlanner
+    from cnslibs.common.heketi_topology import TopologySnapshot
+
+    planner = CapacityPlanner(TopologySnapshot(h_node, h_url))
+    planner.get_max_volume_size()  # 41, in Gb
+    planner.can_create(10)
+    planner.can_expand(volume_id, 5)
+    planner.count_volumes(2)  # amount of 2Gb volumes which fit
+    planner.allocate(10)  # account volume created outside of the planner
+
+The model follows Heketi's allocator: volume is split into 1, 2, 4...
+replica sets until bricks fit on devices, get smaller than the minimal
+brick size or amount of sets exceeds the limit, bricks of a set are placed
+on different nodes using devices with the most free space, and each brick
+consumes space of its thin pool and thin pool metadata. It is an estimation,
+Heketi may place bricks differently, so sizes near to the limit may still
+fail to be allocated.
+"""
+
+import copy
+import math
+
+from cnslibs.common import exceptions
+
+
+GB_IN_KB = 1024 ** 2
+# LVM extent size used for rounding of the allocations
+_EXTENT_KB = 4 * 1024
+_POOL_METADATA_RATIO = 0.005
+_MAX_POOL_METADATA_KB = 16 * GB_IN_KB
+# Size of the arbiter brick per file of the data brick
+_ARBITER_KB_PER_FILE = 4
+
+
+def _round_up_to_extent(size_kb):
+    return int(math.ceil(size_kb / float(_EXTENT_KB))) * _EXTENT_KB
+
+
+def _is_arbiter_volume(volume):
+    options = volume.get("glustervolumeoptions") or []
+    return any(option.split() == ["user.heketi.arbiter", "true"]
+               for option in options)
+
+
+class CapacityPlanner(object):
+    """Simulates placement of the replica-3 and arbiter volumes bricks.
+
+    Args:
+        topology (TopologySnapshot|dict): topology snapshot or output of
+            'heketi_topology_info' with 'json=True'.
+        snapshot_factor (float): ratio of thin pool size to brick size.
+        min_brick_size_gb (int): bricks are not made smaller than it.
+        max_brick_size_gb (int): bricks are not made bigger than it.
+        average_file_size_kb (int): expected average file size, which
+            defines size of arbiter bricks.
+        max_brick_sets (int): volume is not split into more replica sets,
+            same as Heketi's 'BrickMaxNum' limit.
+    """
+
+    def __init__(self, topology, snapshot_factor=1.0, min_brick_size_gb=1,
+                 max_brick_size_gb=4096, average_file_size_kb=64,
+                 max_brick_sets=32):
+        self.snapshot_factor = snapshot_factor
+        self.min_brick_size_gb = min_brick_size_gb
+        self.max_brick_size_gb = max_brick_size_gb
+        self.max_brick_sets = max_brick_sets
+        self.average_file_size_kb = average_file_size_kb
+
+        if isinstance(topology, dict):
+            clusters = topology.get("clusters") or []
+        else:
+            clusters = topology.clusters.values()
+
+        # {cluster_id: {node_id: {device_id: [free_kb, arbiter_tag]}}}
+        self._clusters, self._volumes = {}, {}
+        for cluster in clusters:
+            nodes = self._clusters[cluster["id"]] = {}
+            for node in cluster.get("nodes") or []:
+                if node.get("state", "online").lower() != "online":
+                    continue
+                node_tag = (node.get("tags") or {}).get("arbiter")
+                devices = {}
+                for device in node.get("devices") or []:
+                    if device.get("state", "online").lower() != "online":
+                        continue
+                    devices[device["id"]] = [
+                        device["storage"]["free"],
+                        (device.get("tags") or {}).get("arbiter") or (
+                            node_tag or "supported")]
+                if devices:
+                    nodes[node["id"]] = devices
+            for volume in cluster.get("volumes") or []:
+                self._volumes[volume["id"]] = (
+                    cluster["id"], _is_arbiter_volume(volume))
+
+    def _get_brick_allocation_kb(self, brick_size_kb):
+        """Get space consumed by a brick, including its thin pool."""
+        pool_size_kb = int(brick_size_kb * self.snapshot_factor)
+        metadata_kb = min(int(pool_size_kb * _POOL_METADATA_RATIO),
+                          _MAX_POOL_METADATA_KB)
+        return (_round_up_to_extent(pool_size_kb) +
+                _round_up_to_extent(metadata_kb))
+
+    def _get_arbiter_brick_size_kb(self, brick_size_kb):
+        files = brick_size_kb / float(self.average_file_size_kb)
+        return _round_up_to_extent(files * _ARBITER_KB_PER_FILE)
+
+    @staticmethod
+    def _place_brick(nodes, used_nodes, size_kb, arbiter_tags):
+        """Pick device with the most free space on a not used node.
+
+        Returns:
+            tuple: (node_id, device_id) or None if there is no space.
+        """
+        best = None
+        for node_id, devices in nodes.items():
+            if node_id in used_nodes:
+                continue
+            for device_id, (free_kb, arbiter_tag) in devices.items():
+                if arbiter_tag not in arbiter_tags or free_kb < size_kb:
+                    continue
+                if best is None or free_kb > best[0]:
+                    best = (free_kb, node_id, device_id)
+        return best[1:] if best else None
+
+    def _place_sets(self, nodes, brick_size_kb, set_count, arbiter):
+        """Place bricks of all the sets, updating free space of devices.
+
+        Returns:
+            list: bricks as (node_id, device_id, allocated_kb) tuples
+                or None if not all of them fit.
+        """
+        data_kb = self._get_brick_allocation_kb(brick_size_kb)
+        if arbiter:
+            arbiter_kb = self._get_brick_allocation_kb(
+                self._get_arbiter_brick_size_kb(brick_size_kb))
+            # Arbiter brick is placed first to prefer 'required' devices
+            set_bricks = [(arbiter_kb, ("required", "supported")),
+                          (data_kb, ("supported", "disabled")),
+                          (data_kb, ("supported", "disabled"))]
+        else:
+            set_bricks = [(data_kb, ("supported", "disabled"))] * 3
+
+        bricks = []
+        for _ in range(set_count):
+            used_nodes = set()
+            for size_kb, arbiter_tags in set_bricks:
+                place = None
+                if arbiter_tags[0] == "required":
+                    place = self._place_brick(
+                        nodes, used_nodes, size_kb, ("required", ))
+                place = place or self._place_brick(
+                    nodes, used_nodes, size_kb, arbiter_tags)
+                if place is None:
+                    return None
+                node_id, device_id = place
+                nodes[node_id][device_id][0] -= size_kb
+                used_nodes.add(node_id)
+                bricks.append((node_id, device_id, size_kb))
+        return bricks
+
+    def _simulate(self, size_gb, arbiter=False, cluster_id=None):
+        """Find placement of bricks for the given amount of space.
+
+        Returns:
+            tuple: (cluster_id, bricks) or None if volume does not fit.
+        """
+        if size_gb <= 0:
+            raise exceptions.ExecutionError(
+                "Volume size should be positive, got '%s'." % size_gb)
+        cluster_ids = [cluster_id] if cluster_id else sorted(self._clusters)
+        for c_id in cluster_ids:
+            set_count = 1
+            while size_gb / float(set_count) > self.max_brick_size_gb:
+                set_count *= 2
+            while (size_gb / float(set_count) >= self.min_brick_size_gb and
+                   set_count <= self.max_brick_sets):
+                nodes = copy.deepcopy(self._clusters[c_id])
+                bricks = self._place_sets(
+                    nodes, size_gb * GB_IN_KB // set_count, set_count,
+                    arbiter)
+                if bricks:
+                    return c_id, bricks
+                set_count *= 2
+        return None
+
+    def can_create(self, size_gb, arbiter=False, cluster_id=None):
+        """Check whether volume of the given size can be allocated."""
+        return self._simulate(size_gb, arbiter, cluster_id) is not None
+
+    def can_expand(self, volume_id, size_gb):
+        """Check whether volume can be expanded by the given size.
+
+        Args:
+            volume_id (str): ID of a volume from the topology.
+            size_gb (int): size to add to the volume.
+        """
+        cluster_id, arbiter = self._volumes[volume_id]
+        return self.can_create(size_gb, arbiter, cluster_id)
+
+    def allocate(self, size_gb, arbiter=False, cluster_id=None):
+        """Account allocation of a volume in the free space of devices.
+
+        Returns:
+            list: bricks as (node_id, device_id, allocated_kb) tuples.
+        Raises:
+            exceptions.ExecutionError: if volume does not fit.
+        """
+        placement = self._simulate(size_gb, arbiter, cluster_id)
+        if placement is None:
+            raise exceptions.ExecutionError(
+                "Not enough space for '%s'Gb %svolume." % (
+                    size_gb, "arbiter " if arbiter else ""))
+        cluster_id, bricks = placement
+        for node_id, device_id, size_kb in bricks:
+            self._clusters[cluster_id][node_id][device_id][0] -= size_kb
+        return bricks
+
+    def get_max_volume_size(self, arbiter=False, cluster_id=None):
+        """Get size of the largest volume which can be created.
+
+        Sizes are checked one by one starting from the largest possible
+        one, because fitting is not monotonic: bigger volume may be split
+        into more replica sets, which fit while fewer bigger bricks of
+        a smaller volume do not. So binary search could miss the answer.
+
+        Returns:
+            int: size in Gb, 0 if even minimal volume does not fit.
+        """
+        total_free_gb = sum(
+            free_kb
+            for c_id, nodes in self._clusters.items()
+            if cluster_id in (None, c_id)
+            for devices in nodes.values()
+            for free_kb, _ in devices.values()) // GB_IN_KB
+        # Data is stored twice for arbiter volumes and thrice otherwise.
+        # Splitting volume into more bricks never consumes less space than
+        # a single brick, so the largest size for which the copies of such
+        # brick fit is an upper bound. It grows with size monotonically,
+        # so is found using binary search.
+        total_free_kb = total_free_gb * GB_IN_KB
+        copies = 2 if arbiter else 3
+        low, high = 0, int(total_free_gb)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if copies * self._get_brick_allocation_kb(
+                    middle * GB_IN_KB) <= total_free_kb:
+                low = middle
+            else:
+                high = middle - 1
+        for size_gb in range(low, 0, -1):
+            if self.can_create(size_gb, arbiter, cluster_id):
+                return size_gb
+        return 0
+
+    def count_volumes(self, size_gb, arbiter=False, cluster_id=None,
+                      limit=None):
+        """Get amount of volumes of the given size which fit together.
+
+        Planner state is not changed.
+
+        Args:
+            size_gb (int): size of each of the volumes.
+            limit (int|None): stop counting after reaching this amount.
+        Returns:
+            int: amount of volumes.
+        """
+        planner = copy.deepcopy(self)
+        count = 0
+        while limit is None or count < limit:
+            try:
+                planner.allocate(size_gb, arbiter, cluster_id)
+            except exceptions.ExecutionError:
+                break
+            count += 1
+        return count
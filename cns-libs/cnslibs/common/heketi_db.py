@@ -0,0 +1,319 @@
+"""Offline analyzer of the Heketi DB exports.
+
+Heketi DB export is a JSON file made by the 'heketi db export' command:
+
+    heketi db export --dbfile /var/lib/heketi/heketi.db \\
+        --jsonfile /tmp/heketi-db.json
+
+It contains all the entities Heketi knows about, so state inconsistencies,
+like leaked bricks, can be found without lots of remote info calls.
+
+Usage example:
+
+    from cnslibs.common import heketi_db
+
+    db = heketi_db.load_db_export("/tmp/heketi-db.json")
+    db.get_orphaned_bricks()
+    # [(<Brick 2c4e...>, ['volume is absent']), ...]
+    db.get_device_usage()["9a1f..."]
+    # {'total': 104722432, 'used': 2113536, 'bricks_size': 2113536, ...}
+    db.get_block_hosting_volumes_fill()
+
+Only fields needed for the analysis are kept, in objects with '__slots__'
+and with interned IDs, so exports with tens of thousands of bricks are
+loaded fast and do not take lots of memory.
+"""
+
+import gzip
+import json
+
+import six
+from six.moves import intern
+
+
+def _intern(value):
+    return intern(str(value)) if value else value
+
+
+def _is_pending(entry):
+    return bool((entry.get("Pending") or {}).get("Id"))
+
+
+class Cluster(object):
+    __slots__ = ("id", "nodes", "volumes", "block_volumes")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        self.id = _intern(info["id"])
+        self.nodes = tuple(_intern(i) for i in info.get("nodes") or [])
+        self.volumes = tuple(_intern(i) for i in info.get("volumes") or [])
+        self.block_volumes = tuple(
+            _intern(i) for i in info.get("blockvolumes") or [])
+
+
+class Node(object):
+    __slots__ = ("id", "cluster", "state", "hostname", "devices")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        self.id = _intern(info["id"])
+        self.cluster = _intern(info.get("cluster"))
+        self.state = entry.get("State")
+        self.hostname = ((info.get("hostnames") or {}).get("manage") or [
+            None])[0]
+        self.devices = tuple(_intern(i) for i in entry.get("Devices") or [])
+
+
+class Device(object):
+    __slots__ = ("id", "node", "name", "state", "total", "free", "used",
+                 "bricks", "pending")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        storage = info.get("storage") or {}
+        self.id = _intern(info["id"])
+        self.node = _intern(entry.get("NodeId"))
+        self.name = info.get("name")
+        self.state = entry.get("State")
+        self.total = storage.get("total", 0)
+        self.free = storage.get("free", 0)
+        self.used = storage.get("used", 0)
+        self.bricks = tuple(_intern(i) for i in entry.get("Bricks") or [])
+        self.pending = _is_pending(entry)
+
+
+class Brick(object):
+    __slots__ = ("id", "path", "device", "node", "volume", "size",
+                 "tp_size", "pool_metadata_size", "pending")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        self.id = _intern(info["id"])
+        self.path = info.get("path")
+        self.device = _intern(info.get("device"))
+        self.node = _intern(info.get("node"))
+        self.volume = _intern(info.get("volume"))
+        self.size = info.get("size", 0)
+        self.tp_size = entry.get("TpSize", 0)
+        self.pool_metadata_size = entry.get("PoolMetadataSize", 0)
+        self.pending = _is_pending(entry)
+
+    def __repr__(self):
+        return "<Brick %s>" % self.id
+
+
+class Volume(object):
+    __slots__ = ("id", "name", "cluster", "size", "block", "free_size",
+                 "reserved_size", "block_volumes", "bricks", "pending")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        block_info = info.get("blockinfo") or {}
+        self.id = _intern(info["id"])
+        self.name = info.get("name")
+        self.cluster = _intern(info.get("cluster"))
+        self.size = info.get("size", 0)
+        self.block = bool(info.get("block"))
+        self.free_size = block_info.get("freesize", 0)
+        self.reserved_size = block_info.get("reservedsize", 0)
+        self.block_volumes = tuple(
+            _intern(i) for i in block_info.get("blockvolume") or [])
+        self.bricks = tuple(_intern(i) for i in entry.get("Bricks") or [])
+        self.pending = _is_pending(entry)
+
+
+class BlockVolume(object):
+    __slots__ = ("id", "name", "cluster", "size", "hosting_volume",
+                 "pending")
+
+    def __init__(self, entry):
+        info = entry["Info"]
+        self.id = _intern(info["id"])
+        self.name = info.get("name")
+        self.cluster = _intern(info.get("cluster"))
+        self.size = info.get("size", 0)
+        self.hosting_volume = _intern(info.get("blockhostingvolume"))
+        self.pending = _is_pending(entry)
+
+
+class PendingOperation(object):
+    __slots__ = ("id", "type", "status", "timestamp", "changes")
+
+    def __init__(self, entry):
+        self.id = _intern(entry["Id"])
+        self.type = entry.get("Type")
+        self.status = entry.get("Status")
+        self.timestamp = entry.get("Timestamp")
+        # Changes are (change type, entity ID) tuples
+        self.changes = tuple(
+            (action.get("Change"), _intern(action.get("Id")))
+            for action in entry.get("Actions") or [])
+
+
+_ENTITY_SECTIONS = (
+    ("clusters", "clusterentries", Cluster),
+    ("nodes", "nodeentries", Node),
+    ("devices", "deviceentries", Device),
+    ("bricks", "brickentries", Brick),
+    ("volumes", "volumeentries", Volume),
+    ("block_volumes", "blockvolumeentries", BlockVolume),
+    ("pending_operations", "pendingoperations", PendingOperation),
+)
+
+
+class HeketiDBExport(object):
+    """Indexed model of the Heketi DB export.
+
+    Args:
+        data (dict): parsed JSON of the Heketi DB export.
+    """
+
+    def __init__(self, data):
+        for attr, section, entity_class in _ENTITY_SECTIONS:
+            setattr(self, attr, dict(
+                (_intern(e_id), entity_class(entry))
+                for e_id, entry in six.iteritems(data.get(section) or {})))
+        self._device_bricks = None
+
+    def get_bricks_of_device(self, device_id):
+        """Get bricks which refer to the device."""
+        if self._device_bricks is None:
+            self._device_bricks = {}
+            for brick in self.bricks.values():
+                self._device_bricks.setdefault(brick.device, []).append(brick)
+        return self._device_bricks.get(device_id, [])
+
+    def get_bricks_of_volume(self, volume_id):
+        return [self.bricks[b_id] for b_id in self.volumes[volume_id].bricks
+                if b_id in self.bricks]
+
+    def get_orphaned_bricks(self, include_pending=False):
+        """Find bricks not properly referenced by volumes and devices.
+
+        Args:
+            include_pending (bool): whether or not to check bricks of
+                pending operations, which are inconsistent by nature.
+        Returns:
+            list: (Brick, list of reasons) tuples.
+        """
+        volume_bricks = set(
+            b_id for volume in self.volumes.values() for b_id in volume.bricks)
+        device_bricks = set(
+            b_id for device in self.devices.values() for b_id in device.bricks)
+        orphans = []
+        for brick in self.bricks.values():
+            if brick.pending and not include_pending:
+                continue
+            reasons = []
+            if brick.volume not in self.volumes:
+                reasons.append("volume is absent")
+            if brick.id not in volume_bricks:
+                reasons.append("not referenced by any volume")
+            if brick.device not in self.devices:
+                reasons.append("device is absent")
+            if brick.id not in device_bricks:
+                reasons.append("not referenced by any device")
+            if brick.node not in self.nodes:
+                reasons.append("node is absent")
+            if reasons:
+                orphans.append((brick, reasons))
+        return orphans
+
+    def get_missing_bricks(self):
+        """Find brick IDs referenced by volumes or devices, but absent.
+
+        Returns:
+            dict: referencing entity IDs keyed by missing brick IDs.
+        """
+        missing = {}
+        for entities in (self.volumes, self.devices):
+            for entity in entities.values():
+                for b_id in entity.bricks:
+                    if b_id not in self.bricks:
+                        missing.setdefault(b_id, []).append(entity.id)
+        return missing
+
+    def get_device_usage(self):
+        """Compare recorded device usage with sizes of its bricks.
+
+        Returns:
+            dict: usage info keyed by device ID. Sizes are in KiB.
+                Example:
+                    {'9a1f...': {'node': '2d4b...', 'name': '/dev/sdb',
+                                 'total': 104722432, 'free': 102608896,
+                                 'used': 2113536, 'bricks': 1,
+                                 'bricks_size': 2113536,
+                                 'unaccounted': 0}}
+        """
+        usage = {}
+        for device in self.devices.values():
+            bricks = self.get_bricks_of_device(device.id)
+            bricks_size = sum(
+                brick.tp_size + brick.pool_metadata_size for brick in bricks)
+            usage[device.id] = {
+                "node": device.node,
+                "name": device.name,
+                "total": device.total,
+                "free": device.free,
+                "used": device.used,
+                "bricks": len(bricks),
+                "bricks_size": bricks_size,
+                "unaccounted": device.used - bricks_size,
+            }
+        return usage
+
+    def get_block_hosting_volumes_fill(self):
+        """Get usage of the block hosting volumes by block volumes.
+
+        Returns:
+            dict: usage info keyed by volume ID. Sizes are in Gb.
+                Example:
+                    {'8b1d...': {'name': 'vol_8b1d...', 'size': 100,
+                                 'free': 95, 'reserved': 2,
+                                 'block_volumes': 3,
+                                 'block_volumes_size': 3,
+                                 'fill': 0.05}}
+        """
+        block_volumes_size = {}
+        for block_volume in self.block_volumes.values():
+            block_volumes_size[block_volume.hosting_volume] = (
+                block_volumes_size.get(block_volume.hosting_volume, 0) +
+                block_volume.size)
+        fill = {}
+        for volume in self.volumes.values():
+            if not volume.block:
+                continue
+            usable_size = volume.size - volume.reserved_size
+            fill[volume.id] = {
+                "name": volume.name,
+                "size": volume.size,
+                "free": volume.free_size,
+                "reserved": volume.reserved_size,
+                "block_volumes": len(volume.block_volumes),
+                "block_volumes_size": block_volumes_size.get(volume.id, 0),
+                "fill": (float(usable_size - volume.free_size) / usable_size
+                         if usable_size > 0 else None),
+            }
+        return fill
+
+    def get_pending_entities(self):
+        """Get IDs of entities marked as pending, keyed by entity type."""
+        pending = {}
+        for attr, _, entity_class in _ENTITY_SECTIONS:
+            if "pending" not in entity_class.__slots__:
+                continue
+            pending[attr] = sorted(
+                e_id for e_id, entity in getattr(self, attr).items()
+                if entity.pending)
+        return pending
+
+
+def load_db_export(path):
+    """Read Heketi DB export from the JSON file, gzipped or not.
+
+    Returns:
+        HeketiDBExport object instance.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return HeketiDBExport(json.loads(f.read().decode("utf-8")))
@@ -0,0 +1,269 @@
+"""Background sampler of the Heketi metrics.
+
+'heketi_ops.get_heketi_metrics' provides single snapshot of the metrics.
+'MetricsSampler' scrapes them periodically in a background thread and
+keeps the last 'size' samples of each time series in a ring buffer,
+so memory usage does not grow with duration of a test.
+
+Usage example:
+
+    from cnslibs.common.heketi_metrics import MetricsSampler
+
+    with MetricsSampler(h_node, h_url, interval=5) as sampler:
+        baseline = sampler.get_value("heketi_device_free")
+        ...  # create and delete volumes
+        sampler.sample()
+    assert sampler.get_value("heketi_device_free") == baseline
+    print(sampler.get_rate("heketi_volumes_count", window=60))
+    sampler.to_csv("/tmp/heketi_metrics.csv")
+
+Time series are identified by metric name and labels. Query methods
+accept name and optional labels filter, values of all the matching series
+are summed up per sample, so, for example, 'heketi_device_free' without
+labels means free space of all the devices and
+'get_value("heketi_device_free", hostname="node1")' means free space of
+devices of a single node.
+"""
+
+import csv
+import json
+import threading
+import time
+
+from glusto.core import Glusto as g
+
+from cnslibs.common import heketi_ops
+from cnslibs.common.prometheus import LabeledMetric
+
+
+def get_series_key(name, labels=None):
+    """Get Prometheus-style key of a time series.
+
+    Example:
+        get_series_key("heketi_device_free", {"hostname": "node1"})
+        # 'heketi_device_free{hostname="node1"}'
+    """
+    if not labels:
+        return name
+    return "%s{%s}" % (name, ",".join(
+        '%s="%s"' % (label, value) for label, value in sorted(labels.items())))
+
+
+def _iter_samples(metrics):
+    """Iterate over (name, labels, value) of parsed metrics."""
+    for name, data in metrics.items():
+        if isinstance(data, LabeledMetric):
+            for labels, value in data.iter_samples():
+                yield name, labels, value
+        else:
+            yield name, {}, data
+
+
+class RingBuffer(object):
+    """Fixed-size buffer which overwrites the oldest items when full."""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = []
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def append(self, item):
+        if len(self._items) < self.size:
+            self._items.append(item)
+        else:
+            self._items[self._pos] = item
+            self._pos = (self._pos + 1) % self.size
+
+    def items(self):
+        """Get buffered items starting from the oldest one."""
+        return self._items[self._pos:] + self._items[:self._pos]
+
+
+class _Series(object):
+
+    def __init__(self, name, labels, size):
+        self.name = name
+        self.labels = labels
+        self.points = RingBuffer(size)
+
+
+class MetricsSampler(object):
+    """Periodically scrapes Heketi metrics into ring-buffer time series.
+
+    Args:
+        heketi_client_node (str): Node on which cmd has to be executed.
+        heketi_server_url (str): Heketi server url.
+        interval (int|float): seconds between samples.
+        size (int): amount of samples to keep per time series.
+    """
+
+    def __init__(self, heketi_client_node, heketi_server_url, interval=5,
+                 size=720):
+        self.heketi_client_node = heketi_client_node
+        self.heketi_server_url = heketi_server_url
+        self.interval = interval
+        self.size = size
+        self.errors = 0
+        self.last_error = None
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Scrape metrics once and add them to the time series.
+
+        Returns:
+            float: timestamp of the sample.
+        """
+        metrics = heketi_ops.get_heketi_metrics(
+            self.heketi_client_node, self.heketi_server_url)
+        timestamp = time.time()
+        with self._lock:
+            for name, labels, value in _iter_samples(metrics):
+                key = get_series_key(name, labels)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(
+                        name, labels, self.size)
+                series.points.append((timestamp, value))
+        return timestamp
+
+    def _sample_periodically(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+                g.log.error("Failed to sample Heketi metrics: %s" % e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start sampling in the background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample_periodically, name="heketi-metrics-sampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop background sampling, keeping the collected samples."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, etype, value, tb):
+        self.stop()
+
+    def get_series_keys(self, name=None):
+        """Get keys of the known time series, optionally of a metric."""
+        with self._lock:
+            return sorted(key for key, series in self._series.items()
+                          if name is None or series.name == name)
+
+    def get_points(self, name, **labels):
+        """Get (timestamp, value) points of the matching time series.
+
+        Values of all the series of the metric matching labels filter
+        are summed up per sample.
+
+        Returns:
+            list: (timestamp, value) tuples starting from the oldest one.
+        """
+        totals = {}
+        with self._lock:
+            for series in self._series.values():
+                if series.name != name or any(
+                        series.labels.get(label) != str(value)
+                        for label, value in labels.items()):
+                    continue
+                for timestamp, value in series.points.items():
+                    totals[timestamp] = totals.get(timestamp, 0) + value
+        return sorted(totals.items())
+
+    def get_value(self, name, at=None, **labels):
+        """Get value of the latest sample or of the latest one before 'at'.
+
+        Returns:
+            float: value or None if there are no such samples.
+        """
+        value = None
+        for timestamp, point_value in self.get_points(name, **labels):
+            if at is not None and timestamp > at:
+                break
+            value = point_value
+        return value
+
+    def get_delta(self, name, start=None, end=None, **labels):
+        """Get change of the value between two moments.
+
+        Args:
+            name (str): metric name.
+            start (float|None): timestamp, the oldest sample by default.
+            end (float|None): timestamp, the latest sample by default.
+        Returns:
+            float: difference of the values or None if there are no samples.
+        """
+        points = self.get_points(name, **labels)
+        if start is not None:
+            points = [point for point in points if point[0] >= start]
+        if end is not None:
+            points = [point for point in points if point[0] <= end]
+        if not points:
+            return None
+        return points[-1][1] - points[0][1]
+
+    def get_rate(self, name, window=None, **labels):
+        """Get per-second rate of the value change.
+
+        Args:
+            name (str): metric name.
+            window (int|float|None): seconds before the latest sample to
+                calculate rate for. All the samples are used by default.
+        Returns:
+            float: rate or None if there are less than 2 samples.
+        """
+        points = self.get_points(name, **labels)
+        if window is not None and points:
+            points = [point for point in points
+                      if point[0] >= points[-1][0] - window]
+        if len(points) < 2 or points[-1][0] == points[0][0]:
+            return None
+        return (points[-1][1] - points[0][1]) / (points[-1][0] - points[0][0])
+
+    def to_dict(self):
+        """Get all the time series as {key: [[timestamp, value], ...]}."""
+        with self._lock:
+            return dict(
+                (key, [list(point) for point in series.points.items()])
+                for key, series in self._series.items())
+
+    def to_json(self, path):
+        """Write all the time series to the JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    def to_csv(self, path):
+        """Write all the time series to the CSV file.
+
+        File has 'timestamp', 'series' and 'value' columns, one row
+        per point, ordered by series key and timestamp.
+        """
+        with open(path, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(("timestamp", "series", "value"))
+            for key, points in sorted(self.to_dict().items()):
+                for timestamp, value in points:
+                    writer.writerow(("%.3f" % timestamp, key, value))
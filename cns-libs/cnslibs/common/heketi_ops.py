@@ -1,10 +1,17 @@
+import functools
+import inspect
 import json
+import math
+import time
 
 from glusto.core import Glusto as g
 
+from cnslibs.common import capability_cache
+from cnslibs.common import connection_pool
 from cnslibs.common import exceptions
+from cnslibs.common import heketi_rest
 from cnslibs.common import heketi_version
-from cnslibs.common.utils import parse_prometheus_data
+from cnslibs.common.prometheus import parse_prometheus_metrics
 
 
 def _set_heketi_global_flags(heketi_server_url, **kwargs):
@@ -31,6 +38,23 @@ def _set_heketi_global_flags(heketi_server_url, **kwargs):
     return (heketi_server_url, json_arg, secret_arg, user_arg)
 
 
+def _rest_backend_alternative(func):
+    """Serve call of the decorated function by the REST backend if possible.
+
+    See 'heketi_rest' module for details about the REST backend.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if heketi_rest.is_enabled():
+            callargs = inspect.getcallargs(func, *args, **kwargs)
+            if heketi_rest.is_supported(func.__name__, callargs):
+                rest_func = getattr(heketi_rest, func.__name__)
+                return rest_func(*args, **kwargs)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@_rest_backend_alternative
 def heketi_volume_create(heketi_client_node, heketi_server_url, size,
                          raw_cli_output=False, **kwargs):
     """Creates heketi volume with the given user options.
@@ -132,7 +156,7 @@ def heketi_volume_create(heketi_client_node, heketi_server_url, size,
                persistent_volume_arg, persistent_volume_endpoint_arg,
                persistent_volume_file_arg, redundancy_arg, replica_arg,
                snapshot_factor_arg, json_arg, secret_arg, user_arg))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -145,6 +169,7 @@ def heketi_volume_create(heketi_client_node, heketi_server_url, size,
     return out
 
 
+@_rest_backend_alternative
 def heketi_volume_info(heketi_client_node, heketi_server_url, volume_id,
                        raw_cli_output=False, **kwargs):
     """Executes heketi volume info command.
@@ -177,7 +202,7 @@ def heketi_volume_info(heketi_client_node, heketi_server_url, volume_id,
 
     cmd = "heketi-cli -s %s volume info %s %s %s %s" % (
         heketi_server_url, volume_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -193,6 +218,7 @@ def heketi_volume_info(heketi_client_node, heketi_server_url, volume_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_volume_expand(heketi_client_node, heketi_server_url, volume_id,
                          expand_size, raw_cli_output=False, **kwargs):
     """Executes heketi volume expand command.
@@ -229,7 +255,7 @@ def heketi_volume_expand(heketi_client_node, heketi_server_url, volume_id,
            "--expand-size=%s %s %s %s" % (
                heketi_server_url, volume_id, expand_size, json_arg,
                admin_key, user))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -245,6 +271,7 @@ def heketi_volume_expand(heketi_client_node, heketi_server_url, volume_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_volume_delete(heketi_client_node, heketi_server_url, volume_id,
                          raw_cli_output=False, raise_on_error=True, **kwargs):
     """Executes heketi volume delete command.
@@ -279,7 +306,7 @@ def heketi_volume_delete(heketi_client_node, heketi_server_url, volume_id,
 
     cmd = "heketi-cli -s %s volume delete %s %s %s %s" % (
         heketi_server_url, volume_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -291,6 +318,7 @@ def heketi_volume_delete(heketi_client_node, heketi_server_url, volume_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_volume_list(heketi_client_node, heketi_server_url,
                        raw_cli_output=False, **kwargs):
     """Executes heketi volume list command.
@@ -322,7 +350,7 @@ def heketi_volume_list(heketi_client_node, heketi_server_url,
 
     cmd = "heketi-cli -s %s volume list %s %s %s" % (
         heketi_server_url, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -337,6 +365,7 @@ def heketi_volume_list(heketi_client_node, heketi_server_url,
     return out
 
 
+@_rest_backend_alternative
 def heketi_topology_info(heketi_client_node, heketi_server_url,
                          raw_cli_output=False, **kwargs):
     """Executes heketi topology info command.
@@ -368,7 +397,7 @@ def heketi_topology_info(heketi_client_node, heketi_server_url,
 
     cmd = "heketi-cli -s %s topology info %s %s %s" % (
         heketi_server_url, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -383,6 +412,90 @@ def heketi_topology_info(heketi_client_node, heketi_server_url,
     return out
 
 
+def heketi_volume_catalog(heketi_client_node, heketi_server_url, **kwargs):
+    """Get records of all the heketi volumes using single topology fetch.
+
+    Args:
+        heketi_client_node (str): Node on which cmd has to be executed.
+        heketi_server_url (str): Heketi server url
+
+    Kwargs:
+        The keys, values in kwargs are:
+            - secret : (str)|None
+            - user : (str)|None
+
+    Returns:
+        dict: volume records keyed by volume IDs. Example:
+            {'8b1d...': {'id': '8b1d...', 'name': 'vol_8b1d...',
+                         'cluster': 'a3c0...', 'size': 1, 'block': False}}
+
+    Raises:
+        exceptions.ExecutionError: if command fails.
+
+    Example:
+        heketi_volume_catalog(heketi_client_node, heketi_server_url)
+    """
+    kwargs['json'] = True
+    topology = heketi_topology_info(
+        heketi_client_node, heketi_server_url, **kwargs)
+    catalog = {}
+    for cluster in topology.get('clusters') or []:
+        for volume in cluster.get('volumes') or []:
+            catalog[volume['id']] = {
+                'id': volume['id'],
+                'name': volume['name'],
+                'cluster': volume.get('cluster', cluster['id']),
+                'size': volume['size'],
+                'block': bool(volume.get('block')),
+            }
+    return catalog
+
+
+def diff_heketi_volume_catalogs(old_catalog, new_catalog):
+    """Compare two results of the 'heketi_volume_catalog' function.
+
+    Returns:
+        dict: sorted lists of IDs of 'added', 'removed' and 'changed'
+            volumes, where changed ones are volumes with any of the record
+            fields changed, like size after expansion.
+    """
+    return {
+        'added': sorted(set(new_catalog) - set(old_catalog)),
+        'removed': sorted(set(old_catalog) - set(new_catalog)),
+        'changed': sorted(
+            vol_id for vol_id, record in new_catalog.items()
+            if vol_id in old_catalog and old_catalog[vol_id] != record),
+    }
+
+
+def heketi_volume_count(heketi_client_node, heketi_server_url, **kwargs):
+    """Get amount of heketi volumes.
+
+    Uses ID-only volume list, which is much cheaper than building
+    whole catalog, so it suits polling, like waiting for volumes to settle.
+
+    Args:
+        heketi_client_node (str): Node on which cmd has to be executed.
+        heketi_server_url (str): Heketi server url
+
+    Kwargs:
+        The keys, values in kwargs are:
+            - secret : (str)|None
+            - user : (str)|None
+
+    Returns:
+        int: amount of volumes.
+
+    Raises:
+        exceptions.ExecutionError: if command fails.
+    """
+    kwargs['json'] = True
+    volumes = heketi_volume_list(
+        heketi_client_node, heketi_server_url, **kwargs)
+    return len(volumes.get('volumes') or [])
+
+
+@_rest_backend_alternative
 def hello_heketi(heketi_client_node, heketi_server_url, **kwargs):
     """Executes curl command to check if heketi server is alive.
 
@@ -409,7 +522,7 @@ def hello_heketi(heketi_client_node, heketi_server_url, **kwargs):
         heketi_server_url, **kwargs)
 
     cmd = "curl --max-time 10 %s/hello" % heketi_server_url
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -420,6 +533,7 @@ def hello_heketi(heketi_client_node, heketi_server_url, **kwargs):
     return True
 
 
+@_rest_backend_alternative
 def heketi_cluster_delete(heketi_client_node, heketi_server_url, cluster_id,
                           **kwargs):
     """Executes heketi cluster delete command.
@@ -451,7 +565,7 @@ def heketi_cluster_delete(heketi_client_node, heketi_server_url, cluster_id,
 
     cmd = "heketi-cli -s %s cluster delete %s %s %s %s" % (
         heketi_server_url, cluster_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -462,6 +576,7 @@ def heketi_cluster_delete(heketi_client_node, heketi_server_url, cluster_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_cluster_info(heketi_client_node, heketi_server_url, cluster_id,
                         **kwargs):
     """Executes heketi cluster info command.
@@ -493,7 +608,7 @@ def heketi_cluster_info(heketi_client_node, heketi_server_url, cluster_id,
 
     cmd = "heketi-cli -s %s cluster info %s %s %s %s" % (
         heketi_server_url, cluster_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -506,6 +621,7 @@ def heketi_cluster_info(heketi_client_node, heketi_server_url, cluster_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_cluster_list(heketi_client_node, heketi_server_url, **kwargs):
     """Executes heketi cluster list command.
 
@@ -535,7 +651,7 @@ def heketi_cluster_list(heketi_client_node, heketi_server_url, **kwargs):
 
     cmd = "heketi-cli -s %s cluster list %s %s %s" % (
         heketi_server_url, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -548,6 +664,7 @@ def heketi_cluster_list(heketi_client_node, heketi_server_url, **kwargs):
     return out
 
 
+@_rest_backend_alternative
 def heketi_device_add(heketi_client_node, heketi_server_url, device_name,
                       node_id, raw_cli_output=False, **kwargs):
     """Executes heketi device add command.
@@ -581,7 +698,7 @@ def heketi_device_add(heketi_client_node, heketi_server_url, device_name,
 
     cmd = "heketi-cli -s %s device add --name=%s --node=%s %s %s %s" % (
         heketi_server_url, device_name, node_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -594,6 +711,7 @@ def heketi_device_add(heketi_client_node, heketi_server_url, device_name,
     return out
 
 
+@_rest_backend_alternative
 def heketi_device_delete(heketi_client_node, heketi_server_url, device_id,
                          raw_cli_output=False, **kwargs):
     """Executes heketi device delete command.
@@ -625,7 +743,7 @@ def heketi_device_delete(heketi_client_node, heketi_server_url, device_id,
 
     cmd = "heketi-cli -s %s device delete %s %s %s %s" % (
         heketi_server_url, device_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -638,6 +756,7 @@ def heketi_device_delete(heketi_client_node, heketi_server_url, device_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_device_disable(heketi_client_node, heketi_server_url, device_id,
                           raw_cli_output=False, **kwargs):
     """Executes heketi device disable command.
@@ -669,7 +788,7 @@ def heketi_device_disable(heketi_client_node, heketi_server_url, device_id,
     cmd = "heketi-cli -s %s device disable %s %s %s %s" % (
         heketi_server_url, device_id, json_arg, admin_key, user)
 
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -682,6 +801,7 @@ def heketi_device_disable(heketi_client_node, heketi_server_url, device_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_device_enable(heketi_client_node, heketi_server_url, device_id,
                          raw_cli_output=False, **kwargs):
     """Executes heketi device enable command.
@@ -713,7 +833,7 @@ def heketi_device_enable(heketi_client_node, heketi_server_url, device_id,
     cmd = "heketi-cli -s %s device enable %s %s %s %s" % (
         heketi_server_url, device_id, json_arg, admin_key, user)
 
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -726,6 +846,7 @@ def heketi_device_enable(heketi_client_node, heketi_server_url, device_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_device_info(heketi_client_node, heketi_server_url, device_id,
                        raw_cli_output=False, **kwargs):
     """Executes heketi device info command.
@@ -758,7 +879,7 @@ def heketi_device_info(heketi_client_node, heketi_server_url, device_id,
 
     cmd = "heketi-cli -s %s device info %s %s %s %s" % (
         heketi_server_url, device_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -776,6 +897,7 @@ def heketi_device_info(heketi_client_node, heketi_server_url, device_id,
         return out
 
 
+@_rest_backend_alternative
 def heketi_device_remove(heketi_client_node, heketi_server_url, device_id,
                          raw_cli_output=False, **kwargs):
     """Executes heketi device remove command.
@@ -807,7 +929,7 @@ def heketi_device_remove(heketi_client_node, heketi_server_url, device_id,
 
     cmd = "heketi-cli -s %s device remove %s %s %s %s" % (
         heketi_server_url, device_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if raw_cli_output:
         return ret, out, err
@@ -821,6 +943,7 @@ def heketi_device_remove(heketi_client_node, heketi_server_url, device_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_node_delete(heketi_client_node, heketi_server_url, node_id,
                        **kwargs):
     """Executes heketi node delete command.
@@ -851,7 +974,7 @@ def heketi_node_delete(heketi_client_node, heketi_server_url, node_id,
 
     cmd = "heketi-cli -s %s node delete %s %s %s %s" % (
         heketi_server_url, node_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -862,6 +985,7 @@ def heketi_node_delete(heketi_client_node, heketi_server_url, node_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_node_disable(heketi_client_node, heketi_server_url, node_id,
                         **kwargs):
     """Executes heketi node disable command.
@@ -892,7 +1016,7 @@ def heketi_node_disable(heketi_client_node, heketi_server_url, node_id,
 
     cmd = "heketi-cli -s %s node disable %s %s %s %s" % (
         heketi_server_url, node_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -903,6 +1027,7 @@ def heketi_node_disable(heketi_client_node, heketi_server_url, node_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_node_enable(heketi_client_node, heketi_server_url, node_id,
                        **kwargs):
     """Executes heketi node enable command.
@@ -933,7 +1058,7 @@ def heketi_node_enable(heketi_client_node, heketi_server_url, node_id,
 
     cmd = "heketi-cli -s %s node enable %s %s %s %s" % (
         heketi_server_url, node_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -944,6 +1069,7 @@ def heketi_node_enable(heketi_client_node, heketi_server_url, node_id,
     return out
 
 
+@_rest_backend_alternative
 def heketi_node_info(heketi_client_node, heketi_server_url, node_id, **kwargs):
     """Executes heketi node info command.
 
@@ -974,7 +1100,7 @@ def heketi_node_info(heketi_client_node, heketi_server_url, node_id, **kwargs):
 
     cmd = "heketi-cli -s %s node info %s %s %s %s" % (
         heketi_server_url, node_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -987,6 +1113,7 @@ def heketi_node_info(heketi_client_node, heketi_server_url, node_id, **kwargs):
     return out
 
 
+@_rest_backend_alternative
 def heketi_node_list(heketi_client_node, heketi_server_url,
                      heketi_user=None, heketi_secret=None):
     """Execute CLI 'heketi node list' command and parse its output.
@@ -1006,7 +1133,7 @@ def heketi_node_list(heketi_client_node, heketi_server_url,
 
     cmd = "heketi-cli -s %s node list %s %s %s" % (
         heketi_server_url, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -1023,6 +1150,7 @@ def heketi_node_list(heketi_client_node, heketi_server_url,
     return heketi_node_id_list
 
 
+@_rest_backend_alternative
 def heketi_blockvolume_info(heketi_client_node, heketi_server_url,
                             block_volume_id, **kwargs):
     """Executes heketi blockvolume info command.
@@ -1054,7 +1182,7 @@ def heketi_blockvolume_info(heketi_client_node, heketi_server_url,
 
     cmd = "heketi-cli -s %s blockvolume info %s %s %s %s" % (
         heketi_server_url, block_volume_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -1067,6 +1195,7 @@ def heketi_blockvolume_info(heketi_client_node, heketi_server_url,
     return out
 
 
+@_rest_backend_alternative
 def heketi_blockvolume_create(heketi_client_node, heketi_server_url, size,
                               **kwargs):
     """Executes heketi blockvolume create
@@ -1129,7 +1258,7 @@ def heketi_blockvolume_create(heketi_client_node, heketi_server_url, size,
            "%s %s %s %s" % (heketi_server_url, str(size), auth_arg,
                             clusters_arg, ha_arg, name_arg, name_arg,
                             admin_key, user, json_arg))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -1142,6 +1271,7 @@ def heketi_blockvolume_create(heketi_client_node, heketi_server_url, size,
     return out
 
 
+@_rest_backend_alternative
 def heketi_blockvolume_delete(heketi_client_node, heketi_server_url,
                               block_volume_id, raise_on_error=True, **kwargs):
     """Executes heketi blockvolume delete command.
@@ -1176,7 +1306,7 @@ def heketi_blockvolume_delete(heketi_client_node, heketi_server_url,
 
     cmd = "heketi-cli -s %s blockvolume delete %s %s %s %s" % (
         heketi_server_url, block_volume_id, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         err_msg += "Out: %s, \nErr: %s" % (out, err)
@@ -1186,6 +1316,7 @@ def heketi_blockvolume_delete(heketi_client_node, heketi_server_url,
     return out
 
 
+@_rest_backend_alternative
 def heketi_blockvolume_list(heketi_client_node, heketi_server_url, **kwargs):
     """Executes heketi blockvolume list command.
 
@@ -1216,7 +1347,7 @@ def heketi_blockvolume_list(heketi_client_node, heketi_server_url, **kwargs):
 
     cmd = "heketi-cli -s %s blockvolume list %s %s %s" % (
         heketi_server_url, json_arg, admin_key, user)
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = (
@@ -1259,7 +1390,7 @@ def verify_volume_name_prefix(hostname, prefix, namespace, pvc_name,
     heketi_vol_name_prefix = "%s_%s_%s_" % (prefix, namespace,  pvc_name)
     cmd = "heketi-cli -s %s volume list %s %s %s | grep %s" % (
         heketi_server_url, json_arg, admin_key, user, heketi_vol_name_prefix)
-    ret, out, err = g.run(hostname, cmd, "root")
+    ret, out, err = connection_pool.run(hostname, cmd, "root")
 
     if ret != 0:
         msg = (
@@ -1272,6 +1403,7 @@ def verify_volume_name_prefix(hostname, prefix, namespace, pvc_name,
     return True
 
 
+@_rest_backend_alternative
 def set_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
              **kwargs):
     """Set any tags on Heketi node or device.
@@ -1309,7 +1441,7 @@ def set_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
 
     cmd = ("heketi-cli -s %s %s settags %s %s %s %s" %
            (heketi_server_url, source, source_id, tag, user, secret))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if not ret:
         g.log.info("Tagging of %s to %s is successful" % (source, tag))
@@ -1363,6 +1495,7 @@ def set_arbiter_tag(heketi_client_node, heketi_server_url, source,
     raise ValueError(msg)
 
 
+@_rest_backend_alternative
 def rm_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
             **kwargs):
     """Remove any kind of tags from Heketi node or device.
@@ -1398,7 +1531,7 @@ def rm_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
 
     cmd = ("heketi-cli -s %s %s rmtags %s %s %s %s" %
            (heketi_server_url, source, source_id, tag, user, secret))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if not ret:
         g.log.info("Removal of %s tag from %s is successful." % (tag, source))
@@ -1443,6 +1576,128 @@ def rm_arbiter_tag(heketi_client_node, heketi_server_url, source, source_id,
                    source, source_id, 'arbiter', **kwargs)
 
 
+def _apply_tags(heketi_client_node, heketi_server_url, source, source_id,
+                tags, touched, **kwargs):
+    """Set and remove tags of a node or device using single call per kind.
+
+    Key of the node or device is added to the 'touched' set as soon as
+    any of its tags gets changed, so the changes can be reverted even if
+    the following call fails.
+    """
+    to_set = ["%s:%s" % (name, value)
+              for name, value in sorted(tags.items()) if value is not None]
+    to_remove = [name for name, value in sorted(tags.items())
+                 if value is None]
+    if to_set:
+        set_tags(heketi_client_node, heketi_server_url, source, source_id,
+                 " ".join(to_set), **kwargs)
+        touched.add((source, source_id))
+    if to_remove:
+        rm_tags(heketi_client_node, heketi_server_url, source, source_id,
+                " ".join(to_remove), **kwargs)
+    return True
+
+
+def set_tags_bulk(heketi_client_node, heketi_server_url, tags, concurrency=8,
+                  **kwargs):
+    """Set and remove tags of lots of Heketi nodes and devices concurrently.
+
+    Current tags are read using single topology info call, only tags
+    which differ from the current ones get changed.
+
+    Args:
+        - heketi_client_node (str) : Node where we want to run our commands.
+            eg. "10.70.47.64"
+        - heketi_server_url (str) : This is a heketi server url
+            eg. "http://172.30.147.142:8080
+        - tags (dict) : tags to set per node or device. None tag value
+            means removal of a tag. Example:
+                {('node', '4f9c02...'): {'arbiter': 'disabled'},
+                 ('device', '9a1f2c...'): {'arbiter': None, 'zone': 'a'}}
+        - concurrency (int) : max amount of nodes and devices changed
+            in parallel.
+    Kwargs:
+        user (str) : username
+        secret (str) : secret for that user
+    Returns:
+        dict: undo token, which has the same format as 'tags' arg and
+            contains previous values of the changed tags. Passing it to
+            this function restores all the previous tags:
+                undo_token = set_tags_bulk(h_node, h_url, tags)
+                self.addCleanup(set_tags_bulk, h_node, h_url, undo_token)
+    Raises:
+        ValueError : when improper input data are provided.
+        NotImplementedError : when arbiter tags are changed and
+            heketi-client does not support arbiter functionality.
+        exceptions.ExecutionError : when any of the nodes or devices is not
+            found or failed to be changed. Changes made before the failure
+            are reverted.
+    """
+    for (source, source_id), new_tags in tags.items():
+        if source not in ('node', 'device'):
+            msg = ("Incorrect value we can use 'node' or 'device' instead "
+                   "of %s." % source)
+            g.log.error(msg)
+            raise ValueError(msg)
+        if new_tags.get('arbiter') not in (
+                None, 'required', 'disabled', 'supported'):
+            msg = ("Incorrect value we can use 'required', 'disabled', "
+                   "'supported' instead of %s" % new_tags['arbiter'])
+            g.log.error(msg)
+            raise ValueError(msg)
+
+    if any('arbiter' in new_tags for new_tags in tags.values()):
+        version = heketi_version.get_heketi_version(heketi_client_node)
+        if version < '6.0.0-11':
+            msg = ("heketi-client package %s does not support arbiter "
+                   "functionality" % version.v_str)
+            g.log.error(msg)
+            raise NotImplementedError(msg)
+
+    topology = heketi_topology_info(
+        heketi_client_node, heketi_server_url, json=True, **kwargs)
+    current_tags = {}
+    for cluster in topology.get('clusters') or []:
+        for node in cluster.get('nodes') or []:
+            current_tags[('node', node['id'])] = node.get('tags') or {}
+            for device in node.get('devices') or []:
+                current_tags[('device', device['id'])] = (
+                    device.get('tags') or {})
+
+    changes, undo_token = [], {}
+    for key, new_tags in tags.items():
+        if key not in current_tags:
+            msg = "Heketi %s '%s' is not found." % key
+            g.log.error(msg)
+            raise exceptions.ExecutionError(msg)
+        changed_tags = dict(
+            (name, value) for name, value in new_tags.items()
+            if current_tags[key].get(name) != value)
+        if changed_tags:
+            changes.append((key, changed_tags))
+            undo_token[key] = dict(
+                (name, current_tags[key].get(name)) for name in changed_tags)
+
+    touched = set()
+    results = _run_many(
+        heketi_client_node, _apply_tags, changes, concurrency, 0,
+        lambda change: ((heketi_client_node, heketi_server_url) + change[0] +
+                        (change[1], touched), kwargs))
+    if results['failed']:
+        touched.update(
+            item_result['item'][0]
+            for item_result in results['items'] if not item_result['error'])
+        applied = dict((key, undo_token[key]) for key in touched)
+        g.log.error("Reverting tags of %d nodes and devices" % len(applied))
+        try:
+            set_tags_bulk(heketi_client_node, heketi_server_url, applied,
+                          concurrency, **kwargs)
+        except exceptions.ExecutionError as e:
+            g.log.error("Failed to revert tags: %s" % e)
+    _check_bulk_results(results, "Failed to change tags. ", True)
+    return undo_token
+
+
 def get_heketi_metrics(heketi_client_node, heketi_server_url,
                        prometheus_format=False):
     """Execute curl command to get metrics output.
@@ -1453,6 +1708,9 @@ def get_heketi_metrics(heketi_client_node, heketi_server_url,
         - prometheus_format (bool) : control the format of output
             by default it is False, So it will parse prometheus format into
             python dict. If we need prometheus format we have to set it True.
+            Values of the metrics with labels are indexed by tuples of label
+            values sorted by label names, like
+            metrics['heketi_device_size'][cluster_id, device_name, hostname].
 
     Raises:
         exceptions.ExecutionError: if command fails.
@@ -1461,22 +1719,23 @@ def get_heketi_metrics(heketi_client_node, heketi_server_url,
         Metrics output: if successful
     """
 
-    version = heketi_version.get_heketi_version(heketi_client_node)
-    if version < '6.0.0-14':
+    if not capability_cache.has_feature('heketi_metrics',
+                                        heketi_client_node):
+        version = heketi_version.get_heketi_version(heketi_client_node)
         msg = ("heketi-client package %s does not support heketi "
                "metrics functionality" % version.v_str)
         g.log.error(msg)
         raise NotImplementedError(msg)
 
     cmd = "curl --max-time 10 %s/metrics" % heketi_server_url
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
     if ret != 0:
         msg = "failed to get Heketi metrics with following error: %s" % err
         g.log.error(msg)
         raise exceptions.ExecutionError(msg)
     if prometheus_format:
         return out.strip()
-    return parse_prometheus_data(out)
+    return parse_prometheus_metrics(out)
 
 
 def heketi_examine_gluster(heketi_client_node, heketi_server_url):
@@ -1494,8 +1753,9 @@ def heketi_examine_gluster(heketi_client_node, heketi_server_url):
         dictionary: if successful
     """
 
-    version = heketi_version.get_heketi_version(heketi_client_node)
-    if version < '8.0.0-7':
+    if not capability_cache.has_feature('heketi_examine_gluster',
+                                        heketi_client_node):
+        version = heketi_version.get_heketi_version(heketi_client_node)
         msg = ("heketi-client package %s does not support server state examine"
                " gluster" % version.v_str)
         g.log.error(msg)
@@ -1506,7 +1766,7 @@ def heketi_examine_gluster(heketi_client_node, heketi_server_url):
     # output is always json-like and we do not need to provide "--json" CLI arg
     cmd = ("heketi-cli server state examine gluster -s %s %s %s"
            % (heketi_server_url, user, secret))
-    ret, out, err = g.run(heketi_client_node, cmd)
+    ret, out, err = connection_pool.run(heketi_client_node, cmd)
 
     if ret != 0:
         msg = "failed to examine gluster with following error: %s" % err
@@ -1514,3 +1774,270 @@ def heketi_examine_gluster(heketi_client_node, heketi_server_url):
         raise exceptions.ExecutionError(msg)
 
     return json.loads(out)
+
+
+def _get_latency_percentiles(durations):
+    """Get nearest-rank percentiles of the durations of bulk operations."""
+    durations = sorted(durations)
+    if not durations:
+        return dict((key, None) for key in ('min', 'max', 'mean',
+                                            'p50', 'p90', 'p99'))
+    percentiles = dict(
+        ('p%d' % pct, durations[max(
+            int(math.ceil(len(durations) * pct / 100.0)) - 1, 0)])
+        for pct in (50, 90, 99))
+    percentiles.update({
+        'min': durations[0],
+        'max': durations[-1],
+        'mean': sum(durations) / len(durations),
+    })
+    return percentiles
+
+
+def _call_with_retries(func, retries, *args, **kwargs):
+    """Call function retrying it on failures and measure its duration.
+
+    Returns:
+        dict: 'result' or 'error' of the last attempt, amount of
+            'attempts' and 'duration' of all of them in seconds.
+    """
+    start, attempts = time.time(), 0
+    while True:
+        attempts += 1
+        try:
+            result, error = func(*args, **kwargs), None
+            break
+        except Exception as e:
+            result, error = None, e
+            if attempts > retries:
+                break
+            g.log.error("Attempt #%d of '%s' failed, retrying. Error: %s" % (
+                attempts, func.__name__, e))
+    return {'result': result, 'error': error, 'attempts': attempts,
+            'duration': time.time() - start}
+
+
+def _run_many(heketi_client_node, func, items, concurrency, retries,
+              get_args):
+    """Call function for each of the items limiting amount of parallel calls.
+
+    Args:
+        heketi_client_node (str): Node on which cmds have to be executed.
+        func (callable): heketi_ops function to call.
+        items (list): items to call the function for.
+        concurrency (int): max amount of parallel calls. Connection pool
+            limit of parallel commands per host is raised to it during
+            the calls, if it is lower.
+        retries (int): amount of retries of each of the failed calls.
+        get_args (callable): returns tuple of 'args' and 'kwargs'
+            of the call for an item.
+    Returns:
+        dict: per item results and aggregated statistics. Example:
+            {'items': [{'item': 1, 'result': {...}, 'error': None,
+                        'attempts': 1, 'duration': 2.51}, ...],
+             'count': 10, 'failed': 0, 'duration': 6.02,
+             'throughput': 1.66,  # items per second
+             'latency': {'min': 2.1, 'max': 3.4, 'mean': 2.5,
+                         'p50': 2.4, 'p90': 3.2, 'p99': 3.4}}
+    """
+    # NOTE: 'async_runner' module imports this one, so import it here to
+    # avoid circular imports.
+    from cnslibs.common import async_runner
+
+    runner = async_runner.AsyncRunner(
+        workers=concurrency, max_per_host=concurrency)
+    start = time.time()
+    try:
+        with connection_pool.get_pool().channels_limit(concurrency):
+            futures = []
+            for item in items:
+                args, kwargs = get_args(item)
+                futures.append(runner.submit(
+                    heketi_client_node, _call_with_retries, func, retries,
+                    *args, **kwargs))
+            item_results = async_runner.wait_for_results(futures)
+    finally:
+        runner.close()
+    duration = time.time() - start
+
+    for item, item_result in zip(items, item_results):
+        item_result['item'] = item
+    failed = sum(1 for item_result in item_results if item_result['error'])
+    return {
+        'items': item_results,
+        'count': len(item_results),
+        'failed': failed,
+        'duration': duration,
+        'throughput': (
+            (len(item_results) - failed) / duration if duration else None),
+        'latency': _get_latency_percentiles(
+            [item_result['duration'] for item_result in item_results]),
+    }
+
+
+def _check_bulk_results(results, err_msg, raise_on_error):
+    failures = [
+        "%s: %s" % (item_result['item'], item_result['error'])
+        for item_result in results['items'] if item_result['error']]
+    if failures:
+        err_msg += "%d of %d failed. Errors:\n%s" % (
+            len(failures), results['count'], "\n".join(failures))
+        g.log.error(err_msg)
+        if raise_on_error:
+            raise exceptions.ExecutionError(err_msg)
+    return results
+
+
+def _create_many(heketi_client_node, heketi_server_url, create_func,
+                 delete_func, sizes, concurrency, retries, rollback,
+                 raise_on_error, **kwargs):
+    kwargs['json'] = True
+    results = _run_many(
+        heketi_client_node, create_func, sizes, concurrency, retries,
+        lambda size: ((heketi_client_node, heketi_server_url, size), kwargs))
+    err_msg = "Failed to create volumes using '%s'. " % create_func.__name__
+    if rollback and results['failed']:
+        created_ids = [item_result['result']['id']
+                       for item_result in results['items']
+                       if not item_result['error']]
+        g.log.error("Rolling back creation of %d volumes" % len(created_ids))
+        results['rollback'] = _check_bulk_results(
+            _run_many(
+                heketi_client_node, delete_func, created_ids, concurrency,
+                retries, lambda volume_id: ((
+                    heketi_client_node, heketi_server_url, volume_id), {
+                    'user': kwargs.get('user'),
+                    'secret': kwargs.get('secret')})),
+            "Failed to roll back volumes creation. ", raise_on_error)
+        err_msg += "Created volumes were deleted. "
+    return _check_bulk_results(results, err_msg, raise_on_error)
+
+
+def heketi_volume_create_many(heketi_client_node, heketi_server_url, sizes,
+                              concurrency=8, retries=0, rollback=False,
+                              raise_on_error=True, **kwargs):
+    """Create lots of heketi volumes running limited amount of parallel ops.
+
+    Args:
+        heketi_client_node (str): Node on which cmds have to be executed.
+        heketi_server_url (str): Heketi server url.
+        sizes (list): sizes of the volumes to create, one per volume.
+        concurrency (int): max amount of volumes created in parallel.
+        retries (int): amount of retries of each failed volume creation.
+        rollback (bool): whether or not to delete all the created volumes
+            if creation of any of the volumes failed.
+        raise_on_error (bool): whether or not to raise exception
+            if any of the volumes failed to be created.
+
+    Kwargs:
+        Passed to 'heketi_volume_create' for each volume. 'json' is always
+        enabled, so info of the created volumes is available as results.
+
+    Returns:
+        dict: results of 'heketi_volume_create' per size as 'items',
+            amounts of 'count' and 'failed' ones, total 'duration',
+            'throughput' in volumes per second and 'latency' percentiles.
+            Example:
+                {'items': [{'item': 1, 'result': {'id': '...', ...},
+                            'error': None, 'attempts': 1,
+                            'duration': 2.51}, ...],
+                 'count': 10, 'failed': 0, 'duration': 6.02,
+                 'throughput': 1.66,
+                 'latency': {'min': 2.1, 'max': 3.4, 'mean': 2.5,
+                             'p50': 2.4, 'p90': 3.2, 'p99': 3.4}}
+            Results of deletion are available as 'rollback' if rollback
+            took place.
+
+    Raises:
+        exceptions.ExecutionError: if any of the volumes failed to be
+            created and raise_on_error is True.
+
+    Example:
+        heketi_volume_create_many(
+            heketi_client_node, heketi_server_url, [1] * 100,
+            concurrency=10, rollback=True)
+    """
+    return _create_many(
+        heketi_client_node, heketi_server_url, heketi_volume_create,
+        heketi_volume_delete, sizes, concurrency, retries, rollback,
+        raise_on_error, **kwargs)
+
+
+def heketi_volume_delete_many(heketi_client_node, heketi_server_url,
+                              volume_ids, concurrency=8, retries=0,
+                              raise_on_error=True, **kwargs):
+    """Delete lots of heketi volumes running limited amount of parallel ops.
+
+    Args:
+        heketi_client_node (str): Node on which cmds have to be executed.
+        heketi_server_url (str): Heketi server url.
+        volume_ids (list): IDs of the volumes to delete.
+        concurrency (int): max amount of volumes deleted in parallel.
+        retries (int): amount of retries of each failed volume deletion.
+        raise_on_error (bool): whether or not to raise exception
+            if any of the volumes failed to be deleted.
+
+    Kwargs:
+        Passed to 'heketi_volume_delete' for each volume.
+
+    Returns:
+        dict: results of 'heketi_volume_delete' per volume ID, in the same
+            format as 'heketi_volume_create_many' returns.
+
+    Raises:
+        exceptions.ExecutionError: if any of the volumes failed to be
+            deleted and raise_on_error is True.
+    """
+    return _check_bulk_results(
+        _run_many(
+            heketi_client_node, heketi_volume_delete, volume_ids,
+            concurrency, retries, lambda volume_id: ((
+                heketi_client_node, heketi_server_url, volume_id), kwargs)),
+        "Failed to delete volumes. ", raise_on_error)
+
+
+def heketi_blockvolume_create_many(heketi_client_node, heketi_server_url,
+                                   sizes, concurrency=8, retries=0,
+                                   rollback=False, raise_on_error=True,
+                                   **kwargs):
+    """Create lots of block volumes running limited amount of parallel ops.
+
+    Args and Kwargs are the same as 'heketi_volume_create_many' has,
+    except of kwargs, which are passed to 'heketi_blockvolume_create'.
+
+    Returns:
+        dict: results in the same format as 'heketi_volume_create_many'
+            returns.
+
+    Raises:
+        exceptions.ExecutionError: if any of the block volumes failed to be
+            created and raise_on_error is True.
+    """
+    return _create_many(
+        heketi_client_node, heketi_server_url, heketi_blockvolume_create,
+        heketi_blockvolume_delete, sizes, concurrency, retries, rollback,
+        raise_on_error, **kwargs)
+
+
+def heketi_blockvolume_delete_many(heketi_client_node, heketi_server_url,
+                                   block_volume_ids, concurrency=8, retries=0,
+                                   raise_on_error=True, **kwargs):
+    """Delete lots of block volumes running limited amount of parallel ops.
+
+    Args and Kwargs are the same as 'heketi_volume_delete_many' has,
+    except of kwargs, which are passed to 'heketi_blockvolume_delete'.
+
+    Returns:
+        dict: results in the same format as 'heketi_volume_create_many'
+            returns.
+
+    Raises:
+        exceptions.ExecutionError: if any of the block volumes failed to be
+            deleted and raise_on_error is True.
+    """
+    return _check_bulk_results(
+        _run_many(
+            heketi_client_node, heketi_blockvolume_delete, block_volume_ids,
+            concurrency, retries, lambda volume_id: ((
+                heketi_client_node, heketi_server_url, volume_id), kwargs)),
+        "Failed to delete block volumes. ", raise_on_error)
@@ -0,0 +1,831 @@
+"""In-process Heketi REST client.
+
+Functions of the 'heketi_ops' module run 'heketi-cli' on the heketi client
+node, paying for a process spawn, new HTTP connection and output parsing
+on each call. This module talks to the Heketi REST API directly from the
+test process, reusing keep-alive HTTP connections and signing requests
+with JWT tokens built from the 'heketi_cli_user'/'heketi_cli_key' config
+options.
+
+It provides functions with the same signatures as the 'heketi_ops' ones.
+They are used instead of the CLI based functions when the REST backend is
+enabled in the config file and Heketi server is reachable from the node
+where tests run:
+
+    common:
+        heketi_backend: rest
+
+Calls which need CLI specific features, like raw CLI output, non-JSON
+output of info/list commands or generation of PV files, keep using CLI.
+
+Long-running operations may be also submitted without waiting for them.
+Handles of such operations are polled in bulk:
+
+    operations = [
+        heketi_rest.submit_volume_create(heketi_server_url, 1)
+        for i in range(50)]
+    volumes = heketi_rest.wait_for_operations(operations, timeout=600)
+    print(heketi_rest.get_operations_durations(operations))
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import select
+import socket
+import threading
+import time
+
+from glusto.core import Glusto as g
+from six.moves import http_client
+from six.moves.urllib.parse import urlparse
+
+from cnslibs.common import command_cache
+from cnslibs.common import exceptions
+
+
+CLI_BACKEND = "cli"
+REST_BACKEND = "rest"
+DEFAULT_SERVER_URL = "http://heketi-storage-project.cloudapps.mystorage.com"
+# Lifetime of JWT tokens, same as 'heketi-cli' uses
+TOKEN_LIFETIME = 600
+# Defaults of the 'heketi-cli volume create' options defining durability
+VOLUME_CREATE_CLI_DEFAULTS = {
+    "durability": "replicate",
+    "replica": 3,
+    "disperse_data": 4,
+    "redundancy": 2,
+}
+CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def is_enabled():
+    """Check whether 'heketi_ops' functions should use REST backend."""
+    backend = g.config.get("common", {}).get("heketi_backend", CLI_BACKEND)
+    return backend == REST_BACKEND
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def make_jwt_token(user, key, method, path, now=None):
+    """Build JWT token the same way Heketi client does.
+
+    Args:
+        user (str): Heketi user name, like 'admin'.
+        key (str): secret key of the user.
+        method (str): HTTP method of the request.
+        path (str): path of the request URL without query.
+        now (int|None): token creation time, current time by default.
+    Returns:
+        str: HS256 signed token.
+    """
+    now = int(time.time() if now is None else now)
+    claims = {
+        "iss": user,
+        "iat": now,
+        "exp": now + TOKEN_LIFETIME,
+        "qsh": hashlib.sha256(
+            ("%s&%s" % (method, path)).encode('utf-8')).hexdigest(),
+    }
+    header = {"alg": "HS256", "typ": "JWT"}
+    signing_input = b'.'.join(
+        _b64encode(json.dumps(part, separators=(',', ':')).encode('utf-8'))
+        for part in (header, claims))
+    signature = hmac.new(
+        (key or '').encode('utf-8'), signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + _b64encode(signature)).decode('ascii')
+
+
+class HeketiRestError(exceptions.ExecutionError):
+    """Heketi server responded with an error."""
+
+    def __init__(self, method, path, status, message):
+        self.status = status
+        super(HeketiRestError, self).__init__(
+            "Heketi request '%s %s' failed with '%s' status: %s" % (
+                method, path, status, message.strip()))
+
+
+class HeketiRestClient(object):
+    """Client of the Heketi REST API with pool of keep-alive connections.
+
+    Args:
+        server_url (str): Heketi server URL.
+        user (str|None): Heketi user name.
+        key (str|None): secret key of the user.
+        timeout (int): seconds to wait for a single HTTP response.
+        poll_interval (int|float): seconds between checks of the
+            asynchronous operations.
+        async_timeout (int): seconds to wait for asynchronous operations.
+    """
+
+    def __init__(self, server_url, user=None, key=None, timeout=60,
+                 poll_interval=1, async_timeout=3600):
+        url = urlparse(server_url)
+        self.server_url = server_url
+        self.user = user
+        self.key = key
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.async_timeout = async_timeout
+        self._connection_class = (
+            http_client.HTTPSConnection if url.scheme == 'https'
+            else http_client.HTTPConnection)
+        self._netloc = url.netloc
+        self._base_path = url.path.rstrip('/')
+        self._idle_connections = []
+        self._lock = threading.Lock()
+
+    def _get_connection(self):
+        while True:
+            with self._lock:
+                if not self._idle_connections:
+                    break
+                conn = self._idle_connections.pop()
+            # Idle connection is readable only if server closed it
+            if conn.sock is not None and not select.select(
+                    [conn.sock], [], [], 0)[0]:
+                return conn, True
+            conn.close()
+        conn = self._connection_class(self._netloc, timeout=self.timeout)
+        conn.connect()
+        # Requests are small, so do not delay them waiting for more data
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, False
+
+    def _release_connection(self, conn):
+        with self._lock:
+            self._idle_connections.append(conn)
+
+    def close(self):
+        """Close all the idle connections."""
+        with self._lock:
+            connections, self._idle_connections = self._idle_connections, []
+        for conn in connections:
+            conn.close()
+
+    def _send(self, method, path, body=None):
+        """Send single HTTP request reusing idle connection if possible.
+
+        Returns:
+            tuple: response status, headers dict and body.
+        """
+        headers = {"Accept": "application/json"}
+        if self.user:
+            headers["Authorization"] = "bearer %s" % make_jwt_token(
+                self.user, self.key, method, path.split('?')[0])
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        while True:
+            conn, reused = self._get_connection()
+            sent = False
+            try:
+                conn.request(method, path, body, headers)
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except (socket.error, http_client.HTTPException) as e:
+                conn.close()
+                # Idle connection could be closed by the server side.
+                # Request is resent only if it surely did not reach the
+                # server or is idempotent, so that volumes do not get
+                # created or deleted twice.
+                if reused and not isinstance(e, socket.timeout) and (
+                        not sent or method == "GET"):
+                    continue
+                raise
+            if response.getheader('connection', '').lower() == 'close':
+                conn.close()
+            else:
+                self._release_connection(conn)
+            if not isinstance(data, str):
+                data = data.decode('utf-8')
+            headers = dict(
+                (name.lower(), value)
+                for name, value in response.getheaders())
+            return response.status, headers, data
+
+    def submit(self, method, path, body=None):
+        """Send request to Heketi without waiting for its completion.
+
+        Args:
+            method (str): HTTP method.
+            path (str): path of the API resource, like '/volumes'.
+            body (dict|None): data to be sent as JSON.
+        Returns:
+            HeketiOperation object instance.
+        """
+        operation = HeketiOperation(self, method, path)
+        status, headers, data = self._send(
+            method, self._base_path + path, body)
+        if status == http_client.ACCEPTED:
+            operation.location = headers['location']
+        else:
+            operation._finish(status, headers, data)
+        return operation
+
+    def request(self, method, path, body=None):
+        """Send request to Heketi and wait for its completion.
+
+        Args:
+            method (str): HTTP method.
+            path (str): path of the API resource, like '/volumes'.
+            body (dict|None): data to be sent as JSON.
+        Returns:
+            Decoded JSON response, text of non-JSON response or None
+            if response has no content.
+        Raises:
+            HeketiRestError: when Heketi responds with an error.
+        """
+        return self.submit(method, path, body).wait(self.async_timeout)
+
+
+class HeketiOperation(object):
+    """Handle of a request submitted to Heketi.
+
+    Long-running requests are processed by Heketi asynchronously, their
+    status is available by the queue URL returned on submission.
+    'submitted_at' and 'finished_at' times are set by the client, the
+    latter one with precision of the polling interval.
+    """
+
+    def __init__(self, client, method, path):
+        self.client = client
+        self.method = method
+        self.path = path
+        self.location = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    def __repr__(self):
+        return "<HeketiOperation %s %s (%s)>" % (
+            self.method, self.path, "done" if self.done() else "pending")
+
+    @property
+    def duration(self):
+        """Seconds the operation took or None if it is not finished."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    def done(self):
+        return self.finished_at is not None
+
+    def _finish(self, status, headers, data):
+        self.finished_at = time.time()
+        if self.method != "GET":
+            # Keep results of the 'heketi-cli' commands cached by the
+            # connection pool coherent with changes done via REST API.
+            command_cache.get_cache().invalidate(("heketi", "gluster"))
+        if status >= 400:
+            self.error = HeketiRestError(self.method, self.path, status, data)
+        elif status == http_client.NO_CONTENT or not data:
+            self.result = None
+        elif 'json' in headers.get('content-type', ''):
+            self.result = json.loads(data)
+        else:
+            self.result = data
+
+    def poll(self):
+        """Check status of the operation once.
+
+        Returns:
+            bool: True if operation is finished.
+        """
+        if self.done():
+            return True
+        status, headers, data = self.client._send("GET", self.location)
+        if status == http_client.SEE_OTHER:
+            self._finish(*self.client._send("GET", headers['location']))
+        elif status != http_client.OK or not headers.get('x-pending'):
+            self._finish(status, headers, data)
+        return self.done()
+
+    def wait(self, timeout=None):
+        """Wait for the operation to finish.
+
+        Returns:
+            Result of the operation.
+        Raises:
+            HeketiRestError: when operation failed.
+        """
+        wait_for_operations([self], timeout, self.client.poll_interval)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def wait_for_operations(operations, timeout=None, poll_interval=1):
+    """Poll all the pending operations until they finish.
+
+    Each polling round checks all the pending operations at once, reusing
+    keep-alive connections, so lots of operations can be tracked by
+    a single thread.
+
+    Args:
+        operations (list): list of HeketiOperation objects.
+        timeout (int|None): seconds to wait for all the operations.
+        poll_interval (int|float): seconds between polling rounds.
+    Returns:
+        list: results of the operations or HeketiRestError objects for the
+            failed ones, in the same order as operations.
+    Raises:
+        exceptions.ExecutionError: when timeout is exceeded.
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    pending = [op for op in operations if not op.done()]
+    while True:
+        pending = [op for op in pending if not op.poll()]
+        if not pending:
+            break
+        if deadline is not None and time.time() > deadline:
+            raise exceptions.ExecutionError(
+                "Exceeded timeout of %s sec waiting for %d Heketi "
+                "operations to finish: %s" % (timeout, len(pending), pending))
+        time.sleep(poll_interval)
+    return [op.result if op.error is None else op.error for op in operations]
+
+
+def _get_credentials(user=None, secret=None):
+    if not user:
+        openshift_config = g.config.get("cns", g.config.get("openshift"))
+        user = openshift_config['heketi_config']['heketi_cli_user']
+        secret = openshift_config['heketi_config']['heketi_cli_key']
+    return user, secret
+
+
+def get_client(heketi_server_url, user=None, secret=None):
+    """Get client of a Heketi server, creating it if required.
+
+    Args:
+        heketi_server_url (str|None): Heketi server URL.
+        user (str|None): Heketi user name. Taken from config if None.
+        secret (str|None): secret key of the user.
+    Returns:
+        HeketiRestClient object instance.
+    """
+    server_url = heketi_server_url or DEFAULT_SERVER_URL
+    user, secret = _get_credentials(user, secret)
+    key = (server_url, user, secret)
+    with _CLIENTS_LOCK:
+        if key not in CLIENTS:
+            CLIENTS[key] = HeketiRestClient(server_url, user, secret)
+        return CLIENTS[key]
+
+
+def _request(heketi_server_url, method, path, body=None, **kwargs):
+    client = get_client(
+        heketi_server_url, kwargs.get("user"), kwargs.get("secret"))
+    try:
+        return client.request(method, path, body)
+    except exceptions.ExecutionError as e:
+        g.log.error(str(e))
+        raise
+
+
+def _run_action(heketi_server_url, method, path, success_msg,
+                raise_on_error=True, **kwargs):
+    """Run mutating request returning 'heketi-cli' like output.
+
+    On failure with 'raise_on_error' set to False, empty output is returned,
+    as 'heketi-cli' prints its errors to stderr, which 'cmd_run' drops.
+    The error itself gets logged by '_request'.
+    """
+    try:
+        _request(heketi_server_url, method, path, **kwargs)
+    except exceptions.ExecutionError:
+        if raise_on_error:
+            raise
+        return ''
+    return success_msg
+
+
+# Functions below mirror the 'heketi_ops' ones. 'heketi_client_node'
+# argument is accepted for compatibility only.
+
+def _get_volume_create_body(size, **kwargs):
+    """Build volume create request the same way 'heketi-cli' does.
+
+    Durability options not passed get the 'heketi-cli' default values,
+    so that volumes are replica 3 ones by default, because Heketi server
+    itself treats absent durability as distribute-only one.
+    """
+    options = dict(VOLUME_CREATE_CLI_DEFAULTS)
+    options.update(
+        (key, kwargs[key]) for key in VOLUME_CREATE_CLI_DEFAULTS
+        if kwargs.get(key))
+    body = {"size": int(size)}
+    if kwargs.get("block"):
+        body["block"] = True
+    if kwargs.get("clusters"):
+        body["clusters"] = kwargs["clusters"].split(',')
+    if kwargs.get("name"):
+        body["name"] = kwargs["name"]
+    if kwargs.get("gid"):
+        body["gid"] = int(kwargs["gid"])
+    if kwargs.get("gluster_volume_options"):
+        body["glustervolumeoptions"] = [
+            opt.strip()
+            for opt in kwargs["gluster_volume_options"].split(',')]
+    if kwargs.get("snapshot_factor"):
+        body["snapshot"] = {
+            "enable": True, "factor": float(kwargs["snapshot_factor"])}
+    body["durability"] = {"type": options["durability"]}
+    if options["durability"] == "replicate":
+        body["durability"]["replicate"] = {
+            "replica": int(options["replica"])}
+    elif options["durability"] == "disperse":
+        body["durability"]["disperse"] = {
+            "data": int(options["disperse_data"]),
+            "redundancy": int(options["redundancy"])}
+    return body
+
+
+def heketi_volume_create(heketi_client_node, heketi_server_url, size,
+                         raw_cli_output=False, **kwargs):
+    return _request(
+        heketi_server_url, "POST", "/volumes",
+        _get_volume_create_body(size, **kwargs), **kwargs)
+
+
+def heketi_volume_info(heketi_client_node, heketi_server_url, volume_id,
+                       raw_cli_output=False, **kwargs):
+    return _request(
+        heketi_server_url, "GET", "/volumes/%s" % volume_id, **kwargs)
+
+
+def heketi_volume_expand(heketi_client_node, heketi_server_url, volume_id,
+                         expand_size, raw_cli_output=False, **kwargs):
+    return _request(
+        heketi_server_url, "POST", "/volumes/%s/expand" % volume_id,
+        {"expand_size": int(expand_size)}, **kwargs)
+
+
+def heketi_volume_delete(heketi_client_node, heketi_server_url, volume_id,
+                         raw_cli_output=False, raise_on_error=True, **kwargs):
+    return _run_action(
+        heketi_server_url, "DELETE", "/volumes/%s" % volume_id,
+        "Volume %s deleted" % volume_id, raise_on_error, **kwargs)
+
+
+def heketi_volume_list(heketi_client_node, heketi_server_url,
+                       raw_cli_output=False, **kwargs):
+    return _request(heketi_server_url, "GET", "/volumes", **kwargs)
+
+
+def heketi_topology_info(heketi_client_node, heketi_server_url,
+                         raw_cli_output=False, **kwargs):
+    # NOTE: Heketi has no topology API, 'heketi-cli' builds it the same way
+    topology = {"clusters": []}
+    cluster_ids = _request(
+        heketi_server_url, "GET", "/clusters", **kwargs)["clusters"]
+    for cluster_id in cluster_ids:
+        cluster = _request(
+            heketi_server_url, "GET", "/clusters/%s" % cluster_id, **kwargs)
+        topology["clusters"].append({
+            "id": cluster_id,
+            "block": cluster.get("block"),
+            "file": cluster.get("file"),
+            "volumes": [
+                _request(heketi_server_url, "GET", "/volumes/%s" % v_id,
+                         **kwargs)
+                for v_id in cluster.get("volumes") or []],
+            "nodes": [
+                _request(heketi_server_url, "GET", "/nodes/%s" % n_id,
+                         **kwargs)
+                for n_id in cluster.get("nodes") or []],
+        })
+    return topology
+
+
+def hello_heketi(heketi_client_node, heketi_server_url, **kwargs):
+    _request(heketi_server_url, "GET", "/hello", **kwargs)
+    return True
+
+
+def heketi_cluster_delete(heketi_client_node, heketi_server_url, cluster_id,
+                          **kwargs):
+    return _run_action(
+        heketi_server_url, "DELETE", "/clusters/%s" % cluster_id,
+        "Cluster %s deleted" % cluster_id, **kwargs)
+
+
+def heketi_cluster_info(heketi_client_node, heketi_server_url, cluster_id,
+                        **kwargs):
+    return _request(
+        heketi_server_url, "GET", "/clusters/%s" % cluster_id, **kwargs)
+
+
+def heketi_cluster_list(heketi_client_node, heketi_server_url, **kwargs):
+    return _request(heketi_server_url, "GET", "/clusters", **kwargs)
+
+
+def heketi_device_add(heketi_client_node, heketi_server_url, device_name,
+                      node_id, raw_cli_output=False, **kwargs):
+    _request(heketi_server_url, "POST", "/devices",
+             {"name": device_name, "node": node_id}, **kwargs)
+    return "Device added successfully"
+
+
+def _set_state(heketi_server_url, source, source_id, state, success_msg,
+               **kwargs):
+    _request(heketi_server_url, "POST", "/%ss/%s/state" % (
+        source, source_id), {"state": state}, **kwargs)
+    return success_msg
+
+
+def heketi_device_delete(heketi_client_node, heketi_server_url, device_id,
+                         raw_cli_output=False, **kwargs):
+    return _run_action(
+        heketi_server_url, "DELETE", "/devices/%s" % device_id,
+        "Device %s deleted" % device_id, **kwargs)
+
+
+def heketi_device_disable(heketi_client_node, heketi_server_url, device_id,
+                          raw_cli_output=False, **kwargs):
+    return _set_state(
+        heketi_server_url, "device", device_id, "offline",
+        "Device %s is now offline" % device_id, **kwargs)
+
+
+def heketi_device_enable(heketi_client_node, heketi_server_url, device_id,
+                         raw_cli_output=False, **kwargs):
+    return _set_state(
+        heketi_server_url, "device", device_id, "online",
+        "Device %s is now online" % device_id, **kwargs)
+
+
+def heketi_device_info(heketi_client_node, heketi_server_url, device_id,
+                       raw_cli_output=False, **kwargs):
+    return _request(
+        heketi_server_url, "GET", "/devices/%s" % device_id, **kwargs)
+
+
+def heketi_device_remove(heketi_client_node, heketi_server_url, device_id,
+                         raw_cli_output=False, **kwargs):
+    return _set_state(
+        heketi_server_url, "device", device_id, "failed",
+        "Device %s is now removed" % device_id, **kwargs)
+
+
+def heketi_node_delete(heketi_client_node, heketi_server_url, node_id,
+                       **kwargs):
+    return _run_action(
+        heketi_server_url, "DELETE", "/nodes/%s" % node_id,
+        "Node %s deleted" % node_id, **kwargs)
+
+
+def heketi_node_disable(heketi_client_node, heketi_server_url, node_id,
+                        **kwargs):
+    return _set_state(
+        heketi_server_url, "node", node_id, "offline",
+        "Node %s is now offline" % node_id, **kwargs)
+
+
+def heketi_node_enable(heketi_client_node, heketi_server_url, node_id,
+                       **kwargs):
+    return _set_state(
+        heketi_server_url, "node", node_id, "online",
+        "Node %s is now online" % node_id, **kwargs)
+
+
+def heketi_node_info(heketi_client_node, heketi_server_url, node_id, **kwargs):
+    return _request(
+        heketi_server_url, "GET", "/nodes/%s" % node_id, **kwargs)
+
+
+def heketi_node_list(heketi_client_node, heketi_server_url,
+                     heketi_user=None, heketi_secret=None):
+    kwargs = {"user": heketi_user, "secret": heketi_secret}
+    node_ids = []
+    for cluster_id in _request(
+            heketi_server_url, "GET", "/clusters", **kwargs)["clusters"]:
+        node_ids.extend(_request(
+            heketi_server_url, "GET", "/clusters/%s" % cluster_id,
+            **kwargs).get("nodes") or [])
+    return node_ids
+
+
+def heketi_blockvolume_info(heketi_client_node, heketi_server_url,
+                            block_volume_id, **kwargs):
+    return _request(
+        heketi_server_url, "GET", "/blockvolumes/%s" % block_volume_id,
+        **kwargs)
+
+
+def _get_blockvolume_create_body(size, **kwargs):
+    body = {"size": int(size)}
+    if kwargs.get("auth"):
+        body["auth"] = True
+    if kwargs.get("clusters") is not None:
+        body["clusters"] = kwargs["clusters"].split(',')
+    if kwargs.get("ha") is not None:
+        body["hacount"] = int(kwargs["ha"])
+    if kwargs.get("name") is not None:
+        body["name"] = kwargs["name"]
+    return body
+
+
+def heketi_blockvolume_create(heketi_client_node, heketi_server_url, size,
+                              **kwargs):
+    return _request(
+        heketi_server_url, "POST", "/blockvolumes",
+        _get_blockvolume_create_body(size, **kwargs), **kwargs)
+
+
+def heketi_blockvolume_delete(heketi_client_node, heketi_server_url,
+                              block_volume_id, raise_on_error=True, **kwargs):
+    return _run_action(
+        heketi_server_url, "DELETE", "/blockvolumes/%s" % block_volume_id,
+        "Blockvolume %s deleted" % block_volume_id, raise_on_error, **kwargs)
+
+
+def heketi_blockvolume_list(heketi_client_node, heketi_server_url, **kwargs):
+    return _request(heketi_server_url, "GET", "/blockvolumes", **kwargs)
+
+
+def _change_tags(heketi_server_url, source, source_id, change_type, tags,
+                 **kwargs):
+    if source not in ('node', 'device'):
+        msg = ("Incorrect value we can use 'node' or 'device' instead of %s."
+               % source)
+        g.log.error(msg)
+        raise ValueError(msg)
+    _request(heketi_server_url, "POST", "/%ss/%s/tags" % (source, source_id),
+             {"change_type": change_type, "tags": tags}, **kwargs)
+    return True
+
+
+def set_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
+             **kwargs):
+    tags = dict(item.split(':', 1) for item in tag.split())
+    return _change_tags(
+        heketi_server_url, source, source_id, "set", tags, **kwargs)
+
+
+def rm_tags(heketi_client_node, heketi_server_url, source, source_id, tag,
+            **kwargs):
+    tags = dict((name, "") for name in tag.split())
+    return _change_tags(
+        heketi_server_url, source, source_id, "delete", tags, **kwargs)
+
+
+def submit_operation(heketi_server_url, method, path, body=None, **kwargs):
+    """Submit request to Heketi without waiting for its completion.
+
+    Returns:
+        HeketiOperation object instance.
+    """
+    client = get_client(
+        heketi_server_url, kwargs.get("user"), kwargs.get("secret"))
+    return client.submit(method, path, body)
+
+
+def submit_volume_create(heketi_server_url, size, **kwargs):
+    """Submit volume creation, see 'heketi_volume_create' for kwargs.
+
+    Returns:
+        HeketiOperation object instance which result is volume info.
+    """
+    return submit_operation(
+        heketi_server_url, "POST", "/volumes",
+        _get_volume_create_body(size, **kwargs), **kwargs)
+
+
+def submit_volume_expand(heketi_server_url, volume_id, expand_size,
+                         **kwargs):
+    """Submit volume expansion.
+
+    Returns:
+        HeketiOperation object instance which result is volume info.
+    """
+    return submit_operation(
+        heketi_server_url, "POST", "/volumes/%s/expand" % volume_id,
+        {"expand_size": int(expand_size)}, **kwargs)
+
+
+def submit_volume_delete(heketi_server_url, volume_id, **kwargs):
+    """Submit volume deletion.
+
+    Returns:
+        HeketiOperation object instance.
+    """
+    return submit_operation(
+        heketi_server_url, "DELETE", "/volumes/%s" % volume_id, **kwargs)
+
+
+def submit_blockvolume_create(heketi_server_url, size, **kwargs):
+    """Submit block volume creation, see 'heketi_blockvolume_create'.
+
+    Returns:
+        HeketiOperation object instance which result is block volume info.
+    """
+    return submit_operation(
+        heketi_server_url, "POST", "/blockvolumes",
+        _get_blockvolume_create_body(size, **kwargs), **kwargs)
+
+
+def submit_blockvolume_delete(heketi_server_url, block_volume_id, **kwargs):
+    """Submit block volume deletion.
+
+    Returns:
+        HeketiOperation object instance.
+    """
+    return submit_operation(
+        heketi_server_url, "DELETE", "/blockvolumes/%s" % block_volume_id,
+        **kwargs)
+
+
+def get_operations_info(heketi_server_url, **kwargs):
+    """Get counters of the operations known to Heketi server.
+
+    Returns:
+        dict: like {'total': 3, 'in_flight': 2, 'stale': 0, ...}
+    """
+    return _request(heketi_server_url, "GET", "/operations", **kwargs)
+
+
+def get_operations_durations(operations):
+    """Get statistics of durations of the finished operations.
+
+    Args:
+        operations (list): list of HeketiOperation objects.
+    Returns:
+        dict: 'count', 'failed', 'min', 'max' and 'mean' durations
+            in seconds.
+    """
+    finished = [op for op in operations if op.done()]
+    durations = [op.duration for op in finished]
+    return {
+        'count': len(finished),
+        'failed': len([op for op in finished if op.error is not None]),
+        'min': min(durations) if durations else None,
+        'max': max(durations) if durations else None,
+        'mean': sum(durations) / len(durations) if durations else None,
+    }
+
+
+def _json_requested(callargs):
+    return bool(callargs.get("kwargs", {}).get("json"))
+
+
+def _volume_create_supported(callargs):
+    return _json_requested(callargs) and not any(
+        callargs["kwargs"].get(arg) for arg in (
+            "persistent_volume", "persistent_volume_endpoint",
+            "persistent_volume_file"))
+
+
+# Checks whether call with given arguments can be served by REST backend.
+_SUPPORTED_CALLS = {
+    'heketi_volume_create': _volume_create_supported,
+    'heketi_volume_info': _json_requested,
+    'heketi_volume_expand': _json_requested,
+    'heketi_volume_delete': lambda callargs: True,
+    'heketi_volume_list': _json_requested,
+    'heketi_topology_info': _json_requested,
+    'hello_heketi': lambda callargs: True,
+    'heketi_cluster_delete': lambda callargs: True,
+    'heketi_cluster_info': _json_requested,
+    'heketi_cluster_list': _json_requested,
+    'heketi_device_add': lambda callargs: True,
+    'heketi_device_delete': lambda callargs: True,
+    'heketi_device_disable': lambda callargs: True,
+    'heketi_device_enable': lambda callargs: True,
+    'heketi_device_info': _json_requested,
+    'heketi_device_remove': lambda callargs: True,
+    'heketi_node_delete': lambda callargs: True,
+    'heketi_node_disable': lambda callargs: True,
+    'heketi_node_enable': lambda callargs: True,
+    'heketi_node_info': _json_requested,
+    'heketi_node_list': lambda callargs: True,
+    'heketi_blockvolume_info': _json_requested,
+    'heketi_blockvolume_create': _json_requested,
+    'heketi_blockvolume_delete': lambda callargs: True,
+    'heketi_blockvolume_list': _json_requested,
+    'set_tags': lambda callargs: True,
+    'rm_tags': lambda callargs: True,
+}
+
+
+def is_supported(func_name, callargs):
+    """Check whether REST backend can serve a 'heketi_ops' function call.
+
+    Args:
+        func_name (str): name of the 'heketi_ops' function.
+        callargs (dict): arguments of the call as 'inspect.getcallargs'
+            provides them.
+    Returns:
+        bool: True if REST function with the same name should be used.
+    """
+    check = _SUPPORTED_CALLS.get(func_name)
+    if check is None or callargs.get("raw_cli_output"):
+        return False
+    return check(callargs)
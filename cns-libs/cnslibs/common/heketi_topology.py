@@ -0,0 +1,163 @@
+"""Indexed snapshot of the Heketi topology.
+
+'heketi_topology_info' provides nested structure of clusters, nodes,
+devices, bricks and volumes, which requires nested loops for finding
+any of the entities. 'TopologySnapshot' indexes all of them by ID
+using single topology fetch.
+
+Usage example:
+
+    from cnslibs.common.heketi_topology import TopologySnapshot
+
+    topology = TopologySnapshot(heketi_client_node, heketi_server_url)
+    node = topology.get_node_by_hostname("node1.example.com")
+    device = topology.devices[device_id]
+    changes = topology.refresh()
+    # {'devices': {'added': [...], 'removed': [...], 'changed': [...]}, ...}
+
+Entities are kept as dicts parsed from the Heketi output, unchanged ones
+are reused on refresh and IDs are interned, so IDs referenced by lots of
+bricks do not consume memory per reference.
+"""
+
+import six
+from six.moves import intern
+
+from cnslibs.common import heketi_ops
+
+
+ENTITY_TYPES = ("clusters", "nodes", "devices", "bricks", "volumes")
+_ID_KEYS = ("id", "cluster", "node", "device", "volume")
+
+
+def _intern_ids(entity):
+    for key in _ID_KEYS:
+        value = entity.get(key)
+        if isinstance(value, six.string_types):
+            entity[key] = intern(str(value))
+    return entity
+
+
+class TopologySnapshot(object):
+    """Heketi topology indexed by IDs of its entities.
+
+    Args:
+        heketi_client_node (str): Node on which cmd has to be executed.
+        heketi_server_url (str): Heketi server url.
+        topology (dict|None): output of 'heketi_topology_info' with
+            'json=True', to build snapshot without fetching it.
+    Kwargs:
+        Passed to 'heketi_topology_info', like 'user' and 'secret'.
+    """
+
+    __slots__ = (
+        "heketi_client_node", "heketi_server_url", "kwargs",
+        "clusters", "nodes", "devices", "bricks", "volumes",
+        "_hostnames")
+
+    def __init__(self, heketi_client_node, heketi_server_url, topology=None,
+                 **kwargs):
+        self.heketi_client_node = heketi_client_node
+        self.heketi_server_url = heketi_server_url
+        self.kwargs = kwargs
+        for entity_type in ENTITY_TYPES:
+            setattr(self, entity_type, {})
+        self._hostnames = {}
+        self.refresh(topology)
+
+    def _fetch(self):
+        return heketi_ops.heketi_topology_info(
+            self.heketi_client_node, self.heketi_server_url, json=True,
+            **self.kwargs)
+
+    @staticmethod
+    def _build_indexes(topology):
+        indexes = dict((entity_type, {}) for entity_type in ENTITY_TYPES)
+        for cluster in topology.get("clusters") or []:
+            _intern_ids(cluster)
+            indexes["clusters"][cluster["id"]] = cluster
+            for volume in cluster.get("volumes") or []:
+                _intern_ids(volume)
+                indexes["volumes"][volume["id"]] = volume
+                for brick in volume.get("bricks") or []:
+                    _intern_ids(brick)
+            for node in cluster.get("nodes") or []:
+                _intern_ids(node)
+                indexes["nodes"][node["id"]] = node
+                for device in node.get("devices") or []:
+                    # NOTE: device info does not refer to its node
+                    device.setdefault("node", node["id"])
+                    _intern_ids(device)
+                    indexes["devices"][device["id"]] = device
+                    for brick in device.get("bricks") or []:
+                        _intern_ids(brick)
+                        indexes["bricks"][brick["id"]] = brick
+        return indexes
+
+    def refresh(self, topology=None):
+        """Update snapshot with the current topology.
+
+        Entities which did not change are kept as they are, only added,
+        removed and changed ones get updated in the indexes.
+
+        Args:
+            topology (dict|None): topology info to use instead of fetching.
+        Returns:
+            dict: IDs of 'added', 'removed' and 'changed' entities per
+                entity type, like {'volumes': {'added': ['id1'], ...}}.
+        """
+        indexes = self._build_indexes(
+            self._fetch() if topology is None else topology)
+        changes = {}
+        for entity_type in ENTITY_TYPES:
+            index, new_index = getattr(self, entity_type), indexes[entity_type]
+            removed = [e_id for e_id in index if e_id not in new_index]
+            added, changed = [], []
+            for e_id, entity in new_index.items():
+                if e_id not in index:
+                    added.append(e_id)
+                elif index[e_id] != entity:
+                    changed.append(e_id)
+                else:
+                    continue
+                index[e_id] = entity
+            for e_id in removed:
+                del index[e_id]
+            changes[entity_type] = {
+                "added": added, "removed": removed, "changed": changed}
+        self._hostnames = {}
+        for node_id, node in self.nodes.items():
+            for hostname_type in ("manage", "storage"):
+                for hostname in node.get("hostnames", {}).get(
+                        hostname_type) or []:
+                    self._hostnames[hostname] = node_id
+        return changes
+
+    def get_node_by_hostname(self, hostname):
+        """Get node by its manage hostname or storage IP address.
+
+        Returns:
+            dict: node info or None if there is no such node.
+        """
+        node_id = self._hostnames.get(hostname)
+        return self.nodes[node_id] if node_id else None
+
+    def get_node_of_device(self, device_id):
+        return self.nodes[self.devices[device_id]["node"]]
+
+    def get_devices_of_node(self, node_id):
+        return self.nodes[node_id].get("devices") or []
+
+    def get_bricks_of_volume(self, volume_id):
+        return [self.bricks.get(brick["id"], brick)
+                for brick in self.volumes[volume_id].get("bricks") or []]
+
+    def get_free_space(self, node_id=None):
+        """Get free space of devices of a node or of all the devices.
+
+        Returns:
+            int: free space in KiB, as Heketi reports it.
+        """
+        devices = (self.get_devices_of_node(node_id) if node_id
+                   else self.devices.values())
+        return sum(device["storage"]["free"] for device in devices)
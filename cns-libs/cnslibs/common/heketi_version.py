@@ -25,6 +25,7 @@ import re
 from glusto.core import Glusto as g
 import six
 
+from cnslibs.common import capability_cache
 from cnslibs.common import command
 from cnslibs.common import exceptions
 
@@ -221,7 +222,8 @@ def get_heketi_version(hostname=None, ocp_client_node=None):
     """Cacher of the Heketi client package version.
 
     Version of Heketi client package is constant value. So, we call API just
-    once and then reuse it's output.
+    once and then reuse it's output. Versions are also stored in the
+    capability cache, so other processes may reuse them.
 
     Args:
         hostname (str): a node with 'heketi' client where command should run on
@@ -238,9 +240,16 @@ def get_heketi_version(hostname=None, ocp_client_node=None):
     global HEKETI_CLIENT_VERSION
     global HEKETI_SERVER_VERSION
     if not (HEKETI_SERVER_VERSION and HEKETI_CLIENT_VERSION):
-        client_version_str = _get_heketi_client_version_str(hostname=hostname)
-        server_version_str = _get_heketi_server_version_str(
-            ocp_client_node=ocp_client_node)
+        cache = capability_cache.get_cache()
+        client_version_str = cache.get("heketi_client_version")
+        server_version_str = cache.get("heketi_server_version")
+        if not (client_version_str and server_version_str):
+            client_version_str = _get_heketi_client_version_str(
+                hostname=hostname)
+            server_version_str = _get_heketi_server_version_str(
+                ocp_client_node=ocp_client_node)
+            cache.update(heketi_client_version=client_version_str,
+                         heketi_server_version=server_version_str)
         HEKETI_CLIENT_VERSION = HeketiVersion(client_version_str)
         HEKETI_SERVER_VERSION = HeketiVersion(server_version_str)
     return HEKETI_SERVER_VERSION
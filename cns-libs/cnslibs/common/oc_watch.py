@@ -0,0 +1,470 @@
+"""Waiting for OpenShift resource states using watch streams.
+
+Wait functions of the 'openshift_ops' module poll 'oc get' commands every
+few seconds, so each wait lasts up to one extra interval after the state
+is reached, and parallel waits multiply the load on the API server.
+
+This module keeps in-memory copies of the resources of a type using the
+list-then-watch approach: resources get listed once and then changes are
+received from the watch stream of the API server, made by the
+'oc get --raw <path>?watch=true' command. Waits are completed right after
+the event with the expected state arrives. One stream per resource type
+and node is shared by all the waits.
+
+Usage example:
+
+    from cnslibs.common import oc_watch
+
+    watch = oc_watch.get_watch(ocp_node, "pvc")
+    namespace = oc_watch.get_current_namespace(ocp_node)
+    pvc = watch.wait_for(
+        lambda w: (w.get(pvc_name, namespace) or {}).get(
+            "status", {}).get("phase") == "Bound", timeout=120)
+
+Stored resources are indexed by labels and, depending on the resource
+type, by node, claim, bound volume, annotations and involved object,
+see 'INDEXERS':
+
+    pv_watch = oc_watch.get_watch(ocp_node, "pv")
+    pv_watch.get_by_index(
+        "annotation", "gluster.kubernetes.io/heketi-volume-id=%s" % vol_id)
+    pv_watch.get_by_index("claim", "%s/%s" % (namespace, pvc_name))
+
+Waits in the 'openshift_ops' module use watches when they are enabled in
+the config file. Otherwise, or if watch can not be started, they poll.
+Getters of pods, PVCs, PVs and events in the 'openshift_ops' module
+answer from the watched resources, acting as an informer, when it is
+enabled too:
+
+    common:
+        oc_watches: True
+        oc_informer: True
+
+Informer data lags behind the cluster state for the time an event takes
+to arrive, so getters of a resource by name fall back to the 'oc get'
+commands when the resource is not found locally.
+"""
+
+import threading
+import time
+
+from glusto.core import Glusto as g
+import six
+
+from cnslibs.common import command
+from cnslibs.common import exceptions
+from cnslibs.common import utils
+
+
+WATCHES = {}
+_WATCHES_LOCK = threading.Lock()
+# Current projects of the 'oc' clients keyed by nodes
+NAMESPACES = {}
+
+# API paths of the resources of all the namespaces and whether or not
+# resources are namespaced.
+RESOURCES = {
+    "pod": ("/api/v1/pods", True),
+    "pvc": ("/api/v1/persistentvolumeclaims", True),
+    "pv": ("/api/v1/persistentvolumes", False),
+    "event": ("/api/v1/events", True),
+    "dc": ("/apis/apps.openshift.io/v1/deploymentconfigs", True),
+}
+# Annotations with longer values, like last applied configuration, are not
+# indexed.
+MAX_INDEXED_ANNOTATION_LENGTH = 256
+# API server closes watch streams after this amount of seconds, so that
+# processes of the stopped watches do not stay forever.
+WATCH_TIMEOUT = 300
+
+
+class WatchUnavailableError(exceptions.ExecutionError):
+    """Watch of the resources could not be started."""
+
+
+def watches_enabled():
+    """Check whether waits should use watch streams instead of polling."""
+    return bool(g.config.get("common", {}).get("oc_watches", False))
+
+
+def informer_enabled():
+    """Check whether getters should answer from the watched resources."""
+    return bool(g.config.get("common", {}).get("oc_informer", False))
+
+
+def get_current_namespace(ocp_node):
+    """Get name of the current project of the 'oc' client.
+
+    Name is cached until 'forget_current_namespace' is called for the node.
+    """
+    namespace = NAMESPACES.get(ocp_node)
+    if namespace is None:
+        namespace = NAMESPACES[ocp_node] = command.cmd_run(
+            "oc project -q", hostname=ocp_node)
+    return namespace
+
+
+def forget_current_namespace(ocp_node):
+    """Drop cached name of the current project after switching it."""
+    NAMESPACES.pop(ocp_node, None)
+
+
+def _get_key(obj):
+    metadata = obj["metadata"]
+    return metadata.get("namespace", ""), metadata["name"]
+
+
+def _get_labels(obj):
+    return ["%s=%s" % item for item in six.iteritems(
+        obj["metadata"].get("labels") or {})]
+
+
+def _get_annotations(obj):
+    return ["%s=%s" % (name, value) for name, value in six.iteritems(
+        obj["metadata"].get("annotations") or {})
+        if len(value) <= MAX_INDEXED_ANNOTATION_LENGTH]
+
+
+def _get_claim(obj):
+    claim_ref = obj.get("spec", {}).get("claimRef") or {}
+    if claim_ref.get("name"):
+        return ["%s/%s" % (claim_ref.get("namespace", ""), claim_ref["name"])]
+    return []
+
+
+# Functions providing values, by which resources are indexed, per resource
+# type and index name.
+INDEXERS = {
+    "pod": {
+        "label": _get_labels,
+        "node": lambda obj: [obj.get("spec", {}).get("nodeName")],
+    },
+    "pvc": {
+        "label": _get_labels,
+        "annotation": _get_annotations,
+        "volume": lambda obj: [obj.get("spec", {}).get("volumeName")],
+    },
+    "pv": {
+        "label": _get_labels,
+        "annotation": _get_annotations,
+        "claim": _get_claim,
+    },
+    "event": {
+        "object": lambda obj: [obj.get("involvedObject", {}).get("name")],
+    },
+    "dc": {
+        "label": _get_labels,
+    },
+}
+
+
+class ResourceWatch(object):
+    """In-memory copy of the resources of a type, updated by a watch.
+
+    Resources are stored as dicts, the same as in 'oc get -o json'
+    output, keyed by (namespace, name) tuples. Namespace is an empty
+    string for the not namespaced resources.
+
+    Args:
+        ocp_node (str): node with the 'oc' client.
+        rtype (str): resource type, one of the 'RESOURCES' keys.
+        retry_interval (int|float): seconds to wait before listing the
+            resources again after failures.
+        indexers (dict|None): functions returning lists of values to index
+            a resource by, keyed by index names. Default ones are taken
+            from 'INDEXERS'.
+    """
+
+    def __init__(self, ocp_node, rtype, retry_interval=3, indexers=None):
+        self.ocp_node = ocp_node
+        self.rtype = rtype
+        self.path, self.namespaced = RESOURCES[rtype]
+        self.retry_interval = retry_interval
+        self.indexers = INDEXERS.get(rtype, {}) if indexers is None else (
+            indexers)
+        # {index name: {indexed value: set of resource keys}}
+        self.indexes = dict((name, {}) for name in self.indexers)
+        self.objects = {}
+        self.resource_version = None
+        self.error = None
+        self.relists = 0
+        self._cond = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+        # Process group ID of the running list or watch request
+        self._stream_pgid = None
+
+    def _notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _index(self, key, obj, remove=False):
+        for name, indexer in six.iteritems(self.indexers):
+            index = self.indexes[name]
+            for value in indexer(obj):
+                if value is None:
+                    continue
+                if not remove:
+                    index.setdefault(value, set()).add(key)
+                    continue
+                keys = index.get(value, set())
+                keys.discard(key)
+                if not keys:
+                    index.pop(value, None)
+
+    def _store(self, key, obj):
+        """Store, replace or remove resource, if 'obj' is None."""
+        old_obj = self.objects.pop(key, None)
+        if old_obj is not None:
+            self._index(key, old_obj, remove=True)
+        if obj is not None:
+            self.objects[key] = obj
+            self._index(key, obj)
+
+    def _list(self):
+        cmd = "oc get --raw '%s'" % self.path
+        try:
+            data = list(utils.iter_json_values(command.cmd_run_stream(
+                cmd, hostname=self.ocp_node,
+                on_start=self._on_stream_start)))[0]
+        finally:
+            self._stream_pgid = None
+        with self._cond:
+            self.objects = {}
+            self.indexes = dict((name, {}) for name in self.indexers)
+            for obj in data["items"] or []:
+                self._store(_get_key(obj), obj)
+            self.resource_version = data["metadata"]["resourceVersion"]
+            self.error = None
+            self.relists += 1
+            self._cond.notify_all()
+
+    def _watch(self):
+        """Apply events of a single watch request to the stored resources.
+
+        Returns:
+            bool: False if resources have to be listed again.
+        """
+        cmd = ("oc get --raw "
+               "'%s?watch=true&resourceVersion=%s&timeoutSeconds=%d'" % (
+                   self.path, self.resource_version, WATCH_TIMEOUT))
+        events = utils.iter_json_values(command.cmd_run_stream(
+            cmd, hostname=self.ocp_node, on_start=self._on_stream_start))
+        try:
+            for event in events:
+                if self._stopped:
+                    return True
+                if event["type"] == "ERROR":
+                    # Usually it is '410 Gone', meaning that the resource
+                    # version is too old to continue from it.
+                    g.log.debug("Got error in watch of '%s' resources: %s" % (
+                        self.rtype, event["object"]))
+                    return False
+                obj = event["object"]
+                with self._cond:
+                    if event["type"] == "DELETED":
+                        self._store(_get_key(obj), None)
+                    elif event["type"] in ("ADDED", "MODIFIED"):
+                        self._store(_get_key(obj), obj)
+                    self.resource_version = obj["metadata"]["resourceVersion"]
+                    self._cond.notify_all()
+        finally:
+            self._stream_pgid = None
+            events.close()
+        return True
+
+    def _on_stream_start(self, pgid):
+        self._stream_pgid = pgid
+        if self._stopped:
+            self._kill_stream()
+
+    def _kill_stream(self):
+        """Kill running request, so that stopping is not delayed."""
+        pgid = self._stream_pgid
+        if pgid is None:
+            return
+        command.cmd_run("kill -KILL -- -%d" % pgid, hostname=self.ocp_node,
+                        raise_on_error=False)
+
+    def _run(self):
+        relist = True
+        while not self._stopped:
+            try:
+                if relist:
+                    self._list()
+                relist = not self._watch()
+            except Exception as e:
+                if self._stopped:
+                    # Watch request got killed by 'stop'
+                    break
+                g.log.error("Watch of '%s' resources on '%s' node failed, "
+                            "retrying in %s sec. Error: %s" % (
+                                self.rtype, self.ocp_node,
+                                self.retry_interval, e))
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                relist = True
+                time.sleep(self.retry_interval)
+
+    def start(self, timeout=60):
+        """Start watching and wait for the initial list of resources.
+
+        It is safe to call it in parallel and several times, the watch
+        gets started once and all the callers wait for it.
+
+        Raises:
+            WatchUnavailableError: if resources could not be listed.
+        """
+        with self._start_lock:
+            if self._stopped:
+                raise WatchUnavailableError(
+                    "Watch of '%s' resources on '%s' node is stopped. "
+                    "Error: %s" % (self.rtype, self.ocp_node, self.error))
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+            self._wait_for_list(timeout)
+
+    def _wait_for_list(self, timeout):
+        with self._cond:
+            deadline = time.time() + timeout
+            while self.resource_version is None and self.error is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if self.resource_version is None:
+                self.stop()
+                raise WatchUnavailableError(
+                    "Failed to start watch of '%s' resources on '%s' node. "
+                    "Error: %s" % (self.rtype, self.ocp_node, self.error))
+
+    def stop(self):
+        """Stop watching, killing the currently running watch request."""
+        self._stopped = True
+        self._notify()
+        try:
+            self._kill_stream()
+        except Exception as e:
+            # Request gets finished by the server after 'WATCH_TIMEOUT'
+            g.log.error("Failed to kill watch of '%s' resources on '%s' "
+                        "node. Error: %s" % (self.rtype, self.ocp_node, e))
+
+    def get(self, name, namespace=""):
+        """Get stored resource by name or None if it is absent."""
+        if not self.namespaced:
+            namespace = ""
+        return self.objects.get((namespace, name))
+
+    def find(self, namespace=None, labels=None):
+        """Get stored resources filtered by namespace and labels.
+
+        Args:
+            namespace (str|None): namespace of the resources, None means
+                all the namespaces.
+            labels (dict|None): labels which resources should have.
+        Returns:
+            list: dicts with data about the resources.
+        """
+        labels = labels or {}
+        with self._cond:
+            if labels and "label" in self.indexes:
+                keys = set.intersection(*[
+                    self.indexes["label"].get("%s=%s" % item, set())
+                    for item in labels.items()])
+            else:
+                keys = self.objects.keys()
+            found = []
+            for key in sorted(keys):
+                obj = self.objects[key]
+                obj_labels = obj["metadata"].get("labels") or {}
+                if namespace is not None and key[0] != namespace:
+                    continue
+                if any(obj_labels.get(label) != value
+                       for label, value in labels.items()):
+                    continue
+                found.append(obj)
+            return found
+
+    def get_by_index(self, index_name, value, namespace=None):
+        """Get stored resources by the indexed value.
+
+        Args:
+            index_name (str): name of the index, like 'label'.
+            value (str): indexed value, like 'glusterfs-node=pod'.
+            namespace (str|None): namespace of the resources, None means
+                all the namespaces.
+        Returns:
+            list: dicts with data about the resources.
+        """
+        with self._cond:
+            return [self.objects[key] for key in sorted(
+                self.indexes[index_name].get(value, ()))
+                if namespace is None or key[0] == namespace]
+
+    def wait_for(self, predicate, timeout):
+        """Wait for the stored resources to satisfy the predicate.
+
+        Predicate is called with this object as the only argument after
+        each change of the resources, with the lock held, so it should
+        not run remote commands.
+
+        Args:
+            predicate (callable): returns true value when waiting is over.
+                Exceptions raised by it are propagated.
+            timeout (int|float): max amount of seconds to wait.
+        Returns:
+            Last value returned by the predicate, false one on timeout.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                result = predicate(self)
+                remaining = deadline - time.time()
+                if result or remaining <= 0:
+                    return result
+                self._cond.wait(remaining)
+
+
+def get_watch(ocp_node, rtype):
+    """Get started watch of the resources shared by all the waits.
+
+    Args:
+        ocp_node (str): node with the 'oc' client.
+        rtype (str): resource type, one of the 'RESOURCES' keys.
+    Returns:
+        ResourceWatch object instance.
+    Raises:
+        WatchUnavailableError: if resources could not be listed.
+    """
+    key = (ocp_node, rtype)
+    with _WATCHES_LOCK:
+        watch = WATCHES.get(key)
+        if watch is None:
+            watch = WATCHES[key] = ResourceWatch(ocp_node, rtype)
+    # Started out of the global lock, so that getting watches of the other
+    # resources does not wait for it.
+    try:
+        watch.start()
+    except WatchUnavailableError:
+        with _WATCHES_LOCK:
+            if WATCHES.get(key) is watch:
+                del WATCHES[key]
+        raise
+    return watch
+
+
+def stop_watches():
+    """Stop all the shared watches.
+
+    Called at the end of each test class by 'BaseClass.tearDownClass'.
+    """
+    with _WATCHES_LOCK:
+        watches = list(WATCHES.values())
+        WATCHES.clear()
+    for watch in watches:
+        watch.stop()
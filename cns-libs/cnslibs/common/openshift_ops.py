@@ -4,18 +4,23 @@ Various utility functions for interacting with OCP/OpenShift.
 """
 
 import base64
+import calendar
+import copy
 import json
 import re
+import time
 import types
 
 from glusto.core import Glusto as g
 from glustolibs.gluster import volume_ops
 import mock
-import yaml
 
+from cnslibs.common import capability_cache
 from cnslibs.common import command
+from cnslibs.common import command_stats
 from cnslibs.common import exceptions
-from cnslibs.common import openshift_version
+from cnslibs.common import oc_watch
+from cnslibs.common import pod_session
 from cnslibs.common import utils
 from cnslibs.common import waiter
 from cnslibs.common.heketi_ops import (
@@ -42,6 +47,13 @@ def oc_get_pods(ocp_node, selector=None):
         dict : dict of pods info in the current project.
     """
 
+    informer = _get_informer(ocp_node, 'pod')
+    labels = _parse_equality_selector(selector)
+    if informer is not None and labels is not None:
+        namespace = oc_watch.get_current_namespace(ocp_node)
+        return dict((pod['metadata']['name'], _get_pod_info(pod))
+                    for pod in informer.find(namespace, labels))
+
     cmd = "oc get -o wide --no-headers=true pods"
     if selector:
         cmd += " --selector %s" % selector
@@ -78,23 +90,109 @@ def _parse_wide_pods_output(output):
     return pods_info
 
 
+def _parse_equality_selector(selector):
+    """Parse label selector consisting of the equality requirements.
+
+    Returns:
+        dict: label values keyed by label names, None if selector has
+            other kinds of requirements.
+    """
+    labels = {}
+    for requirement in (selector or '').split(','):
+        if not requirement.strip():
+            continue
+        match = re.match(r'^\s*([\w./-]+)\s*==?\s*([\w.-]*)\s*$',
+                         requirement)
+        if not match:
+            return None
+        labels[match.group(1)] = match.group(2)
+    return labels
+
+
+def _get_age(timestamp):
+    """Get age of a resource by its creation timestamp, like 'oc' does."""
+    seconds = int(time.time() - calendar.timegm(
+        time.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')))
+    for unit, unit_seconds in (('y', 365 * 86400), ('d', 86400),
+                               ('h', 3600), ('m', 60)):
+        if seconds >= unit_seconds:
+            return '%d%s' % (seconds // unit_seconds, unit)
+    return '%ds' % max(seconds, 0)
+
+
+def _get_terminated_reason(terminated):
+    return terminated.get('reason') or (
+        'Signal:%s' % terminated['signal'] if terminated.get('signal')
+        else 'ExitCode:%s' % terminated.get('exitCode'))
+
+
+def _get_pod_info(pod):
+    """Get info about pod the same as in 'oc get -o wide pods' output.
+
+    Status is calculated by the same rules as 'oc' uses.
+    """
+    status = pod.get('status', {})
+    reason = status.get('reason') or status.get('phase')
+    ready, restarts, initializing = 0, 0, False
+    init_statuses = status.get('initContainerStatuses') or []
+    for i, container_status in enumerate(init_statuses):
+        restarts += container_status.get('restartCount', 0)
+        state = container_status.get('state') or {}
+        terminated = state.get('terminated')
+        waiting_reason = (state.get('waiting') or {}).get('reason')
+        if terminated and terminated.get('exitCode') == 0:
+            continue
+        initializing = True
+        if terminated:
+            reason = 'Init:' + _get_terminated_reason(terminated)
+        elif waiting_reason and waiting_reason != 'PodInitializing':
+            reason = 'Init:' + waiting_reason
+        else:
+            reason = 'Init:%d/%d' % (
+                i, len(pod['spec'].get('initContainers') or []))
+        break
+    if not initializing:
+        restarts = 0
+        for container_status in reversed(
+                status.get('containerStatuses') or []):
+            restarts += container_status.get('restartCount', 0)
+            state = container_status.get('state') or {}
+            if (state.get('waiting') or {}).get('reason'):
+                reason = state['waiting']['reason']
+            elif 'terminated' in state:
+                reason = _get_terminated_reason(state['terminated'])
+            elif container_status.get('ready') and 'running' in state:
+                ready += 1
+    if pod['metadata'].get('deletionTimestamp'):
+        reason = 'Unknown' if status.get('reason') == 'NodeLost' else (
+            'Terminating')
+    return {
+        'ready': '%d/%d' % (ready, len(pod['spec'].get('containers') or [])),
+        'status': reason,
+        'restarts': str(restarts),
+        'age': _get_age(pod['metadata']['creationTimestamp']),
+        'ip': status.get('podIP') or '<none>',
+        'node': pod['spec'].get('nodeName') or '<none>',
+    }
+
+
 def oc_get_pods_full(ocp_node):
-    """Gets all the pod info via YAML in the current project.
+    """Gets all the pod info via JSON in the current project.
 
     Args:
         ocp_node (str): Node in which ocp command will be executed.
 
     Returns:
-        dict: The YAML output converted to python objects
+        dict: The JSON output converted to python objects
             (a top-level dict)
     """
 
-    cmd = "oc get -o yaml pods"
+    cmd = "oc get -o json pods"
     ret, out, err = g.run(ocp_node, cmd)
     if ret != 0:
         g.log.error("Failed to get ocp pods on node %s" % ocp_node)
         raise AssertionError('failed to get pods: %r' % (err,))
-    return yaml.load(out)
+    return json.loads(out)
 
 
 def get_ocp_gluster_pod_names(ocp_node):
@@ -153,6 +251,7 @@ def switch_oc_project(ocp_node, project_name):
 
     cmd = "oc project %s" % project_name
     ret, _, _ = g.run(ocp_node, cmd)
+    oc_watch.forget_current_namespace(ocp_node)
     if ret != 0:
         g.log.error("Failed to switch to project %s" % project_name)
         return False
@@ -195,6 +294,10 @@ def oc_rsh(ocp_node, pod_name, command, log_level=None):
     Returns:
         A tuple consisting of the command return code, stdout, and stderr.
     """
+    if pod_session.sessions_enabled():
+        return command_stats.timed_run(
+            ocp_node, command, pod_session.run_in_pod,
+            ocp_node, pod_name, command)
     prefix = ['oc', 'rsh', pod_name]
     if isinstance(command, types.StringTypes):
         cmd = ' '.join(prefix + [command])
@@ -470,7 +573,7 @@ def oc_delete(ocp_node, rtype, name, raise_on_absence=True):
                        raise_on_error=raise_on_absence):
         return
     cmd = ['oc', 'delete', rtype, name]
-    if openshift_version.get_openshift_version() >= '3.11':
+    if capability_cache.has_feature('oc_delete_wait_false'):
         cmd.append('--wait=false')
 
     ret, out, err = g.run(ocp_node, cmd)
@@ -538,6 +641,9 @@ def oc_get_custom_resource(ocp_node, rtype, custom, name=None, selector=None,
 def oc_get_yaml(ocp_node, rtype, name=None, raise_on_error=True):
     """Get an OCP resource by name.
 
+    Despite the name, resource is fetched in JSON format, which is parsed
+    much faster than YAML and contains the same data.
+
     Args:
         ocp_node (str): Node on which the ocp command will run.
         rtype (str): Name of the resource type (pod, storageClass, etc).
@@ -551,7 +657,7 @@ def oc_get_yaml(ocp_node, rtype, name=None, raise_on_error=True):
         AssertionError: Raised when unable to get resource and
             `raise_on_error` is true.
     """
-    cmd = ['oc', 'get', '-oyaml', rtype]
+    cmd = ['oc', 'get', '-ojson', rtype]
     if name is not None:
         cmd.append(name)
     ret, out, err = g.run(ocp_node, cmd)
@@ -561,31 +667,62 @@ def oc_get_yaml(ocp_node, rtype, name=None, raise_on_error=True):
             raise AssertionError('failed to get %s: %s: %r'
                                  % (rtype, name, err))
         return {}
-    return yaml.load(out)
+    return json.loads(out)
+
+
+def oc_get_items(ocp_node, rtype, field_selector=None, selector=None):
+    """Lazily iterate over all the OCP resources of the given type.
+
+    Output of the 'oc get' command is streamed and decoded item by item,
+    so memory usage does not depend on the amount of resources.
+
+    Args:
+        ocp_node (str): Node on which the ocp command will run.
+        rtype (str): Name of the resource type (pv, events, etc).
+        field_selector (str|None): value for the '--field-selector' option.
+        selector (str|None): value for the '--selector' option.
+    Returns:
+        generator: dicts with data about the resources.
+    Raises:
+        AssertionError: Raised when unable to get resources.
+    """
+    cmd = ['oc', 'get', '-o', 'json', rtype]
+    if field_selector:
+        cmd.append("--field-selector '%s'" % field_selector)
+    if selector:
+        cmd.append("--selector '%s'" % selector)
+    return utils.iter_json_list_items(
+        command.cmd_run_stream(cmd, hostname=ocp_node))
 
 
 def oc_get_pvc(ocp_node, name):
     """Get information on a persistant volume claim.
 
+    With informer enabled, data may be stale, see '_get_from_informer'.
+
     Args:
         ocp_node (str): Node on which the ocp command will run.
         name (str): Name of the PVC.
     Returns:
         dict: Dictionary containting data about the PVC.
     """
-    return oc_get_yaml(ocp_node, 'pvc', name)
+    return (_get_from_informer(ocp_node, 'pvc', name) or
+            oc_get_yaml(ocp_node, 'pvc', name))
 
 
 def oc_get_pv(ocp_node, name):
     """Get information on a persistant volume.
 
+    With informer enabled, data may be stale, see '_get_from_informer'.
+
     Args:
         ocp_node (str): Node on which the ocp command will run.
         name (str): Name of the PV.
     Returns:
         dict: Dictionary containting data about the PV.
     """
-    return oc_get_yaml(ocp_node, 'pv', name)
+    return (_get_from_informer(ocp_node, 'pv', name) or
+            oc_get_yaml(ocp_node, 'pv', name))
 
 
 def oc_get_all_pvs(ocp_node):
@@ -599,6 +736,17 @@ def oc_get_all_pvs(ocp_node):
     return oc_get_yaml(ocp_node, 'pv', None)
 
 
+def iter_all_pvs(ocp_node):
+    """Lazily iterate over all persistent volumes.
+
+    Args:
+        ocp_node (str): Node on which the ocp command will run.
+    Returns:
+        generator: dicts with data about the PVs.
+    """
+    return oc_get_items(ocp_node, 'pv')
+
+
 def create_namespace(hostname, namespace):
     '''
      This function creates namespace
@@ -612,6 +760,7 @@ def create_namespace(hostname, namespace):
     '''
     cmd = "oc new-project %s" % namespace
     ret, out, err = g.run(hostname, cmd, "root")
+    oc_watch.forget_current_namespace(hostname)
     if ret == 0:
         g.log.info("new namespace %s successfully created" % namespace)
         return True
@@ -623,8 +772,85 @@ def create_namespace(hostname, namespace):
     return False
 
 
-def wait_for_resource_absence(ocp_node, rtype, name,
-                              interval=5, timeout=300):
+def _get_shared_watch(ocp_node, rtype, enabled):
+    if not enabled or rtype not in oc_watch.RESOURCES:
+        return None
+    try:
+        return oc_watch.get_watch(ocp_node, rtype)
+    except oc_watch.WatchUnavailableError as e:
+        g.log.error("%s Falling back to 'oc get' commands." % e)
+        return None
+
+
+def _get_watch_for_wait(ocp_node, rtype):
+    """Get shared watch of the resources if waits should use it.
+
+    Returns:
+        oc_watch.ResourceWatch object instance or None if resources
+        should be polled.
+    """
+    return _get_shared_watch(ocp_node, rtype, oc_watch.watches_enabled())
+
+
+def _get_informer(ocp_node, rtype):
+    """Get shared watch of the resources if getters should use it.
+
+    Returns:
+        oc_watch.ResourceWatch object instance or None if resources
+        should be fetched using 'oc get' commands.
+    """
+    return _get_shared_watch(ocp_node, rtype, oc_watch.informer_enabled())
+
+
+def _get_from_informer(ocp_node, rtype, name):
+    """Get copy of a resource from informer.
+
+    Informer is not read-your-writes: changes made right before the call
+    are not seen until their events arrive, and until then the previous
+    state of the resource is returned. Callers, which need the result of
+    their own change, should use 'oc_get_yaml' or wait for the change.
+
+    Returns:
+        dict: data about the resource or None if informer is disabled
+            or does not have the resource.
+    """
+    informer = _get_informer(ocp_node, rtype)
+    if informer is None:
+        return None
+    namespace = (oc_watch.get_current_namespace(ocp_node)
+                 if informer.namespaced else '')
+    obj = informer.get(name, namespace)
+    return copy.deepcopy(obj) if obj is not None else None
+
+
+def _wait_for_resource_absence_using_watch(ocp_node, rtype, name, timeout):
+    """Wait for resource absence using watches.
+
+    Returns:
+        tuple: whether or not resource is absent, resource and name of PV
+            bound to a PVC. None if watches should not be used.
+    """
+    watch = _get_watch_for_wait(ocp_node, rtype)
+    pv_watch = _get_watch_for_wait(ocp_node, 'pv') if rtype == 'pvc' else None
+    if watch is None or (rtype == 'pvc' and pv_watch is None):
+        return None
+    namespace = oc_watch.get_current_namespace(ocp_node)
+    deadline = time.time() + timeout
+    if not watch.wait_for(lambda w: w.get(name, namespace) is None, timeout):
+        return False, watch.get(name, namespace), None
+    if rtype == 'pvc':
+        def _get_pv_names(w):
+            return [pv['metadata']['name'] for pv in w.find()
+                    if (pv['spec'].get('claimRef') or {}).get('name') == name]
+
+        if not pv_watch.wait_for(lambda w: not _get_pv_names(w),
+                                 max(deadline - time.time(), 0)):
+            return False, None, (_get_pv_names(pv_watch) or [None])[0]
+    return True, None, None
+
+
+def _wait_for_resource_absence_using_polling(ocp_node, rtype, name,
+                                             interval, timeout):
     _waiter = waiter.Waiter(timeout=timeout, interval=interval)
     resource, pv_name = None, None
     for w in _waiter:
@@ -642,7 +868,18 @@ def wait_for_resource_absence(ocp_node, rtype, name,
                 pv_name = _pv_name
             if ret != 0:
                 break
-    if w.expired:
+    return not w.expired, resource, pv_name
+
+
+def wait_for_resource_absence(ocp_node, rtype, name,
+                              interval=5, timeout=300):
+    result = _wait_for_resource_absence_using_watch(
+        ocp_node, rtype, name, timeout)
+    if result is None:
+        result = _wait_for_resource_absence_using_polling(
+            ocp_node, rtype, name, interval, timeout)
+    absent, resource, pv_name = result
+    if not absent:
         # Gather more info for ease of debugging
         try:
             r_events = get_events(ocp_node, obj_name=name)
@@ -776,6 +1013,17 @@ def get_gluster_pod_names_by_pvc_name(ocp_node, pvc_name):
     return data
 
 
+def _cmd_run_in_pod_session(ocp_client_node, pod_name, cmd):
+    """Run command using shell session of a pod the same way as 'cmd_run'."""
+    ret, out, err = command_stats.timed_run(
+        ocp_client_node, cmd, pod_session.run_in_pod,
+        ocp_client_node, pod_name, cmd)
+    msg = ("Failed to execute command '%s' in '%s' pod. Got non-zero "
+           "return code '%s'. Err: %s" % (cmd, pod_name, ret, err))
+    assert int(ret) == 0, msg
+    return out.strip() if out else out
+
+
 def cmd_run_on_gluster_pod_or_node(ocp_client_node, cmd, gluster_node=None):
     """Run shell command on either Gluster PODs or Gluster nodes.
 
@@ -806,6 +1054,9 @@ def cmd_run_on_gluster_pod_or_node(ocp_client_node, cmd, gluster_node=None):
 
         for gluster_pod_name in gluster_pod_names:
             try:
+                if pod_session.sessions_enabled():
+                    return _cmd_run_in_pod_session(
+                        ocp_client_node, gluster_pod_name, cmd)
                 pod_cmd = "oc exec %s -- %s" % (gluster_pod_name, cmd)
                 return command.cmd_run(pod_cmd, hostname=ocp_client_node)
             except Exception as e:
@@ -835,6 +1086,87 @@ def cmd_run_on_gluster_pod_or_node(ocp_client_node, cmd, gluster_node=None):
     raise exceptions.ExecutionError(err_msg)
 
 
+def _timed_cmd_run(cmd, hostname):
+    """Run command and return dict with its output or error and duration."""
+    start = time.time()
+    result = {"output": None, "error": None}
+    try:
+        result["output"] = command.cmd_run(cmd, hostname=hostname)
+    except Exception as e:
+        result["error"] = str(e)
+    result["time"] = time.time() - start
+    return result
+
+
+def cmd_run_on_gluster_pods_or_nodes(ocp_client_node, cmd, gluster_nodes=None):
+    """Run shell command on all the Gluster PODs or nodes concurrently.
+
+    Args:
+        ocp_client_node (str): Node to execute OCP commands on.
+        cmd (str): shell command to run.
+        gluster_nodes (list): optional. Allows to chose specific gluster
+            nodes, keeping abstraction from deployment type. Each item can
+            be either IP address or node name from "oc get nodes" command.
+    Returns:
+        dict: results per Gluster node, where keys are IP addresses for
+            Gluster PODs and node names from config for standalone Gluster.
+            Example:
+                {"10.70.46.1": {
+                    "pod_name": "glusterfs-storage-5fq9v",  # None for nodes
+                    "output": "<stripped stdout>",  # None in case of error
+                    "error": None,  # error message in case of failure
+                    "time": 0.42}}  # duration of the command in seconds
+    Raises:
+        exceptions.ExecutionError: when neither Gluster PODs nor Gluster
+            nodes are found.
+    """
+    # NOTE: 'async_runner' module imports this one, so import it here to
+    # avoid circular imports.
+    from cnslibs.common import async_runner
+
+    results, futures = {}, {}
+
+    # Containerized Glusterfs
+    gluster_pods = oc_get_pods(ocp_client_node, selector="glusterfs-node=pod")
+    if gluster_pods:
+        for pod_name, pod_data in gluster_pods.items():
+            if gluster_nodes and not (
+                    set(gluster_nodes) & set((pod_data["ip"],
+                                              pod_data["node"]))):
+                continue
+            pod_cmd = "oc exec %s -- %s" % (pod_name, cmd)
+            futures[pod_data["ip"]] = (pod_name, async_runner.async_call(
+                ocp_client_node, _timed_cmd_run, pod_cmd, ocp_client_node))
+        for gluster_node in gluster_nodes or []:
+            if not any(gluster_node in (pod_data["ip"], pod_data["node"])
+                       for pod_data in gluster_pods.values()):
+                results[gluster_node] = {
+                    "pod_name": None, "output": None, "time": 0.0,
+                    "error": "Could not find Gluster PODs with node filter "
+                             "as '%s'." % gluster_node}
+
+    # Standalone Glusterfs
+    else:
+        g_hosts = gluster_nodes or g.config.get("gluster_servers", {}).keys()
+        if not g_hosts:
+            raise exceptions.ExecutionError(
+                "Haven't found neither Gluster PODs nor Gluster nodes.")
+        for g_host in g_hosts:
+            futures[g_host] = (None, async_runner.async_call(
+                g_host, _timed_cmd_run, cmd, g_host))
+
+    for gluster_node, (pod_name, future) in futures.items():
+        results[gluster_node] = future.result()
+        results[gluster_node]["pod_name"] = pod_name
+        if results[gluster_node]["error"]:
+            g.log.error(
+                "Failed to run '%s' command on '%s' Gluster %s. Error: %s" % (
+                    cmd, pod_name or gluster_node,
+                    "POD" if pod_name else "node",
+                    results[gluster_node]["error"]))
+    return results
+
+
 def get_gluster_vol_info_by_pvc_name(ocp_node, pvc_name):
     """Get Gluster volume info based on the PVC name.
 
@@ -923,6 +1255,29 @@ def wait_for_pod_be_ready(hostname, pod_name,
          bool: True if pod status is Running and ready state,
                otherwise Raise Exception
     '''
+    watch = _get_watch_for_wait(hostname, 'pod')
+    if watch is not None:
+        namespace = oc_watch.get_current_namespace(hostname)
+
+        def _is_pod_ready(w):
+            status = (w.get(pod_name, namespace) or {}).get('status', {})
+            if status.get('phase') == "Error":
+                msg = ("pod %s status error" % pod_name)
+                g.log.error(msg)
+                raise exceptions.ExecutionError(msg)
+            container_status = (status.get('containerStatuses') or [{}])[0]
+            return bool(container_status.get('ready') and
+                        status.get('phase') == "Running")
+
+        if watch.wait_for(_is_pod_ready, timeout):
+            g.log.info("pod %s is in ready state and is "
+                       "Running" % pod_name)
+            return True
+        err_msg = ("exceeded timeout %s for waiting for pod %s "
+                   "to be in ready state" % (timeout, pod_name))
+        g.log.error(err_msg)
+        raise exceptions.ExecutionError(err_msg)
+
     for w in waiter.Waiter(timeout, wait_step):
         # command to find pod status and its phase
         cmd = ("oc get pods %s -o=custom-columns="
@@ -978,6 +1333,26 @@ def get_pod_names_from_dc(hostname, dc_name, timeout=180, wait_step=3):
     replicas = int(command.cmd_run(
         get_replicas_amount_cmd, hostname=hostname))
 
+    watch = _get_watch_for_wait(hostname, 'pod')
+    if watch is not None:
+        def _get_pod_names(w):
+            pod_names = sorted(
+                pod['metadata']['name'] for pod in w.find(
+                    labels={'deploymentconfig': dc_name}))
+            return pod_names if len(pod_names) == replicas else None
+
+        pod_names = watch.wait_for(_get_pod_names, timeout)
+        if pod_names:
+            g.log.info(
+                "POD names for '%s' DC are '%s'. "
+                "Expected amount of PODs is '%s'.",
+                dc_name, pod_names, replicas)
+            return pod_names
+        err_msg = ("Exceeded %s sec timeout waiting for PODs to appear "
+                   "in amount of %s." % (timeout, replicas))
+        g.log.error(err_msg)
+        raise exceptions.ExecutionError(err_msg)
+
     get_pod_names_cmd = (
         "oc get pods --all-namespaces -o=custom-columns=:.metadata.name "
         "--no-headers=true --selector deploymentconfig=%s" % dc_name)
@@ -1036,6 +1411,26 @@ def verify_pvc_status_is_bound(hostname, pvc_name, timeout=120, wait_step=3):
     Returns: None
     Raises: exceptions.ExecutionError in case of errors.
     """
+    watch = _get_watch_for_wait(hostname, 'pvc')
+    if watch is not None:
+        namespace = oc_watch.get_current_namespace(hostname)
+
+        def _is_pvc_bound(w):
+            pvc = w.get(pvc_name, namespace)
+            phase = (pvc or {}).get('status', {}).get('phase')
+            if pvc is None or phase == "Pending":
+                return False
+            elif phase == "Bound":
+                return True
+            msg = "PVC %s has different status - %s" % (pvc_name, phase)
+            g.log.error(msg)
+            raise AssertionError(msg)
+
+        if watch.wait_for(_is_pvc_bound, timeout):
+            g.log.info("PVC '%s' is in Bound state." % pvc_name)
+            return pvc_name
+        _raise_pvc_bound_timeout_error(hostname, pvc_name, timeout)
+
     pvc_not_found_counter = 0
     for w in waiter.Waiter(timeout, wait_step):
         ret, output = get_pvc_status(hostname, pvc_name)
@@ -1069,18 +1464,130 @@ def verify_pvc_status_is_bound(hostname, pvc_name, timeout=120, wait_step=3):
         if msg:
             raise AssertionError(msg)
     if w.expired:
-        msg = ("Exceeded timeout of '%s' seconds for verifying PVC '%s' "
-               "to reach the 'Bound' state." % (timeout, pvc_name))
+        _raise_pvc_bound_timeout_error(hostname, pvc_name, timeout)
+
+
+def _raise_pvc_bound_timeout_error(hostname, pvc_name, timeout):
+    msg = ("Exceeded timeout of '%s' seconds for verifying PVC '%s' "
+           "to reach the 'Bound' state." % (timeout, pvc_name))
+
+    # Gather more info for ease of debugging
+    try:
+        pvc_events = get_events(hostname, obj_name=pvc_name)
+    except Exception:
+        pvc_events = '?'
+    msg += "\nPVC events: %s" % pvc_events
+
+    g.log.error(msg)
+    raise AssertionError(msg)
+
+
+def _check_pvc_phases(phases, pending, bound_times, not_found_counters,
+                      start_time):
+    """Move bound PVCs from the pending ones, failing on unexpected phases.
+
+    Args:
+        phases (dict): phases of the existing PVCs keyed by their names.
+    """
+    for pvc_name in list(pending):
+        phase = phases.get(pvc_name)
+        if phase is None:
+            not_found_counters[pvc_name] = (
+                not_found_counters.get(pvc_name, 0) + 1)
+            if not_found_counters[pvc_name] > 1:
+                msg = ("PVC '%s' has not been found 2 times already. "
+                       "Make sure you provided correct PVC name." % pvc_name)
+                g.log.error(msg)
+                raise AssertionError(msg)
+        elif phase == "Bound":
+            pending.remove(pvc_name)
+            bound_times[pvc_name] = time.time() - start_time
+            g.log.info("PVC '%s' is in Bound state after %.1f sec." % (
+                pvc_name, bound_times[pvc_name]))
+        elif phase != "Pending":
+            msg = "PVC %s has different status - %s" % (pvc_name, phase)
+            g.log.error(msg)
+            raise AssertionError(msg)
+
+
+def wait_for_pvcs_bound(hostname, pvc_names, timeout=120, wait_step=3):
+    """Wait for all the PVCs to get 'Bound' status in required time.
+
+    Phases of all the PVCs are taken from single 'oc get pvc -o json'
+    command per check, or from the shared watch of PVCs, if watches are
+    enabled. Bound PVCs are not checked anymore. In both cases absence of
+    a PVC is checked once per 'wait_step' and PVC absent on 2 checks is
+    considered an error.
+
+    Args:
+        hostname (str): hostname on which we will execute oc commands
+        pvc_names (list): names of PVCs to check status of
+        timeout (int): total time in seconds we are ok to wait
+                       for 'Bound' status of all the PVCs, not for
+                       each of them
+        wait_step (int): time in seconds we will sleep before checking
+                         PVCs status again.
+    Returns:
+        dict: seconds it took PVCs to get 'Bound' status, keyed by
+            PVC names.
+    Raises:
+        AssertionError: if some PVC has unexpected status or timeout
+            is exceeded.
+    """
+    pending, bound_times, not_found_counters = set(pvc_names), {}, {}
+    start_time = time.time()
+    watch = _get_watch_for_wait(hostname, 'pvc')
+    if watch is not None:
+        namespace = oc_watch.get_current_namespace(hostname)
+
+        def _get_phases(w):
+            return dict(
+                (pvc['metadata']['name'], pvc['status'].get('phase'))
+                for pvc in w.find(namespace=namespace))
+
+        def _are_pvcs_bound(w):
+            phases = _get_phases(w)
+            # Absent PVCs are counted once per 'wait_step' only, below
+            phases.update((pvc_name, "Pending")
+                          for pvc_name in pending if pvc_name not in phases)
+            _check_pvc_phases(phases, pending, bound_times,
+                              not_found_counters, start_time)
+            return not pending
+
+        deadline = start_time + timeout
+        while True:
+            _check_pvc_phases(_get_phases(watch), pending, bound_times,
+                              not_found_counters, start_time)
+            remaining = deadline - time.time()
+            if not pending or remaining <= 0:
+                break
+            watch.wait_for(_are_pvcs_bound, min(wait_step, remaining))
+    else:
+        for w in waiter.Waiter(timeout, wait_step):
+            phases = dict(
+                (pvc['metadata']['name'], pvc['status'].get('phase'))
+                for pvc in oc_get_items(hostname, 'pvc'))
+            _check_pvc_phases(phases, pending, bound_times,
+                              not_found_counters, start_time)
+            if not pending:
+                break
+            g.log.info("PVCs %s are not bound yet, sleeping for %s "
+                       "sec." % (sorted(pending), wait_step))
+    if pending:
+        msg = ("Exceeded timeout of '%s' seconds for verifying PVCs %s "
+               "to reach the 'Bound' state." % (timeout, sorted(pending)))
 
         # Gather more info for ease of debugging
+        pvc_name = sorted(pending)[0]
         try:
             pvc_events = get_events(hostname, obj_name=pvc_name)
         except Exception:
             pvc_events = '?'
-        msg += "\nPVC events: %s" % pvc_events
+        msg += "\nEvents of '%s' PVC: %s" % (pvc_name, pvc_events)
 
         g.log.error(msg)
         raise AssertionError(msg)
+    return bound_times
 
 
 def resize_pvc(hostname, pvc_name, size):
@@ -1194,7 +1701,9 @@ def verify_pv_size(hostname, pv_name, size,
 
 def get_pv_name_from_pvc(hostname, pvc_name):
     '''
-     Returns PV name of the corresponding PVC name
+     Returns PV name of the corresponding PVC name.
+     PV name is taken from informer, if it is enabled and PVC is bound
+     there, see '_get_from_informer'.
      Args:
          hostname (str): hostname on which we want
                          to find pv name
@@ -1205,9 +1714,13 @@ def get_pv_name_from_pvc(hostname, pvc_name):
          pv_name (str): pv name if successful,
                         otherwise raise Exception
     '''
-    cmd = ("oc get pvc %s -o=custom-columns=:."
-           "spec.volumeName" % pvc_name)
-    pv_name = command.cmd_run(cmd, hostname=hostname)
+    pvc = _get_from_informer(hostname, 'pvc', pvc_name)
+    if pvc and pvc['spec'].get('volumeName'):
+        pv_name = pvc['spec']['volumeName']
+    else:
+        cmd = ("oc get pvc %s -o=custom-columns=:."
+               "spec.volumeName" % pvc_name)
+        pv_name = command.cmd_run(cmd, hostname=hostname)
     g.log.info("pv name is %s for pvc %s" % (
                    pv_name, pvc_name))
 
@@ -1233,11 +1746,18 @@ def get_vol_names_from_pv(hostname, pv_name):
                     otherwise raise Exception
     '''
     vol_dict = {}
-    cmd = (r"oc get pv %s -o=custom-columns="
-           r":.metadata.annotations."
-           r"'gluster\.kubernetes\.io\/heketi\-volume\-id',"
-           r":.spec.glusterfs.path" % pv_name)
-    vol_list = command.cmd_run(cmd, hostname=hostname).split()
+    pv = _get_from_informer(hostname, 'pv', pv_name)
+    if pv:
+        vol_list = [
+            pv['metadata'].get('annotations', {}).get(
+                'gluster.kubernetes.io/heketi-volume-id') or '<none>',
+            pv['spec'].get('glusterfs', {}).get('path') or '<none>']
+    else:
+        cmd = (r"oc get pv %s -o=custom-columns="
+               r":.metadata.annotations."
+               r"'gluster\.kubernetes\.io\/heketi\-volume\-id',"
+               r":.spec.glusterfs.path" % pv_name)
+        vol_list = command.cmd_run(cmd, hostname=hostname).split()
     vol_dict = {"heketi_vol": vol_list[0],
                 "gluster_vol": vol_list[1]}
     g.log.info("gluster vol name is %s and heketi vol name"
@@ -1251,6 +1771,32 @@ def get_events(hostname,
                event_reason=None, event_type=None):
     """Return filtered list of events.
 
+    See 'iter_events' for description of the arguments.
+    """
+    informer = _get_informer(hostname, 'event')
+    if informer is not None:
+        # 'oc get events' shows events of the current project only
+        namespace = oc_watch.get_current_namespace(hostname)
+        events = (informer.get_by_index('object', obj_name, namespace)
+                  if obj_name else informer.find(namespace))
+        return [
+            copy.deepcopy(event) for event in events
+            if (not obj_namespace or
+                event['involvedObject'].get('namespace') == obj_namespace)
+            and (not obj_type or
+                 event['involvedObject'].get('kind') == obj_type)
+            and (not event_reason or event.get('reason') == event_reason)
+            and (not event_type or event.get('type') == event_type)]
+    return list(iter_events(
+        hostname, obj_name=obj_name, obj_namespace=obj_namespace,
+        obj_type=obj_type, event_reason=event_reason, event_type=event_type))
+
+
+def iter_events(hostname,
+                obj_name=None, obj_namespace=None, obj_type=None,
+                event_reason=None, event_type=None):
+    """Lazily iterate over filtered events.
+
     Args:
         hostname (str): hostname of oc client
         obj_name (str): name of an object
@@ -1260,7 +1806,7 @@ def get_events(hostname,
             i.e. Created, Started, Unhealthy, SuccessfulCreate, Scheduled ...
         event_type (str): type of an event, i.e. Normal or Warning
     Returns:
-        List of dictionaries, where the latter are of following structure:
+        Generator of dicts, where the latter are of following structure:
         {
             "involvedObject": {
                 "kind": "ReplicationController",
@@ -1291,9 +1837,8 @@ def get_events(hostname,
         field_selector.append('reason=%s' % event_reason)
     if event_type:
         field_selector.append('type=%s' % event_type)
-    cmd = "oc get events -o yaml --field-selector %s" % ",".join(
-        field_selector or "''")
-    return yaml.load(command.cmd_run(cmd, hostname=hostname))['items']
+    return oc_get_items(
+        hostname, 'events', field_selector=",".join(field_selector))
 
 
 def wait_for_events(hostname,
@@ -28,6 +28,7 @@ import re
 from glusto.core import Glusto as g
 import six
 
+from cnslibs.common import capability_cache
 from cnslibs.common import exceptions
 
 
@@ -157,7 +158,8 @@ def get_openshift_version(hostname=None):
     """Cacher of an OpenShift version.
 
     Version of an OpenShift cluster is constant value. So, we call API just
-    once and then reuse it's output.
+    once and then reuse it's output. Version is also stored in the
+    capability cache, so other processes may reuse it.
 
     Args:
         hostname (str): a node with 'oc' client where command should run on.
@@ -168,6 +170,10 @@ def get_openshift_version(hostname=None):
     """
     global OPENSHIFT_VERSION
     if not OPENSHIFT_VERSION:
-        version_str = _get_openshift_version_str(hostname=hostname)
+        cache = capability_cache.get_cache()
+        version_str = cache.get("openshift_version")
+        if not version_str:
+            version_str = _get_openshift_version_str(hostname=hostname)
+            cache.update(openshift_version=version_str)
         OPENSHIFT_VERSION = OpenshiftVersion(version_str)
     return OPENSHIFT_VERSION
@@ -0,0 +1,231 @@
+"""Long-lived shell sessions inside pods.
+
+Each 'oc rsh' or 'oc exec' call creates new exec session through the API
+server, which is the slowest part of the commands run in pods. This module
+starts one 'oc exec -i <pod> -- /bin/bash' process per pod on the node with
+the 'oc' client and reuses it for all the subsequent commands. Output of
+each command is delimited by random sentinel lines, so that its stdout,
+stderr and return code can be separated from the stream.
+
+If the shell process dies, for example because of a pod restart, it gets
+started again. Command is rerun in the new shell only if the old one is
+known to have died before starting it: each command is preceded by a
+ready marker echoed by the shell, and the command is not rerun if shell
+died after printing the marker.
+
+Usage example:
+
+    from cnslibs.common import pod_session
+
+    session = pod_session.get_pod_session(ocp_node, "glusterfs-storage-xyz")
+    ret, out, err = session.run("gluster volume list")
+
+Sessions are used by 'podcmd.run' and pod related functions from the
+'openshift_ops' module when they are enabled in the config file:
+
+    common:
+        pod_shell_sessions: True
+"""
+
+import re
+import threading
+import time
+
+from glusto.core import Glusto as g
+import six
+
+from cnslibs.common import exceptions
+from cnslibs.common import utils
+
+
+SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+class _BrokenSessionError(Exception):
+    """Shell process of a session is not usable anymore."""
+
+
+def sessions_enabled():
+    """Check whether commands in pods should use long-lived sessions."""
+    return bool(g.config.get("common", {}).get("pod_shell_sessions", False))
+
+
+class PodShellSession(object):
+    """Shell process running inside of a pod, driven via rpyc connection.
+
+    Args:
+        ocp_node (str): node with the 'oc' client.
+        pod_name (str): name of a pod to run commands in.
+        shell (str): shell binary inside of a pod.
+        timeout (int): seconds to wait for a single command to finish.
+    """
+
+    def __init__(self, ocp_node, pod_name, shell="/bin/bash", timeout=300):
+        self.ocp_node = ocp_node
+        self.pod_name = pod_name
+        self.shell = shell
+        self.timeout = timeout
+        self.restarts = 0
+        self._marker = "__cns_session_%s" % utils.get_random_str()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._proc = None
+
+    def _start(self):
+        self._conn = g.rpyc_get_connection(self.ocp_node, user="root")
+        if self._conn is None:
+            raise exceptions.ExecutionError(
+                "Failed to get rpyc connection of node %s" % self.ocp_node)
+        subprocess = self._conn.modules.subprocess
+        self._proc = subprocess.Popen(
+            ["oc", "exec", "-i", self.pod_name, "--", self.shell],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT)
+        self._write('__cns_err=$(mktemp)\n')
+
+    def close(self):
+        """Stop shell process of the session."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.kill()
+            proc.wait()
+        except Exception as e:
+            g.log.debug("Failed to stop shell session in '%s' pod: %s" % (
+                self.pod_name, e))
+
+    def _write(self, data):
+        try:
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        except Exception as e:
+            raise _BrokenSessionError(e)
+
+    def _read_until(self, ready_marker, end_marker):
+        """Read output of a command till the end marker.
+
+        Raises:
+            _BrokenSessionError: if shell died before printing the ready
+                marker, i.e. before starting the command.
+            exceptions.ExecutionError: if shell died after starting the
+                command or on timeout.
+        """
+        os_module = self._conn.modules.os
+        select_module = self._conn.modules.select
+        fd = self._proc.stdout.fileno()
+        deadline = time.time() + self.timeout
+        data = ''
+        while end_marker not in data:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # State of the shell is unknown, so do not reuse it.
+                self.close()
+                raise exceptions.ExecutionError(
+                    "Exceeded timeout of %s sec waiting for command to "
+                    "finish in '%s' pod." % (self.timeout, self.pod_name))
+            try:
+                ready = select_module.select([fd], [], [], remaining)[0]
+                chunk = os_module.read(fd, 65536) if ready else None
+            except Exception as e:
+                chunk, error = '', e
+            else:
+                error = "Shell in '%s' pod exited." % self.pod_name
+            if chunk == '':
+                if ready_marker in data:
+                    # Command has been started already, so it is not safe
+                    # to rerun it in the new session.
+                    self.close()
+                    raise exceptions.ExecutionError(
+                        "Shell session in '%s' pod broke while running "
+                        "command. Error: %s Output: %s" % (
+                            self.pod_name, error, data))
+                raise _BrokenSessionError(error)
+            data += chunk or ''
+        return data
+
+    def _run_once(self, command):
+        if self._proc is None:
+            self._start()
+        # NOTE: stdin of a command is closed, so that it does not consume
+        # next commands written to the shell.
+        self._write(
+            "echo %(m)s:ready\n"
+            "(\n%(cmd)s\n) </dev/null 2>\"$__cns_err\"; __cns_rc=$?; "
+            "echo; echo %(m)s:out:$__cns_rc; "
+            "cat \"$__cns_err\"; echo; echo %(m)s:err\n" % {
+                'cmd': command, 'm': self._marker})
+        data = self._read_until(
+            "%s:ready\n" % self._marker, "\n%s:err\n" % self._marker)
+        match = re.search(
+            r"%(m)s:ready\n(.*)\n%(m)s:out:(\d+)\n(.*)\n%(m)s:err\n" % {
+                'm': self._marker}, data, re.S)
+        if not match:
+            self.close()
+            raise exceptions.ExecutionError(
+                "Failed to parse output of '%s' command run in '%s' pod: "
+                "%s" % (command, self.pod_name, data))
+        out, ret, err = match.groups()
+        return int(ret), out, err
+
+    def run(self, command):
+        """Run command in a pod.
+
+        Args:
+            command (str|list): command to run.
+        Returns:
+            A tuple of the command's return code, stdout, and stderr.
+        """
+        if not isinstance(command, six.string_types):
+            command = ' '.join(command)
+        with self._lock:
+            try:
+                return self._run_once(command)
+            except _BrokenSessionError as e:
+                g.log.warn("Shell session in '%s' pod is broken, "
+                           "reconnecting. Error: %s" % (self.pod_name, e))
+                self.close()
+                self.restarts += 1
+            try:
+                return self._run_once(command)
+            except _BrokenSessionError as e:
+                self.close()
+                raise exceptions.ExecutionError(
+                    "Failed to run '%s' command in '%s' pod using shell "
+                    "session: %s" % (command, self.pod_name, e))
+
+
+def get_pod_session(ocp_node, pod_name):
+    """Get shell session of a pod, creating it if required.
+
+    Args:
+        ocp_node (str): node with the 'oc' client.
+        pod_name (str): name of a pod to run commands in.
+    Returns:
+        PodShellSession object instance.
+    """
+    with _SESSIONS_LOCK:
+        key = (ocp_node, pod_name)
+        if key not in SESSIONS:
+            SESSIONS[key] = PodShellSession(ocp_node, pod_name)
+        return SESSIONS[key]
+
+
+def close_pod_sessions():
+    """Stop all the started shell sessions."""
+    with _SESSIONS_LOCK:
+        sessions = list(SESSIONS.values())
+        SESSIONS.clear()
+    for session in sessions:
+        session.close()
+
+
+def run_in_pod(ocp_node, pod_name, command):
+    """Run command in a pod using its shell session.
+
+    Returns:
+        A tuple of the command's return code, stdout, and stderr.
+    """
+    return get_pod_session(ocp_node, pod_name).run(command)
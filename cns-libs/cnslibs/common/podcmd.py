@@ -47,18 +47,131 @@ lifetime of a function that addresses both hosts and pods.
 
 from collections import namedtuple
 from functools import partial, wraps
+import re
+import threading
+import time
 import types
 
 from glusto.core import Glusto as g
 
+from cnslibs.common import command_stats
+from cnslibs.common import connection_pool
 from cnslibs.common import openshift_ops
+from cnslibs.common import pod_session
 
 # Define a namedtuple that allows us to address pods instead of just
 # hosts,
 Pod = namedtuple('Pod', 'node podname')
 
+# Errors which mean that a pod we tried to use does not exist anymore
+# or is not able to run commands.
+STALE_POD_ERROR_RE = re.compile(
+    r'NotFound|pods? "[^"]+" not found|container not found|'
+    r'unable to upgrade connection|does not have a host assigned')
 
-def run(target, command, log_level=None, orig_run=g.run):
+
+class GlusterEndpointResolver(object):
+    """Resolves 'auto_get_gluster_endpoint' value to Gluster POD or node.
+
+    List of Gluster PODs gets cached for 'ttl' seconds. Each new request
+    gets the next endpoint in round-robin manner skipping the ones which
+    failed recently.
+
+    Args:
+        ttl (int): seconds to keep list of Gluster endpoints.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._endpoints = []
+        self._expires_at = 0
+        self._index = 0
+        self._failed = {}
+
+    def _fetch_endpoints(self):
+        ocp_client_node = list(g.config['ocp_servers']['client'].keys())[0]
+        pods = openshift_ops.oc_get_pods(ocp_client_node)
+        gluster_pods = sorted(
+            name for name in pods.keys() if name.startswith('glusterfs-'))
+        if gluster_pods:
+            # Prefer PODs which are 'Running' and have all containers ready,
+            # i.e. '1/1' in the 'ready' column.
+            ready_pods = []
+            for name in gluster_pods:
+                ready, total = pods[name]['ready'].split('/')
+                if pods[name]['status'] == 'Running' and ready == total:
+                    ready_pods.append(name)
+            return [Pod(ocp_client_node, name)
+                    for name in ready_pods or gluster_pods]
+        return list(g.config.get("gluster_servers", {}).keys())
+
+    def invalidate(self):
+        """Forget cached Gluster endpoints."""
+        with self._lock:
+            self._expires_at = 0
+
+    def mark_failed(self, endpoint):
+        """Exclude endpoint from rotation and refetch the endpoints."""
+        with self._lock:
+            self._failed[endpoint] = time.time() + self.ttl
+            self._expires_at = 0
+
+    def get(self):
+        """Get next Gluster endpoint.
+
+        Returns:
+            Pod object for containerized Gluster or str with hostname
+            of a standalone Gluster node.
+        """
+        with self._lock:
+            now = time.time()
+            if now >= self._expires_at or not self._endpoints:
+                self._endpoints = self._fetch_endpoints()
+                self._expires_at = now + self.ttl
+            self._failed = {
+                endpoint: until for endpoint, until in self._failed.items()
+                if until > now}
+            endpoints = [
+                endpoint for endpoint in self._endpoints
+                if endpoint not in self._failed] or self._endpoints
+            self._index += 1
+            return endpoints[self._index % len(endpoints)]
+
+
+GLUSTER_ENDPOINTS = GlusterEndpointResolver()
+
+
+def _is_stale_endpoint_error(target, ret, err):
+    if isinstance(target, Pod):
+        return ret != 0 and bool(STALE_POD_ERROR_RE.search(err or ''))
+    return ret == connection_pool.SSH_CONNECTION_ERROR_CODE
+
+
+def _run_on_target(target, command, log_level, orig_run, user=None):
+    if isinstance(target, Pod):
+        if pod_session.sessions_enabled():
+            return command_stats.timed_run(
+                target.node, command, pod_session.run_in_pod,
+                target.node, target.podname, command)
+        prefix = ['oc', 'rsh', target.podname]
+        if isinstance(command, types.StringTypes):
+            cmd = ' '.join(prefix + [command])
+        else:
+            cmd = prefix + command
+
+        # unpack the tuple to make sure our return value exactly matches
+        # our docstring
+        return connection_pool.run(target.node, cmd, log_level=log_level)
+    else:
+        kwargs = {'log_level': log_level}
+        if user is not None:
+            kwargs['user'] = user
+        return command_stats.timed_run(
+            target, command, orig_run, target, command, **kwargs)
+
+
+def run(target, command, log_level=None, orig_run=g.run, user=None):
     """Function that runs a command on a host or in a pod via a host.
     Wraps glusto's run function.
 
@@ -67,7 +180,9 @@ def run(target, command, log_level=None, orig_run=g.run):
             it equals to 'auto_get_gluster_endpoint', then
             Gluster endpoint gets autocalculated to be any of
             Gluster PODs or nodes depending on the deployment type of
-            a Gluster cluster.
+            a Gluster cluster. Endpoints are cached and rotated by
+            the 'GLUSTER_ENDPOINTS' resolver. If command fails because
+            of gone endpoint, then it is retried once using other one.
             If it is str object with other value, then it is considered to be
             an endpoint for command.
             If 'target' is of the 'Pod' type,
@@ -77,6 +192,8 @@ def run(target, command, log_level=None, orig_run=g.run):
             run method
         orig_run (function): The default implementation of the
             run method. Will be used when target is not a pod.
+        user (str|None): user to run command as on a node. Commands in
+            PODs are run by the 'oc' client user of a node.
 
     Returns:
         A tuple of the command's return code, stdout, and stderr.
@@ -85,26 +202,20 @@ def run(target, command, log_level=None, orig_run=g.run):
     # definition time in order to capture the method before
     # any additional monkeypatching by other code
 
-    if target == 'auto_get_gluster_endpoint':
-        ocp_client_node = list(g.config['ocp_servers']['client'].keys())[0]
-        gluster_pods = openshift_ops.get_ocp_gluster_pod_names(ocp_client_node)
-        if gluster_pods:
-            target = Pod(ocp_client_node, gluster_pods[0])
-        else:
-            target = list(g.config.get("gluster_servers", {}).keys())[0]
-
-    if isinstance(target, Pod):
-        prefix = ['oc', 'rsh', target.podname]
-        if isinstance(command, types.StringTypes):
-            cmd = ' '.join(prefix + [command])
-        else:
-            cmd = prefix + command
-
-        # unpack the tuple to make sure our return value exactly matches
-        # our docstring
-        return g.run(target.node, cmd, log_level=log_level)
-    else:
-        return orig_run(target, command, log_level=log_level)
+    if target != 'auto_get_gluster_endpoint':
+        return _run_on_target(target, command, log_level, orig_run, user)
+
+    endpoint = GLUSTER_ENDPOINTS.get()
+    ret, out, err = _run_on_target(
+        endpoint, command, log_level, orig_run, user)
+    if _is_stale_endpoint_error(endpoint, ret, err):
+        g.log.warn("Gluster endpoint '%s' looks to be gone, retrying "
+                   "command on other one." % (endpoint, ))
+        GLUSTER_ENDPOINTS.mark_failed(endpoint)
+        endpoint = GLUSTER_ENDPOINTS.get()
+        ret, out, err = _run_on_target(
+            endpoint, command, log_level, orig_run, user)
+    return ret, out, err
 
 
 class GlustoPod(object):
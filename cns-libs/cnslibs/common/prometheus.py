@@ -0,0 +1,131 @@
+"""Parser of the Prometheus text exposition format.
+
+'utils.parse_prometheus_data' provides lists of label dicts per metric,
+so looking up a value of a single device requires scanning whole list.
+'parse_prometheus_metrics' provides metrics indexed by label values:
+
+    from cnslibs.common.prometheus import parse_prometheus_metrics
+
+    metrics = parse_prometheus_metrics(text)
+    metrics['heketi_cluster_count']  # 1.0, metric without labels
+    device_size = metrics['heketi_device_size']
+    device_size.label_names  # ('cluster', 'device', 'hostname')
+    device_size[cluster_id, device_name, hostname]  # 104722432.0
+    device_size[device_size.make_key(
+        cluster=cluster_id, hostname=hostname, device=device_name)]
+    device_size.select(hostname=hostname)  # {(c_id, dev, hostname): value}
+
+Keys are tuples of label values ordered by label names, the same way
+Prometheus client libraries order labels in the exposition.
+
+Parsing is done in pure python without building intermediate objects
+per sample. 'tools/prometheus_parsing_benchmark.py' compares it with the
+'utils.parse_prometheus_data' on synthetic data.
+"""
+
+import re
+
+
+_LABEL_RE = re.compile(
+    r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"')
+_UNESCAPE_RE = re.compile(r'\\(.)')
+_UNESCAPED = {'n': '\n', '\\': '\\', '"': '"'}
+
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+    return _UNESCAPE_RE.sub(
+        lambda match: _UNESCAPED.get(match.group(1), match.group(0)), value)
+
+
+class LabeledMetric(dict):
+    """Values of a metric keyed by tuples of its label values.
+
+    Args:
+        name (str): metric name.
+        label_names (tuple): sorted names of the labels.
+    """
+
+    def __init__(self, name, label_names):
+        super(LabeledMetric, self).__init__()
+        self.name = name
+        self.label_names = label_names
+
+    def make_key(self, **labels):
+        """Get key of a sample by its label values."""
+        return tuple(str(labels[label]) for label in self.label_names)
+
+    def select(self, **labels):
+        """Get values of the samples which have all the given labels.
+
+        Returns:
+            dict: values keyed by tuples of label values.
+        """
+        positions = [(self.label_names.index(label), str(value))
+                     for label, value in labels.items()]
+        return dict(
+            (key, value) for key, value in self.items()
+            if all(key[pos] == label_value
+                   for pos, label_value in positions))
+
+    def get_label_values(self, label):
+        """Get set of values of a label used by the samples."""
+        pos = self.label_names.index(label)
+        return set(key[pos] for key in self)
+
+    def iter_samples(self):
+        """Iterate over samples as (labels dict, value) tuples."""
+        for key, value in self.items():
+            yield dict(zip(self.label_names, key)), value
+
+
+def parse_prometheus_metrics(text):
+    """Parse prometheus-formatted text to the metrics indexed by labels.
+
+    Args:
+        text (str): prometheus-formatted data.
+    Returns:
+        dict: metric names as keys and values as values for the metrics
+            without labels, and 'LabeledMetric' objects for the metrics
+            with labels.
+    Raises:
+        ValueError: if text has invalid format.
+    """
+    metrics = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        brace_pos = line.find('{')
+        if brace_pos < 0:
+            parts = line.split()
+            metrics[parts[0]] = float(parts[1])
+            continue
+
+        name = line[:brace_pos].rstrip()
+        end_pos = line.rfind('}')
+        if end_pos < brace_pos:
+            raise ValueError("Invalid prometheus sample: %s" % line)
+        value = float(line[end_pos + 1:].split()[0])
+        if not line[brace_pos + 1:end_pos].strip():
+            # 'metric{} 1' is the same sample as 'metric 1'
+            metrics[name] = value
+            continue
+        labels = _LABEL_RE.findall(line, brace_pos + 1, end_pos)
+
+        metric = metrics.get(name)
+        if metric is None:
+            metric = metrics[name] = LabeledMetric(
+                name, tuple(sorted(label for label, _ in labels)))
+        if len(labels) == len(metric.label_names) and all(
+                label == label_name for (label, _), label_name in zip(
+                    labels, metric.label_names)):
+            key = tuple(_unescape(label_value) for _, label_value in labels)
+        else:
+            # Labels are not sorted or differ from the first sample ones
+            labels = dict(labels)
+            key = tuple(_unescape(labels.get(label_name, ''))
+                        for label_name in metric.label_names)
+        metric[key] = value
+    return metrics
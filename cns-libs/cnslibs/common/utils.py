@@ -4,10 +4,44 @@ Generic utility functions not specifc to a larger suite of tools.
 For example, not specific to OCP, Gluster, Heketi, etc.
 """
 
+import codecs
+import json
 import random
 import string
 
 from prometheus_client.parser import text_string_to_metric_families
+import six
+import yaml
+
+# LibYAML based classes are much faster, but are absent if PyYAML was built
+# without LibYAML.
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def load_yaml(stream):
+    """Parse YAML document using the fastest available safe loader.
+
+    Args:
+        stream (str|file): YAML text or file object to read it from.
+    Returns:
+        Python object built from the document.
+    """
+    return yaml.load(stream, Loader=YAML_LOADER)
+
+
+def dump_yaml(data, stream=None, **kwargs):
+    """Serialize data to YAML using the fastest available safe dumper.
+
+    Args:
+        data: Python object to serialize.
+        stream (file|None): file object to write YAML to.
+    Kwargs:
+        Options of the 'yaml.dump' function, like 'default_flow_style'.
+    Returns:
+        str: YAML text if 'stream' is None.
+    """
+    return yaml.dump(data, stream, Dumper=YAML_DUMPER, **kwargs)
 
 
 def get_random_str(size=14):
@@ -38,3 +72,132 @@ def parse_prometheus_data(text):
                 metrics[key] = val
 
     return metrics
+
+
+class _JSONStreamReader(object):
+    """Decodes JSON values one by one from a stream of text chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf, self._pos, self._eof = '', 0, False
+
+    def _fill(self, min_size=0):
+        """Read chunks until 'min_size' chars are buffered after position.
+
+        Returns:
+            bool: False if stream is over, True otherwise.
+        """
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        while not self._eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                break
+            if not isinstance(chunk, six.string_types):
+                chunk = self._text_decoder.decode(chunk)
+            self._buf += chunk
+            if len(self._buf) >= min_size:
+                return True
+        return False
+
+    def close(self):
+        """Close the stream, if it supports closing, like generators do."""
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+    def peek(self):
+        """Get next non-whitespace char without consuming it."""
+        while True:
+            while (self._pos < len(self._buf)
+                    and self._buf[self._pos] in ' \t\r\n'):
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(1):
+                return None
+
+    def expect(self, char):
+        """Consume next non-whitespace char, which must be the given one."""
+        if self.peek() != char:
+            raise ValueError("Expected '%s' at '%s'" % (
+                char, self._buf[self._pos:self._pos + 40]))
+        self._pos += 1
+
+    def decode(self):
+        """Decode and consume next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # Number at the end of the buffer may be incomplete
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            # Grow buffer exponentially to decode big values in linear time
+            self._fill(2 * (len(self._buf) - self._pos) + 1)
+
+
+def iter_json_values(chunks):
+    """Lazily decode sequence of JSON values from a stream of JSON chunks.
+
+    Values are expected to be concatenated, optionally separated by
+    whitespaces, as in output of the watch requests to the API server.
+
+    Args:
+        chunks (iterable): chunks of JSON text, str or bytes.
+    Returns:
+        generator: decoded values.
+    Raises:
+        ValueError: when text is not valid JSON.
+    """
+    reader = _JSONStreamReader(chunks)
+    try:
+        while reader.peek() is not None:
+            yield reader.decode()
+    finally:
+        reader.close()
+
+
+def iter_json_list_items(chunks, key='items'):
+    """Lazily decode items of a list from a stream of JSON chunks.
+
+    List is expected to be the value of the 'key' field of the top-level
+    JSON object, as in output of the 'oc get -o json' command. Other
+    fields of the top-level object are skipped. Only the currently
+    decoded item and one chunk of text are kept in memory.
+
+    Args:
+        chunks (iterable): chunks of JSON text, str or bytes.
+        key (str): name of the top-level field with the list.
+    Returns:
+        generator: decoded items of the list.
+    Raises:
+        ValueError: when text is not valid JSON.
+    """
+    reader = _JSONStreamReader(chunks)
+    try:
+        reader.expect('{')
+        while reader.peek() != '}':
+            name = reader.decode()
+            reader.expect(':')
+            if name == key and reader.peek() == '[':
+                reader.expect('[')
+                while reader.peek() != ']':
+                    yield reader.decode()
+                    if reader.peek() == ',':
+                        reader.expect(',')
+                reader.expect(']')
+            else:
+                reader.decode()
+            if reader.peek() == ',':
+                reader.expect(',')
+    finally:
+        reader.close()
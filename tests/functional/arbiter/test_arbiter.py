@@ -391,15 +391,11 @@ class TestArbiterVolumeCreateExpandDelete(BaseClass):
             self.heketi_client_node, self.heketi_server_url, node_id_list[0],
             json=True)
         arbiter_nodes_ip_addresses = arbiter_node['hostnames']['storage']
-        self._set_arbiter_tag_with_further_revert(
-            self.heketi_client_node, self.heketi_server_url, 'node',
-            node_id_list[0], ('required' if node_with_tag else None),
-            revert_to=arbiter_node.get('tags', {}).get('arbiter'))
+        tags = {('node', node_id_list[0]): {
+            'arbiter': 'required' if node_with_tag else None}}
         for device in arbiter_node['devices']:
-            self._set_arbiter_tag_with_further_revert(
-                self.heketi_client_node, self.heketi_server_url, 'device',
-                device['id'], (None if node_with_tag else 'required'),
-                revert_to=device.get('tags', {}).get('arbiter'))
+            tags[('device', device['id'])] = {
+                'arbiter': None if node_with_tag else 'required'}
 
         # Set arbiter:disabled tags
         data_nodes, data_nodes_ip_addresses = [], []
@@ -414,15 +410,16 @@ class TestArbiterVolumeCreateExpandDelete(BaseClass):
                     "%sGb of free space" % pvc_amount)
             data_nodes_ip_addresses.extend(node_info['hostnames']['storage'])
             for device in node_info['devices']:
-                self._set_arbiter_tag_with_further_revert(
-                    self.heketi_client_node, self.heketi_server_url, 'device',
-                    device['id'], (None if node_with_tag else 'disabled'),
-                    revert_to=device.get('tags', {}).get('arbiter'))
-            self._set_arbiter_tag_with_further_revert(
-                self.heketi_client_node, self.heketi_server_url, 'node',
-                node_id, ('disabled' if node_with_tag else None),
-                revert_to=node_info.get('tags', {}).get('arbiter'))
+                tags[('device', device['id'])] = {
+                    'arbiter': None if node_with_tag else 'disabled'}
+            tags[('node', node_id)] = {
+                'arbiter': 'disabled' if node_with_tag else None}
             data_nodes.append(node_info)
+        undo_token = heketi_ops.set_tags_bulk(
+            self.heketi_client_node, self.heketi_server_url, tags)
+        self.addCleanup(
+            heketi_ops.set_tags_bulk, self.heketi_client_node,
+            self.heketi_server_url, undo_token)
 
         # Create PVCs and check that their bricks are correctly located
         self.create_storage_class(is_arbiter_vol=True)
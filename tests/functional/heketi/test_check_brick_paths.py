@@ -19,10 +19,14 @@ class TestHeketiVolume(BaseClass):
         results = []
         assertion_method = self.assertIn if present else self.assertNotIn
         for brick_path in brick_paths:
-            for g_host in g_hosts:
-                out = openshift_ops.cmd_run_on_gluster_pod_or_node(
-                    oc_node, cmd % brick_path, gluster_node=g_host)
-                results.append(out)
+            node_results = openshift_ops.cmd_run_on_gluster_pods_or_nodes(
+                oc_node, cmd % brick_path, gluster_nodes=g_hosts)
+            for g_host, node_result in node_results.items():
+                self.assertFalse(
+                    node_result["error"],
+                    "Failed to check '%s' brick path on '%s' Gluster node: "
+                    "%s" % (brick_path, g_host, node_result["error"]))
+                results.append(node_result["output"])
             assertion_method('present', results)
 
     def test_validate_brick_paths_on_gluster_pods_or_nodes(self):
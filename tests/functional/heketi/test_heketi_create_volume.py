@@ -1,5 +1,8 @@
+import socket
+
 from glusto.core import Glusto as g
 from glustolibs.gluster.volume_ops import get_volume_list, get_volume_info
+import mock
 import six
 
 from cnslibs.common.exceptions import ExecutionError
@@ -15,6 +18,7 @@ from cnslibs.common.heketi_ops import (heketi_volume_create,
                                        heketi_node_list,
                                        heketi_node_delete,
                                        heketi_volume_delete)
+from cnslibs.common import heketi_rest
 from cnslibs.common import podcmd
 
 
@@ -73,6 +77,36 @@ class TestHeketiVolume(BaseClass):
             "of Heketi volumes before and after volume creation: %s\n%s" % (
                 existing_h_vol_list, h_vol_list))
 
+    def test_volume_create_rest_and_cli_backends_match(self):
+        """Validate that REST backend creates the same volumes as CLI"""
+        for kwargs in ({}, {"replica": 2}, {"durability": "none"}):
+            volumes = {}
+            for backend in (heketi_rest.CLI_BACKEND,
+                            heketi_rest.REST_BACKEND):
+                with mock.patch.object(
+                        heketi_rest, "is_enabled",
+                        return_value=backend == heketi_rest.REST_BACKEND):
+                    try:
+                        volume = heketi_volume_create(
+                            self.heketi_client_node, self.heketi_server_url,
+                            self.volume_size, json=True, **kwargs)
+                    except socket.error as e:
+                        self.skipTest(
+                            "Heketi REST API is not reachable: %s" % e)
+                self.addCleanup(
+                    heketi_volume_delete, self.heketi_client_node,
+                    self.heketi_server_url, volume["id"])
+                volumes[backend] = volume
+
+            cli_vol = volumes[heketi_rest.CLI_BACKEND]
+            rest_vol = volumes[heketi_rest.REST_BACKEND]
+            self.assertEqual(
+                cli_vol["durability"], rest_vol["durability"],
+                "Volumes created with %s options by CLI and REST backends "
+                "have different durability: %s, %s" % (
+                    kwargs, cli_vol["durability"], rest_vol["durability"]))
+            self.assertEqual(len(cli_vol["bricks"]), len(rest_vol["bricks"]))
+
     @podcmd.GlustoPod()
     def test_create_vol_and_retrieve_vol_info(self):
         """Validate heketi and gluster volume info"""
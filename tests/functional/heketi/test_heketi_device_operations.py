@@ -16,8 +16,8 @@ from cnslibs.common.heketi_ops import (heketi_node_enable,
                                        heketi_device_remove,
                                        heketi_device_info,
                                        heketi_device_enable,
-                                       heketi_topology_info,
                                        heketi_volume_delete)
+from cnslibs.common.heketi_topology import TopologySnapshot
 
 
 @ddt.ddt
@@ -192,17 +192,14 @@ class TestHeketiDeviceOperations(BaseClass):
         manage_hostname = gluster_server_0["manage"]
 
         # Get node ID of the Gluster hostname
-        topo_info = heketi_topology_info(self.heketi_client_node,
-                                         self.heketi_server_url, json=True)
+        topology = TopologySnapshot(
+            self.heketi_client_node, self.heketi_server_url)
         self.assertTrue(
-            topo_info["clusters"][0]["nodes"],
+            topology.nodes,
             "Cluster info command returned empty list of nodes.")
 
-        node_id = None
-        for node in topo_info["clusters"][0]["nodes"]:
-            if manage_hostname == node['hostnames']["manage"][0]:
-                node_id = node["id"]
-                break
+        node = topology.get_node_by_hostname(manage_hostname)
+        node_id = node["id"] if node else None
         self.assertNotEqual(
             node_id, None,
             "No information about node_id for %s" % manage_hostname)
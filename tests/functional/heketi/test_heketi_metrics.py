@@ -49,21 +49,15 @@ class TestHeketiMetrics(BaseClass):
 
             cluster_id = cluster['id']
 
-            cluster_ids = ([obj['cluster']
-                           for obj in metrics['heketi_nodes_count']])
-            self.assertIn(cluster_id, cluster_ids)
-            for node_count in metrics['heketi_nodes_count']:
-                if node_count['cluster'] == cluster_id:
-                    self.assertEqual(
-                        len(cluster['nodes']), node_count['value'])
-
-            cluster_ids = ([obj['cluster']
-                           for obj in metrics['heketi_volumes_count']])
-            self.assertIn(cluster_id, cluster_ids)
-            for vol_count in metrics['heketi_volumes_count']:
-                if vol_count['cluster'] == cluster_id:
-                    self.assertEqual(
-                        len(cluster['volumes']), vol_count['value'])
+            self.assertIn((cluster_id, ), metrics['heketi_nodes_count'])
+            self.assertEqual(
+                len(cluster['nodes']),
+                metrics['heketi_nodes_count'][cluster_id, ])
+
+            self.assertIn((cluster_id, ), metrics['heketi_volumes_count'])
+            self.assertEqual(
+                len(cluster['volumes']),
+                metrics['heketi_volumes_count'][cluster_id, ])
 
             for node in cluster['nodes']:
                 self.assertIn('devices', list(node.keys()))
@@ -71,90 +65,26 @@ class TestHeketiMetrics(BaseClass):
 
                 hostname = node['hostnames']['manage'][0]
 
-                cluster_ids = ([obj['cluster']
-                               for obj in metrics['heketi_device_count']])
-                self.assertIn(cluster_id, cluster_ids)
-                hostnames = ([obj['hostname']
-                             for obj in metrics['heketi_device_count']])
-                self.assertIn(hostname, hostnames)
-                for device_count in metrics['heketi_device_count']:
-                    if (device_count['cluster'] == cluster_id and
-                            device_count['hostname'] == hostname):
-                        self.assertEqual(
-                            len(node['devices']), device_count['value'])
+                self.assertIn(
+                    (cluster_id, hostname), metrics['heketi_device_count'])
+                self.assertEqual(
+                    len(node['devices']),
+                    metrics['heketi_device_count'][cluster_id, hostname])
 
                 for device in node['devices']:
-                    device_name = device['name']
-                    device_size_t = device['storage']['total']
-                    device_free_t = device['storage']['free']
-                    device_used_t = device['storage']['used']
-
-                    cluster_ids = ([obj['cluster']
-                                   for obj in
-                                   metrics['heketi_device_brick_count']])
-                    self.assertIn(cluster_id, cluster_ids)
-                    hostnames = ([obj['hostname']
-                                 for obj in
-                                 metrics['heketi_device_brick_count']])
-                    self.assertIn(hostname, hostnames)
-                    devices = ([obj['device']
-                               for obj in
-                               metrics['heketi_device_brick_count']])
-                    self.assertIn(device_name, devices)
-                    for brick_count in metrics['heketi_device_brick_count']:
-                        if (brick_count['cluster'] == cluster_id and
-                                brick_count['hostname'] == hostname and
-                                brick_count['device'] == device_name):
-                            self.assertEqual(
-                                len(device['bricks']), brick_count['value'])
-
-                    cluster_ids = ([obj['cluster']
-                                   for obj in metrics['heketi_device_size']])
-                    self.assertIn(cluster_id, cluster_ids)
-                    hostnames = ([obj['hostname']
-                                 for obj in metrics['heketi_device_size']])
-                    self.assertIn(hostname, hostnames)
-                    devices = ([obj['device']
-                               for obj in metrics['heketi_device_size']])
-                    self.assertIn(device_name, devices)
-                    for device_size in metrics['heketi_device_size']:
-                        if (device_size['cluster'] == cluster_id and
-                                device_size['hostname'] == hostname and
-                                device_size['device'] == device_name):
-                            self.assertEqual(
-                                device_size_t, device_size['value'])
-
-                    cluster_ids = ([obj['cluster']
-                                   for obj in metrics['heketi_device_free']])
-                    self.assertIn(cluster_id, cluster_ids)
-                    hostnames = ([obj['hostname']
-                                 for obj in metrics['heketi_device_free']])
-                    self.assertIn(hostname, hostnames)
-                    devices = ([obj['device']
-                               for obj in metrics['heketi_device_free']])
-                    self.assertIn(device_name, devices)
-                    for device_free in metrics['heketi_device_free']:
-                        if (device_free['cluster'] == cluster_id and
-                                device_free['hostname'] == hostname and
-                                device_free['device'] == device_name):
-                            self.assertEqual(
-                                device_free_t, device_free['value'])
-
-                    cluster_ids = ([obj['cluster']
-                                   for obj in metrics['heketi_device_used']])
-                    self.assertIn(cluster_id, cluster_ids)
-                    hostnames = ([obj['hostname']
-                                 for obj in metrics['heketi_device_used']])
-                    self.assertIn(hostname, hostnames)
-                    devices = ([obj['device']
-                               for obj in metrics['heketi_device_used']])
-                    self.assertIn(device_name, devices)
-                    for device_used in metrics['heketi_device_used']:
-                        if (device_used['cluster'] == cluster_id and
-                                device_used['hostname'] == hostname and
-                                device_used['device'] == device_name):
-                            self.assertEqual(
-                                device_used_t, device_used['value'])
+                    device_key = metrics['heketi_device_size'].make_key(
+                        cluster=cluster_id, hostname=hostname,
+                        device=device['name'])
+                    for metric_name, expected_value in (
+                            ('heketi_device_brick_count',
+                             len(device['bricks'])),
+                            ('heketi_device_size', device['storage']['total']),
+                            ('heketi_device_free', device['storage']['free']),
+                            ('heketi_device_used', device['storage']['used'])):
+                        self.assertIn(device_key, metrics[metric_name])
+                        self.assertEqual(
+                            expected_value,
+                            metrics[metric_name][device_key])
 
     def verify_volume_count(self):
         metrics = get_heketi_metrics(
@@ -162,13 +92,14 @@ class TestHeketiMetrics(BaseClass):
             self.heketi_server_url)
         self.assertTrue(metrics['heketi_volumes_count'])
 
-        for vol_count in metrics['heketi_volumes_count']:
-            self.assertTrue(vol_count['cluster'])
+        for (cluster_id, ), vol_count in (
+                metrics['heketi_volumes_count'].items()):
+            self.assertTrue(cluster_id)
             cluster_info = heketi_cluster_info(
                 self.heketi_client_node,
                 self.heketi_server_url,
-                vol_count['cluster'], json=True)
-            self.assertEqual(vol_count['value'], len(cluster_info['volumes']))
+                cluster_id, json=True)
+            self.assertEqual(vol_count, len(cluster_info['volumes']))
 
     def test_heketi_metrics_with_topology_info(self):
         """Validate heketi metrics generation"""
@@ -306,12 +237,13 @@ class TestHeketiMetrics(BaseClass):
         self.assertTrue(metrics)
         self.assertTrue(metrics.get('heketi_nodes_count'))
 
-        for cluster in metrics['heketi_nodes_count']:
+        for (cluster_id, ), nodes_count in (
+                metrics['heketi_nodes_count'].items()):
             cluster_info = heketi_cluster_info(
                 self.heketi_client_node, self.heketi_server_url,
-                cluster['cluster'], json=True)
+                cluster_id, json=True)
 
             self.assertTrue(cluster_info)
             self.assertTrue(cluster_info.get('nodes'))
 
-            self.assertEqual(len(cluster_info['nodes']), cluster['value'])
+            self.assertEqual(len(cluster_info['nodes']), nodes_count)
@@ -7,6 +7,7 @@ from glustolibs.gluster import volume_ops, rebalance_ops
 from cnslibs.common.exceptions import ExecutionError
 from cnslibs.common.baseclass import BaseClass
 from cnslibs.common import heketi_ops, podcmd
+from cnslibs.common.heketi_topology import TopologySnapshot
 
 
 class TestVolumeExpansionAndDevicesTestCases(BaseClass):
@@ -116,21 +117,10 @@ class TestVolumeExpansionAndDevicesTestCases(BaseClass):
         returns total free space across all devices
         """
 
-        free_spaces = []
-
-        heketi_node_id_list = heketi_ops.heketi_node_list(
+        topology = TopologySnapshot(
             self.heketi_client_node, self.heketi_server_url)
 
-        for node_id in heketi_node_id_list:
-            node_info_dict = heketi_ops.heketi_node_info(
-                self.heketi_client_node, self.heketi_server_url,
-                node_id, json=True)
-            total_free_space = 0
-            for device in node_info_dict["devices"]:
-                total_free_space += device["storage"]["free"]
-            free_spaces.append(total_free_space)
-
-        total_free_space = sum(free_spaces)/(1024 ** 2)
+        total_free_space = topology.get_free_space()/(1024 ** 2)
         total_free_space = int(math.floor(total_free_space))
 
         return total_free_space
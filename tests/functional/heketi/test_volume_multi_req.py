@@ -7,17 +7,19 @@ import threading
 import time
 
 import ddt
-import yaml
 
 from glusto.core import Glusto as g
 
+from cnslibs.common.async_runner import async_call, wait_for_results
 from cnslibs.common.baseclass import BaseClass
 from cnslibs.common.heketi_ops import (
-    heketi_volume_list)
+    heketi_volume_catalog,
+    heketi_volume_count)
 from cnslibs.common.naming import (
     make_unique_label, extract_method_name)
 from cnslibs.common.openshift_ops import (
-    oc_create, oc_delete, oc_get_pvc, oc_get_pv, oc_get_all_pvs)
+    oc_create, oc_delete, oc_get_pvc, oc_get_pv, iter_all_pvs)
+from cnslibs.common.utils import dump_yaml
 from cnslibs.common.waiter import Waiter
 
 
@@ -90,7 +92,7 @@ def temp_config(ocp_node, cfg):
     conn = g.rpyc_get_connection(ocp_node, user="root")
     tmp = conn.modules.tempfile.NamedTemporaryFile()
     try:
-        tmp.write(yaml.safe_dump(cfg))
+        tmp.write(dump_yaml(cfg))
         tmp.flush()
         filename = tmp.name
         yield filename
@@ -111,10 +113,8 @@ def wait_for_claim(ocp_node, pvc_name, timeout=60, interval=2):
 
 def wait_for_sc_unused(ocp_node, sc_name, timeout=60, interval=1):
     for w in Waiter(timeout, interval):
-        sts = oc_get_all_pvs(ocp_node)
-        items = (sts and sts.get('items')) or []
         if not any(i.get('spec', {}).get('storageClassName') == sc_name
-                   for i in items):
+                   for i in iter_all_pvs(ocp_node)):
             return
     raise AssertionError('wait_for_sc_unused on %s timed out'
                          % (sc_name,))
@@ -167,28 +167,8 @@ class ClaimInfo(object):
         return self.pv_info.get('spec', {}).get('glusterfs', {}).get('path')
 
 
-def _heketi_vols(ocp_node, url):
-    # Unfortunately, getting json from heketi-cli only gets the ids
-    # To get a mapping of ids & volume names without a lot of
-    # back and forth between the test and the ocp_node we end up having
-    # to scrape the output of 'volume list'
-    # TODO: This probably should be made into a utility function
-    out = heketi_volume_list(ocp_node, url, json=False)
-    res = []
-    for line in out.splitlines():
-        if not line.startswith('Id:'):
-            continue
-        row = {}
-        for section in line.split():
-            if ':' in section:
-                key, value = section.split(':', 1)
-                row[key.lower()] = value.strip()
-        res.append(row)
-    return res
-
-
-def _heketi_name_id_map(vols):
-    return {vol['name']: vol['id'] for vol in vols}
+def _heketi_name_id_map(catalog):
+    return {vol['name']: vol['id'] for vol in catalog.values()}
 
 
 @ddt.ddt
@@ -214,7 +194,7 @@ class TestVolumeMultiReq(BaseClass):
 
     def _count_vols(self):
         ocp_node = g.config['ocp_servers']['master'].keys()[0]
-        return len(_heketi_vols(ocp_node, self.heketi_server_url))
+        return heketi_volume_count(ocp_node, self.heketi_server_url)
 
     def test_simple_serial_vol_create(self):
         """Test that serially creating PVCs causes heketi to add volumes.
@@ -234,7 +214,7 @@ class TestVolumeMultiReq(BaseClass):
             oc_create(ocp_node, tmpfn)
         self.addCleanup(delete_storageclass, ocp_node, tname)
         orig_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
 
         # deploy a persistent volume claim
         c1 = ClaimInfo(
@@ -251,7 +231,7 @@ class TestVolumeMultiReq(BaseClass):
 
         # verify this is a new volume to heketi
         now_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
         self.assertEqual(len(orig_vols) + 1, len(now_vols))
         self.assertIn(c1.heketiVolumeName, now_vols)
         self.assertNotIn(c1.heketiVolumeName, orig_vols)
@@ -271,7 +251,7 @@ class TestVolumeMultiReq(BaseClass):
 
         # verify this is a new volume to heketi
         now_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
         self.assertEqual(len(orig_vols) + 2, len(now_vols))
         self.assertIn(c2.heketiVolumeName, now_vols)
         self.assertNotIn(c2.heketiVolumeName, orig_vols)
@@ -313,7 +293,7 @@ class TestVolumeMultiReq(BaseClass):
         c1.update_pvc_info(ocp_node)
         c2.update_pvc_info(ocp_node)
         now_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
 
         # verify first volume exists
         self.assertTrue(c1.volumeName)
@@ -357,22 +337,17 @@ class TestVolumeMultiReq(BaseClass):
                       size=2)
             for n in range(count)]
 
-        # create a "bunch" of pvc all at once
+        # create a "bunch" of pvc all at once, amount of parallel requests
+        # is bounded by the runner and connection pool per-host limits
         def create(ci):
             ci.create_pvc(ocp_node)
             self.addCleanup(ci.delete_pvc, ocp_node)
-        threads = [
-            threading.Thread(target=create, args=[c])
-            for c in claims]
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
+        wait_for_results([async_call(ocp_node, create, c) for c in claims])
 
         for c in claims:
             c.update_pvc_info(ocp_node, timeout=120)
         now_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
         for c in claims:
             c.update_pv_info(ocp_node)
             self.assertIn(c.heketiVolumeName, now_vols)
@@ -457,7 +432,7 @@ class TestVolumeMultiReq(BaseClass):
         self.assertTrue(c1.heketiVolumeName)
         # verify this volume in heketi
         now_vols = _heketi_name_id_map(
-            _heketi_vols(ocp_node, self.heketi_server_url))
+            heketi_volume_catalog(ocp_node, self.heketi_server_url))
         self.assertIn(c1.heketiVolumeName, now_vols)
 
         # verify second volume exists
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Compare 'parse_prometheus_data' with 'parse_prometheus_metrics' speed.
+
+Uses synthetic Heketi-like metrics. Requires 'cnslibs' to be installed:
+
+    python tools/prometheus_parsing_benchmark.py --samples 10000
+"""
+
+import argparse
+import time
+
+import six
+
+from cnslibs.common import prometheus
+from cnslibs.common import utils
+
+
+def make_synthetic_exposition(samples=10000):
+    """Make Heketi-like prometheus-formatted text for benchmarking.
+
+    Returns:
+        tuple: text and list of (cluster, device, hostname) label values
+            of the 'heketi_device_size' metric samples in it.
+    """
+    metric_names = ('heketi_device_size', 'heketi_device_free',
+                    'heketi_device_used', 'heketi_device_brick_count')
+    devices = [
+        ('cluster%d' % (i // 100), '/dev/sd%d' % (i % 10),
+         'node%d.example.com' % (i // 10))
+        for i in range(samples // len(metric_names))]
+    lines = ['heketi_cluster_count %d' % (len(devices) // 100 + 1)]
+    for metric_name in metric_names:
+        lines.append('# HELP %s Synthetic metric' % metric_name)
+        lines.append('# TYPE %s gauge' % metric_name)
+        for i, (cluster, device, hostname) in enumerate(devices):
+            lines.append(
+                '%s{cluster="%s",device="%s",hostname="%s"} %d' % (
+                    metric_name, cluster, device, hostname, i))
+    return '\n'.join(lines) + '\n', devices
+
+
+def benchmark_prometheus_parsing(samples=10000, repeat=3):
+    """Compare 'parse_prometheus_data' with 'parse_prometheus_metrics'.
+
+    Both parsers are timed on the synthetic exposition, as well as lookups
+    of the 'heketi_device_size' value of each device in their results.
+
+    Returns:
+        dict: best of 'repeat' times in seconds per parser, like
+            {'parse_prometheus_data': {'parse': 0.5, 'lookup': 30.1},
+             'parse_prometheus_metrics': {'parse': 0.04, 'lookup': 0.002}}
+    """
+    text, devices = make_synthetic_exposition(samples)
+
+    def lookup_list(metrics):
+        for cluster, device, hostname in devices:
+            for sample in metrics['heketi_device_size']:
+                if (sample['cluster'] == cluster and
+                        sample['hostname'] == hostname and
+                        sample['device'] == device):
+                    break
+
+    def lookup_indexed(metrics):
+        size_metric = metrics['heketi_device_size']
+        for key in devices:
+            size_metric[key]
+
+    results = {}
+    for parse, lookup in ((utils.parse_prometheus_data, lookup_list),
+                          (prometheus.parse_prometheus_metrics,
+                           lookup_indexed)):
+        timings = {'parse': [], 'lookup': []}
+        for _ in range(repeat):
+            start = time.time()
+            metrics = parse(text)
+            timings['parse'].append(time.time() - start)
+            start = time.time()
+            lookup(metrics)
+            timings['lookup'].append(time.time() - start)
+        results[parse.__name__] = dict(
+            (step, min(values)) for step, values in timings.items())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=10000,
+                        help='amount of samples in the metrics')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='amount of attempts of each parser')
+    args = parser.parse_args()
+    for parser_name, timings in sorted(six.iteritems(
+            benchmark_prometheus_parsing(args.samples, args.repeat))):
+        print("%-26s parse: %.4fs  lookup: %.4fs" % (
+            parser_name, timings['parse'], timings['lookup']))
+
+
+if __name__ == '__main__':
+    main()
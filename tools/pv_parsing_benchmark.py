@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Compare parsing time of 'oc get pv' output in YAML and JSON formats.
+
+Uses synthetic list of Gluster PVs. Requires 'cnslibs' to be installed:
+
+    python tools/pv_parsing_benchmark.py --count 5000
+"""
+
+import argparse
+import json
+import time
+
+import six
+import yaml
+
+from cnslibs.common import utils
+
+
+def make_synthetic_pv_list(count=5000):
+    """Make data of the 'oc get pv' list with Gluster PVs for benchmarking.
+
+    Returns:
+        dict: list of PVs in the same format as in 'oc get' output.
+    """
+    pvs = []
+    for i in range(count):
+        vol_id = '%032x' % i
+        pvs.append({
+            'apiVersion': 'v1',
+            'kind': 'PersistentVolume',
+            'metadata': {
+                'annotations': {
+                    'Description': 'Gluster-Internal: Dynamically provisioned'
+                                   ' PV',
+                    'gluster.kubernetes.io/heketi-volume-id': vol_id,
+                    'gluster.org/type': 'file',
+                    'pv.kubernetes.io/bound-by-controller': 'yes',
+                    'pv.kubernetes.io/provisioned-by':
+                        'kubernetes.io/glusterfs',
+                },
+                'creationTimestamp': '2019-01-01T00:00:00Z',
+                'name': 'pvc-%08d-0000-11e9-a000-000000000000' % i,
+                'resourceVersion': str(100000 + i),
+                'selfLink': '/api/v1/persistentvolumes/pvc-%08d' % i,
+                'uid': '%08d-0000-11e9-b000-000000000000' % i,
+            },
+            'spec': {
+                'accessModes': ['ReadWriteOnce'],
+                'capacity': {'storage': '%dGi' % (i % 10 + 1)},
+                'claimRef': {
+                    'apiVersion': 'v1',
+                    'kind': 'PersistentVolumeClaim',
+                    'name': 'autotests-pvc-%d' % i,
+                    'namespace': 'autotests',
+                    'resourceVersion': str(99999 + i),
+                    'uid': '%08d-0000-11e9-c000-000000000000' % i,
+                },
+                'glusterfs': {
+                    'endpoints': 'glusterfs-dynamic-%d' % i,
+                    'path': 'vol_%s' % vol_id,
+                },
+                'persistentVolumeReclaimPolicy': 'Delete',
+                'storageClassName': 'glusterfs-storage',
+            },
+            'status': {'phase': 'Bound'},
+        })
+    return {'apiVersion': 'v1', 'kind': 'List', 'items': pvs,
+            'metadata': {'resourceVersion': '', 'selfLink': ''}}
+
+
+def benchmark_pv_list_parsing(count=5000, repeat=3):
+    """Compare parsing of 'oc get pv' output in YAML and JSON formats.
+
+    YAML is parsed using both pure python and fastest available safe
+    loaders, JSON is parsed using the 'json' module.
+
+    Returns:
+        dict: best of 'repeat' parse times in seconds, like
+            {'yaml_pure': 60.2, 'yaml_fast': 4.1, 'json': 0.3}
+    """
+    data = make_synthetic_pv_list(count)
+    yaml_text = utils.dump_yaml(data, default_flow_style=False)
+    json_text = json.dumps(data, indent=4)
+    parsers = {
+        'yaml_pure': lambda: yaml.load(yaml_text, Loader=yaml.SafeLoader),
+        'yaml_fast': lambda: utils.load_yaml(yaml_text),
+        'json': lambda: json.loads(json_text),
+    }
+    results = {}
+    for name, parse in parsers.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.time()
+            parse()
+            timings.append(time.time() - start)
+        results[name] = min(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=5000,
+                        help='amount of PVs in the list')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='amount of parse attempts of each format')
+    args = parser.parse_args()
+    for parser_name, parse_time in sorted(six.iteritems(
+            benchmark_pv_list_parsing(args.count, args.repeat))):
+        print("%-10s %.4fs" % (parser_name, parse_time))
+
+
+if __name__ == '__main__':
+    main()